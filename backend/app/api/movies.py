@@ -1,23 +1,22 @@
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query, Path
-from bson import ObjectId
+from typing import List, Optional, Union
+from fastapi import APIRouter, Depends, HTTPException, Query, Path, Request, Response
 import logging
 from fastapi.responses import StreamingResponse
 import httpx
 
 from ..db.models.movie import MovieModel
 from ..crud.movie import (
+    MovieCRUD,
     get_movies,
-    get_movie_by_id,
-    get_top_movies_by_views,
-    increment_movie_view_count,
-    get_related_movies,
     )
 from ..crud.movie_link import MovieLinkCRUD
 from ..crud.rating import RatingCRUD
 from ..crud.character import CharacterCRUD
 from ..crud.comment import CommentCRUD
-from ..schemas.movie import MovieOut, MovieList, MovieResponse
+from ..schemas.movie import (
+    MovieOut, MovieList, MovieResponse, MovieCard, MovieSuggestion, MovieSearchResponse, HomePageResponse,
+    MovieViewerStats
+)
 from ..schemas.rating import RatingOut, RatingCreate
 from ..schemas.character import CharacterInDB
 from ..schemas.comment import CommentResponse
@@ -28,6 +27,10 @@ from ..dependencies import get_movie_service
 from ..schemas.user import UserInDB
 from ..schemas.movie_link import MovieLinkBase, MovieLinkInDB, MovieLinkResponse
 from ..db.database import get_database
+from ..utils.cursor import InvalidCursorError
+from ..utils.etag import (
+    conditional_json, etag_matches, is_conditional, make_etag, not_modified, not_modified_since, validator_headers
+)
 from ..schemas.comment import CommentCreate
 
 
@@ -44,29 +47,55 @@ Xử lý các endpoints liên quan đến phim:
 router = APIRouter(tags=["movies"])
 logger = logging.getLogger(__name__)
 
-@router.get("/", response_model=List[MovieResponse])
+@router.get("/", response_model=Union[List[MovieResponse], List[MovieCard]])
 async def get_movies(
+    request: Request,
     skip: int = Query(0, description="Number of movies to skip"),
     limit: int = Query(20, description="Number of movies to return"),
+    genre: Optional[str] = Query(None, description="Filter by genre"),
+    year: Optional[int] = Query(None, description="Filter by release year"),
+    min_rating: Optional[int] = Query(None, ge=0, le=10, description="Minimum rating"),
+    after: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header of the previous page"),
+    view: str = Query("full", pattern="^(full|card)$", description="full movies, or compact card rows"),
     movie_service: MovieService = Depends(get_movie_service)
 ):
     """
     Get a paginated list of movies.
 
+    Pages can be requested with skip, or with the cursor returned in the
+    X-Next-Cursor header, which costs the same for every page.
+    Answers 304 when If-None-Match carries the ETag of the same page.
+
     Args:
+        request: Incoming request, for If-None-Match
         skip: Number of movies to skip for pagination
         limit: Maximum number of movies to return
+        genre: Optional genre filter
+        year: Optional release year filter
+        min_rating: Optional minimum rating
+        after: Cursor of the previous page
+        view: "card" to return MovieCard rows instead of full movies
         movie_service: MovieService dependency
 
     Returns:
         List of movies
     """
-    logger.info(f"Getting movies with skip={skip}, limit={limit}")
-    return await movie_service.get_movies(skip=skip, limit=limit)
-
-@router.get("/random", response_model=List[MovieResponse])
+    logger.info(f"Getting movies with skip={skip}, limit={limit}, genre={genre}, year={year}, min_rating={min_rating}, after={after}")
+    try:
+        movies = await movie_service.get_movies(
+            skip=skip, limit=limit, genre=genre, year=year, min_rating=min_rating, after=after,
+            card=view == "card"
+        )
+    except InvalidCursorError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    next_cursor = MovieCRUD.movie_cursor(movies, limit)
+    return conditional_json(request, movies, {"X-Next-Cursor": next_cursor} if next_cursor else None)
+
+@router.get("/random", response_model=Union[List[MovieResponse], List[MovieCard]])
 async def get_random_movies(
-    limit: int = Query(10, description="Number of random movies to return"),
+    limit: int = Query(10, ge=1, le=50, description="Number of random movies to return"),
+    view: str = Query("full", pattern="^(full|card)$", description="full movies, or compact card rows"),
     movie_service: MovieService = Depends(get_movie_service)
 ):
     """
@@ -74,92 +103,284 @@ async def get_random_movies(
 
     Args:
         limit: Number of random movies to return
+        view: "card" to return MovieCard rows instead of full movies
         movie_service: MovieService dependency
 
     Returns:
         List of random movies
     """
     logger.info(f"Getting {limit} random movies")
-    return await movie_service.get_random_movies(limit=limit)
+    return await movie_service.get_random_movies(limit=limit, card=view == "card")
 
-@router.get("/most-viewed", response_model=List[MovieResponse])
+@router.get("/most-viewed", response_model=Union[List[MovieResponse], List[MovieCard]])
 async def get_most_viewed_movies(
+    request: Request,
     limit: int = Query(10, description="Number of most viewed movies to return"),
+    view: str = Query("full", pattern="^(full|card)$", description="full movies, or compact card rows"),
     movie_service: MovieService = Depends(get_movie_service)
 ):
     """
     Get a list of most viewed movies.
 
     Args:
+        request: Incoming request, for If-None-Match
         limit: Number of most viewed movies to return
+        view: "card" to return MovieCard rows instead of full movies
         movie_service: MovieService dependency
 
     Returns:
         List of most viewed movies sorted by view count
     """
     logger.info(f"Getting {limit} most viewed movies")
-    return await movie_service.get_most_viewed_movies(limit=limit)
+    movies = await movie_service.get_most_viewed_movies(limit=limit, card=view == "card")
+    return conditional_json(request, movies)
+
+@router.get("/trending", response_model=Union[List[MovieResponse], List[MovieCard]])
+async def get_trending_movies(
+    request: Request,
+    limit: int = Query(10, ge=1, le=50, description="Number of trending movies to return"),
+    view: str = Query("full", pattern="^(full|card)$", description="full movies, or compact card rows"),
+    movie_service: MovieService = Depends(get_movie_service)
+):
+    """
+    Get a list of trending movies.
+
+    Each view counts for 2^(-age / half-life), so recent views outweigh old ones.
+
+    Args:
+        request: Incoming request, for If-None-Match
+        limit: Number of trending movies to return
+        view: "card" to return MovieCard rows instead of full movies
+        movie_service: MovieService dependency
 
-@router.get("/featured", response_model=List[MovieResponse])
+    Returns:
+        List of movies sorted by trending score
+    """
+    movies = await movie_service.get_trending_movies(limit=limit, card=view == "card")
+    return conditional_json(request, movies)
+
+@router.get("/recommended", response_model=Union[List[MovieResponse], List[MovieCard]])
+async def get_recommended_movies(
+    limit: int = Query(20, ge=1, le=50, description="Number of recommended movies to return"),
+    view: str = Query("full", pattern="^(full|card)$", description="full movies, or compact card rows"),
+    user: UserInDB = Depends(get_current_user),
+    movie_service: MovieService = Depends(get_movie_service)
+):
+    """
+    Get personalized recommendations for the current user.
+
+    Merges the precomputed item-to-item neighbors (movie_neighbors) of the user's
+    recently watched movies, excluding movies already watched.
+
+    Args:
+        limit: Number of recommended movies to return
+        view: "card" to return MovieCard rows instead of full movies
+        user: Current authenticated user
+        movie_service: MovieService dependency
+
+    Returns:
+        List of recommended movies
+    """
+    return await movie_service.get_recommended_movies(user.id, limit=limit, card=view == "card")
+
+@router.get("/for-you", response_model=Union[List[MovieResponse], List[MovieCard]])
+async def get_for_you_movies(
+    limit: int = Query(20, ge=1, le=50, description="Number of movies to return"),
+    view: str = Query("full", pattern="^(full|card)$", description="full movies, or compact card rows"),
+    user: UserInDB = Depends(get_current_user),
+    movie_service: MovieService = Depends(get_movie_service)
+):
+    """
+    Get the "for you" rail of the current user.
+
+    Scores every movie against the user's genre affinity (learned from views and
+    completions) and favorite genres, excluding movies already watched.
+
+    Args:
+        limit: Number of movies to return
+        view: "card" to return MovieCard rows instead of full movies
+        user: Current authenticated user
+        movie_service: MovieService dependency
+
+    Returns:
+        List of movies, best match first
+    """
+    return await movie_service.get_for_you_movies(
+        user.id, user.genre_affinity, user.preferences.favorite_genres, limit=limit, card=view == "card"
+    )
+
+@router.get("/featured", response_model=Union[List[MovieResponse], List[MovieCard]])
 async def get_featured_movies(
+    request: Request,
     limit: int = Query(10, description="Number of featured movies to return"),
+    genre: Optional[str] = Query(None, description="Filter by genre"),
+    year: Optional[int] = Query(None, description="Filter by release year"),
+    min_rating: Optional[int] = Query(None, ge=0, le=10, description="Minimum rating"),
+    view: str = Query("full", pattern="^(full|card)$", description="full movies, or compact card rows"),
     movie_service: MovieService = Depends(get_movie_service)
 ):
     """
     Get a list of featured movies.
 
     Args:
+        request: Incoming request, for If-None-Match
         limit: Number of featured movies to return
+        genre: Optional genre filter
+        year: Optional release year filter
+        min_rating: Optional minimum rating
+        view: "card" to return MovieCard rows instead of full movies
         movie_service: MovieService dependency
 
     Returns:
         List of featured movies
     """
     logger.info(f"Getting {limit} featured movies")
-    return await movie_service.get_featured_movies(limit=limit)
+    movies = await movie_service.get_featured_movies(
+        limit=limit, genre=genre, year=year, min_rating=min_rating, card=view == "card"
+    )
+    return conditional_json(request, movies)
 
 
-@router.get("/search", response_model=List[MovieResponse])
+@router.get("/search", response_model=Union[List[MovieResponse], List[MovieCard], MovieSearchResponse])
 async def search_movies(
+    request: Request,
     query: str = Query(None, description="Search query"),
     genre: Optional[str] = Query(None, description="Filter by genre"),
     year: Optional[int] = Query(None, description="Filter by release year"),
     skip: int = Query(0, description="Number of movies to skip"),
     limit: int = Query(20, description="Number of movies to return"),
+    fuzzy: bool = Query(False, description="Tolerate typos in movie titles"),
+    min_rating: Optional[int] = Query(None, ge=0, le=10, description="Minimum rating"),
+    facets: bool = Query(False, description="Also return genre/year/rating facet counts"),
+    after: Optional[str] = Query(None, description="Cursor from the previous page"),
+    view: str = Query("full", pattern="^(full|card)$", description="full movies, or compact card rows"),
     movie_service: MovieService = Depends(get_movie_service)
 ):
     """
     Search for movies by title, description, or other criteria.
 
     Args:
+        request: Incoming request, for If-None-Match
         query: Search query string
         genre: Optional genre filter
         year: Optional release year filter
         skip: Number of movies to skip
         limit: Maximum number of movies to return
+        fuzzy: Whether to also match titles within 1-2 typos
+        min_rating: Optional minimum rating
+        facets: Whether to wrap results with facet counts
+        after: Cursor of the previous page (X-Next-Cursor header or next_cursor field)
+        view: "card" to return MovieCard rows instead of full movies
         movie_service: MovieService dependency
 
     Returns:
-        List of movies matching search criteria
-    """
-    logger.info(f"Searching movies with query='{query}', genre={genre}, year={year}")
-    return await movie_service.search_movies(
-        query=query,
-        genre=genre,
-        year=year,
-        skip=skip,
-        limit=limit
-    )
+        List of movies matching search criteria, or {results, facets, next_cursor} when facets=true
+    """
+    logger.info(f"Searching movies with query='{query}', genre={genre}, year={year}, fuzzy={fuzzy}, after={after}")
+    try:
+        if facets:
+            page = await movie_service.search_movies_with_facets(
+                query=query,
+                genre=genre,
+                year=year,
+                skip=skip,
+                limit=limit,
+                fuzzy=fuzzy,
+                min_rating=min_rating,
+                after=after,
+                card=view == "card"
+            )
+            next_cursor = page.next_cursor
+        else:
+            page, next_cursor = await movie_service.search_movies_page(
+                query=query,
+                genre=genre,
+                year=year,
+                skip=skip,
+                limit=limit,
+                fuzzy=fuzzy,
+                min_rating=min_rating,
+                after=after,
+                card=view == "card"
+            )
+    except InvalidCursorError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    return conditional_json(request, page, {"X-Next-Cursor": next_cursor} if next_cursor else None)
+
+@router.get("/home", response_model=HomePageResponse)
+async def get_home_page(
+    request: Request,
+    limit: int = Query(10, ge=1, le=30, description="Number of movies per rail"),
+    genres: Optional[List[str]] = Query(None, description="Genres to show as rails (repeatable)"),
+    genre_rails: int = Query(4, ge=0, le=10, description="Number of genre rails when genres is not given"),
+    movie_service: MovieService = Depends(get_movie_service)
+):
+    """
+    Get every home page rail in a single request.
+
+    Args:
+        request: Incoming request, for If-None-Match
+        limit: Number of movies per rail
+        genres: Optional list of genres to build rails for
+        genre_rails: Number of largest genres to use when genres is not given
+        movie_service: MovieService dependency
+
+    Returns:
+        Rails (featured, most viewed, random, per genre) and the movie cards they reference
+    """
+    logger.info(f"Getting home page with limit={limit}, genres={genres}, genre_rails={genre_rails}")
+    home = await movie_service.get_home_page(limit=limit, genres=genres, genre_rails=genre_rails)
+    return conditional_json(request, home)
+
+@router.get("/top", response_model=List[MovieOut])
+async def read_top_movies(
+    limit: int = Query(10, ge=1, le=50, description="Số lượng phim trả về"),
+    period: str = Query("week", pattern="^(week|month|year|all)$", description="Khoảng thời gian (week, month, year, all)"),
+    movie_service: MovieService = Depends(get_movie_service)
+):
+    """
+    Lấy danh sách phim được xem nhiều nhất
+    - period: week, month, year (đọc top đã tính sẵn từ lượt xem theo ngày), all (tổng view_count)
+    """
+    return await movie_service.get_top_movies(period=period, limit=limit)
+
+@router.get("/suggest", response_model=List[MovieSuggestion])
+async def suggest_movies(
+    q: str = Query(..., description="Text typed so far"),
+    limit: int = Query(10, ge=1, le=10, description="Number of suggestions to return"),
+    movie_service: MovieService = Depends(get_movie_service)
+):
+    """
+    Suggest movie titles for autocomplete.
+
+    Args:
+        q: Partially typed title
+        limit: Maximum number of suggestions
+        movie_service: MovieService dependency
+
+    Returns:
+        List of title suggestions, most viewed first
+    """
+    return await movie_service.suggest_movies(query=q, limit=limit)
 
 @router.get("/{movie_id}", response_model=MovieResponse)
 async def get_movie(
+    request: Request,
+    response: Response,
     movie_id: str = Path(..., description="The ID of the movie to get"),
     movie_service: MovieService = Depends(get_movie_service)
 ):
     """
     Get a specific movie by ID.
 
+    The ETag is derived from updated_at. Conditional requests read updated_at on its own
+    first, so a matching If-None-Match (or If-Modified-Since) gets a 304 without loading
+    the movie; other requests load the movie once and take the ETag from it.
+
     Args:
+        request: Incoming request, for If-None-Match / If-Modified-Since
+        response: Outgoing response, for the ETag and Last-Modified headers
         movie_id: Movie ID
         movie_service: MovieService dependency
 
@@ -170,9 +391,16 @@ async def get_movie(
         HTTPException: If the movie is not found
     """
     logger.info(f"Getting movie with id={movie_id}")
+    updated_at = await movie_service.get_movie_version(movie_id) if is_conditional(request) else None
+    if updated_at is not None:
+        headers = validator_headers(make_etag(movie_id, updated_at.isoformat()), updated_at)
+        if etag_matches(request, headers["ETag"]) or not_modified_since(request, updated_at):
+            return not_modified(headers)
+
     movie = await movie_service.get_movie(movie_id)
     if not movie:
         raise HTTPException(status_code=404, detail="Movie not found")
+    response.headers.update(validator_headers(make_etag(movie.id, movie.updated_at.isoformat()), movie.updated_at))
     return movie
 
 @router.post("/{movie_id}/view", response_model=MovieResponse)
@@ -201,32 +429,49 @@ async def increment_view_count(
         raise HTTPException(status_code=404, detail="Movie not found")
     return movie
 
-@router.get("/top", response_model=List[MovieOut])
-async def read_top_movies(
-    limit: int = Query(10, ge=1, le=50, description="Số lượng phim trả về"),
-    period: str = Query("week", description="Khoảng thời gian (week, month, year, all)")
+@router.get("/{movie_id}/viewers", response_model=MovieViewerStats)
+async def read_movie_viewers(
+    movie_id: str = Path(..., description="ID của phim"),
+    period: str = Query("all", pattern="^(week|month|year|all)$", description="Khoảng thời gian (week, month, year, all)"),
+    movie_service: MovieService = Depends(get_movie_service)
 ):
     """
-    Lấy danh sách phim được xem nhiều nhất
-    - period: week, month, year, all
+    Lấy số lượt xem và số người xem (ước lượng bằng HyperLogLog) của phim
+    - period: week, month, year (gộp sketch theo ngày), all (sketch toàn thời gian của phim)
+    """
+    stats = await movie_service.get_viewer_stats(movie_id, period=period)
+    if stats is None:
+        raise HTTPException(status_code=404, detail="Phim không tồn tại")
+    return stats
+
+@router.get("/{movie_id}/similar", response_model=List[MovieOut])
+async def read_similar_movies(
+    movie_id: str = Path(..., description="ID của phim"),
+    limit: int = Query(10, ge=1, le=20, description="Số lượng phim tương tự trả về"),
+    movie_service: MovieService = Depends(get_movie_service)
+):
+    """
+    Lấy danh sách phim có nội dung tương tự
+    - Đọc danh sách đã tính sẵn trong similar_movies (TF-IDF trên tiêu đề và mô tả)
     """
-    movies = await get_top_movies_by_views(limit, period)
-    return movies
+    similar = await movie_service.get_similar_movies(movie_id, limit=limit)
+    if similar is None:
+        raise HTTPException(status_code=404, detail="Phim không tồn tại")
+    return similar
 
 @router.get("/{movie_id}/related", response_model=List[MovieOut])
 async def read_related_movies(
     movie_id: str = Path(..., description="ID của phim"),
-    limit: int = Query(6, ge=1, le=20, description="Số lượng phim liên quan trả về")
+    limit: int = Query(6, ge=1, le=20, description="Số lượng phim liên quan trả về"),
+    movie_service: MovieService = Depends(get_movie_service)
 ):
     """
     Lấy danh sách phim liên quan
-    - Dựa trên thể loại của phim hiện tại
+    - Đọc danh sách hàng xóm đã tính sẵn trong related_movies (thể loại, năm, điểm)
     """
-    movie = await get_movie_by_id(ObjectId(movie_id))
-    if not movie:
+    related = await movie_service.get_related_movies(movie_id, limit=limit)
+    if related is None:
         raise HTTPException(status_code=404, detail="Phim không tồn tại")
-
-    related = await get_related_movies(movie, limit)
     return related
 
 @router.get("/{movie_id}/drive-url", response_model=MovieLinkResponse)
@@ -262,9 +507,10 @@ async def create_rating(movie_id: str, rating: RatingCreate, db=Depends(get_data
     return rating_out
 
 @router.get("/{movie_id}/characters", response_model=List[CharacterInDB])
-async def get_characters(movie_id: str, db=Depends(get_database)):
+async def get_characters(request: Request, movie_id: str, db=Depends(get_database)):
     character_crud = CharacterCRUD(db)
     characters = await character_crud.get_by_movie_id(movie_id)
-    return characters
+    # Character không có updated_at nên ETag là hash của nội dung
+    return conditional_json(request, characters)
 
 
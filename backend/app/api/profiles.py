@@ -5,7 +5,8 @@ from ..schemas.user import UserProfileUpdate, UserProfileOut, WatchStatsOut, Use
 from ..services.profile_service import (
     update_user_profile,
     upload_user_avatar,
-    get_user_watch_stats
+    get_user_watch_stats,
+    WATCH_STATS_PERIODS
 )
 from ..dependencies import get_current_user
 
@@ -135,7 +136,7 @@ async def get_watch_stats(
     """
     Lấy thống kê thời lượng xem phim theo tuần/tháng/năm
     """
-    if period not in ["week", "month", "year"]:
+    if period not in WATCH_STATS_PERIODS:
         raise HTTPException(
             status_code=400,
             detail="Khoảng thời gian không hợp lệ. Chọn 'week', 'month' hoặc 'year'"
@@ -112,6 +112,8 @@ async def sync_single_movie(
             detail=f"Không thể đồng bộ phim với ID {tmdb_id}"
         )
 
+    await sync_service.refresh_movie_neighbors([movie_id])
+
     return {
         "status": "success",
         "message": f"Đồng bộ thành công phim với ID {tmdb_id}",
@@ -22,6 +22,7 @@ from ..schemas.profile import (
     WatchLaterEntry
 )
 from ..schemas.user import UserInDB
+from ..utils.cursor import InvalidCursorError
 
 router = APIRouter(tags=["watch-stats"])
 logger = logging.getLogger(__name__)
@@ -63,6 +64,7 @@ async def get_user_watch_stats(
 async def get_user_watch_history(
     page: int = Query(1, ge=1, description="Page number"),
     limit: int = Query(20, ge=1, le=100, description="Items per page"),
+    after: Optional[str] = Query(None, description="Cursor from next_cursor of the previous page (overrides page)"),
     user: UserInDB = Depends(get_current_user),
     watch_history_crud: WatchHistoryCRUD = Depends(get_watch_history_crud)
 ):
@@ -72,6 +74,7 @@ async def get_user_watch_history(
     Args:
         page: Page number (starting at 1)
         limit: Number of items per page
+        after: Cursor of the previous page; when given, page is not used for skipping
         user: Current authenticated user from token
         watch_history_crud: WatchHistoryCRUD dependency
         
@@ -81,13 +84,14 @@ async def get_user_watch_history(
     logger.info(f"Getting watch history for user {user.id}, page={page}, limit={limit}")
     
     try:
-        skip = (page - 1) * limit
+        skip = 0 if after else (page - 1) * limit
         
         # Get watch history entries
         history_items = await watch_history_crud.get_user_history(
             user_id=user.id,
             skip=skip,
-            limit=limit
+            limit=limit,
+            after=after
         )
         
         # Get total count for pagination
@@ -97,8 +101,11 @@ async def get_user_watch_history(
             items=history_items,
             total=total_count,
             page=page,
-            limit=limit
+            limit=limit,
+            next_cursor=WatchHistoryCRUD.entry_cursor(history_items, limit)
         )
+    except InvalidCursorError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
     except Exception as e:
         logger.exception(f"Error getting watch history: {str(e)}")
         raise HTTPException(
@@ -203,6 +210,7 @@ async def delete_watch_history_entry(
 async def get_user_watch_later(
     page: int = Query(1, ge=1, description="Page number"),
     limit: int = Query(20, ge=1, le=100, description="Items per page"),
+    after: Optional[str] = Query(None, description="Cursor from next_cursor of the previous page (overrides page)"),
     user: UserInDB = Depends(get_current_user),
     watch_later_crud: WatchLaterCRUD = Depends(get_watch_later_crud)
 ):
@@ -212,6 +220,7 @@ async def get_user_watch_later(
     Args:
         page: Page number (starting at 1)
         limit: Number of items per page
+        after: Cursor of the previous page; when given, page is not used for skipping
         user: Current authenticated user from token
         watch_later_crud: WatchLaterCRUD dependency
         
@@ -221,13 +230,14 @@ async def get_user_watch_later(
     logger.info(f"Getting watch later list for user {user.id}, page={page}, limit={limit}")
     
     try:
-        skip = (page - 1) * limit
+        skip = 0 if after else (page - 1) * limit
         
         # Get watch later entries
         later_items = await watch_later_crud.get_user_list(
             user_id=user.id,
             skip=skip,
-            limit=limit
+            limit=limit,
+            after=after
         )
         
         # Get total count for pagination
@@ -237,8 +247,11 @@ async def get_user_watch_later(
             items=later_items,
             total=total_count,
             page=page,
-            limit=limit
+            limit=limit,
+            next_cursor=WatchLaterCRUD.entry_cursor(later_items, limit)
         )
+    except InvalidCursorError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
     except Exception as e:
         logger.exception(f"Error getting watch later list: {str(e)}")
         raise HTTPException(
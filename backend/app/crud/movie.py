@@ -6,31 +6,30 @@ Handles all database operations for movies including:
 - Managing movie view counts
 """
 
+import heapq
 import logging
-from typing import List, Optional, Dict, Any
+from collections import defaultdict
+from typing import List, Optional, Dict, Any, Set, Tuple, Union
 from datetime import datetime
 from bson import ObjectId
-import unicodedata
 import re
 
 from ..db.database import get_database
-from ..schemas.movie import MovieCreate, MovieUpdate, MovieInDB
+from ..schemas.movie import MovieCreate, MovieUpdate, MovieInDB, MovieCard, MovieSuggestion
+from ..services.search_index import movie_search_index, rating_band, RATING_BAND_BOUNDARIES
+from ..services.movie_cache import movie_cache, RAIL_TTLS
+from ..services.genre_affinity import load_genre_matrix
+from ..services.movie_lsh import lsh_neighbors
+from ..utils.text import clean_query, parse_release_year
+from ..utils.cursor import encode_cursor, decode_cursor, as_object_id, keyset_query
+from ..utils.hyperloglog import HyperLogLog
 
 logger = logging.getLogger(__name__)
 
-def remove_vietnamese_tones(text: str) -> str:
-    text = unicodedata.normalize('NFD', text)
-    text = re.sub(r'[\u0300-\u036f]', '', text)
-    text = re.sub(r'đ', 'd', text)
-    text = re.sub(r'Đ', 'D', text)
-    return text
-
-def clean_query(query: str) -> str:
-    query = remove_vietnamese_tones(query.lower())
-    query = re.sub(r'[^\w\s]', '', query)           # Remove special characters
-    query = re.sub(r'\s+', ' ', query).strip()      # Remove extra whitespace
-    print("🎯 Normalized query:", query)
-    return query
+# Chỉ lấy các trường có trong MovieInDB (bỏ normalized_* và các trường lưu trữ khác)
+MOVIE_PROJECTION = {field: 1 for field in MovieInDB.model_fields if field != "id"}
+# Projection cho view=card: bỏ overview dài và các trường không cần để vẽ poster
+CARD_PROJECTION = {field: 1 for field in MovieCard.model_fields if field != "id"}
 
 class MovieCRUD:
     """CRUD class for movie operations"""
@@ -45,6 +44,14 @@ class MovieCRUD:
         self.db = database
         self.collection = database.movies
 
+    async def ensure_indexes(self) -> None:
+        """
+        Create the indexes used by movie browsing and search filters.
+        """
+        await self.collection.create_index([("genres", 1), ("release_year", 1)])
+        await self.collection.create_index([("release_year", 1)])
+        await self.collection.create_index([("trending_score", -1)])
+
     async def create(self, obj_in: MovieCreate) -> MovieInDB:
         """
         Create a new movie record.
@@ -58,7 +65,8 @@ class MovieCRUD:
         now = datetime.utcnow()
         movie_data = obj_in.model_dump()
         movie_data["normalized_title"] = clean_query(movie_data.get("title", ""))
-        movie_data["normalized_description"] = clean_query(movie_data.get("description", ""))
+        movie_data["normalized_description"] = clean_query(movie_data.get("overview", ""))
+        movie_data["release_year"] = parse_release_year(movie_data.get("release_date"))
         movie_data.update({
             "view_count": 0,
             "created_at": now,
@@ -66,7 +74,9 @@ class MovieCRUD:
         })
 
         result = await self.collection.insert_one(movie_data)
-        movie_data["id"] = str(result.inserted_id)
+        movie_data["id"] = str(movie_data.pop("_id", result.inserted_id))
+        movie_search_index.add(movie_data)
+        movie_cache.invalidate()
 
         return MovieInDB(**movie_data)
 
@@ -87,74 +97,231 @@ class MovieCRUD:
         movie["id"] = str(movie.pop("_id"))
         return MovieInDB(**movie)
 
-    async def get_multi(self, skip: int = 0, limit: int = 100) -> List[MovieInDB]:
+    async def get_updated_at(self, movie_id: str) -> Optional[datetime]:
+        """
+        Get only a movie's updated_at, to check cache validators without loading the document.
+
+        Args:
+            movie_id: Movie ID
+
+        Returns:
+            updated_at if the movie exists, None otherwise
+        """
+        movie = await self.collection.find_one({"_id": ObjectId(movie_id)}, {"updated_at": 1})
+        if not movie:
+            return None
+        return movie.get("updated_at")
+
+    async def get_multi(
+        self,
+        skip: int = 0,
+        limit: int = 100,
+        genre: Optional[str] = None,
+        year: Optional[int] = None,
+        min_rating: Optional[int] = None,
+        after: Optional[str] = None,
+        card: bool = False
+    ) -> Union[List[MovieInDB], List[MovieCard]]:
         """
-        Get multiple movies with pagination.
+        Get multiple movies with pagination, in _id order.
 
         Args:
             skip: Number of movies to skip
             limit: Maximum number of movies to return
+            genre: Optional genre filter
+            year: Optional release year filter
+            min_rating: Optional minimum vote_average
+            after: Cursor from movie_cursor() of the last movie of the previous page
+            card: Load only the MovieCard fields
 
         Returns:
-            List of movies
+            List of movies (MovieCard when card is set)
+
+        Raises:
+            InvalidCursorError: If after is not a valid cursor
         """
-        cursor = self.collection.find().skip(skip).limit(limit)
-        movies = []
+        last_id = decode_cursor(after, 1)[0] if after else None
 
-        async for movie in cursor:
-            movie["id"] = str(movie.pop("_id"))
-            movies.append(MovieInDB(**movie))
+        has_filters = genre or year or min_rating is not None
+        if has_filters and movie_search_index.ready and (last_id is None or str(last_id) in movie_search_index):
+            movie_ids = movie_search_index.filter(
+                genre=genre, year=year, min_rating=min_rating, skip=skip, limit=limit,
+                after=str(last_id) if last_id is not None else None
+            )
+            return await self._get_many(movie_ids, card=card)
 
-        return movies
+        browse_query = self._build_search_query(genre=genre, year=year, min_rating=min_rating)
+        if last_id is not None:
+            browse_query.update(keyset_query(None, None, last_id, descending=False))
+        cursor = self.collection.find(browse_query, self._projection(card)).sort("_id", 1).skip(skip).limit(limit)
+        return await self._load(cursor, card)
+
+    async def get_random(self, limit: int = 10, card: bool = False) -> Union[List[MovieInDB], List[MovieCard]]:
+        """
+        Get a uniform random sample of movies.
+
+        $sample as the first stage picks documents with a random cursor instead of
+        scanning, so only about limit documents are read.
 
-    async def get_multi_by_view_count(self, limit: int = 10) -> List[MovieInDB]:
+        Args:
+            limit: Number of movies to return
+            card: Load only the MovieCard fields
+
+        Returns:
+            List of randomly chosen movies (no duplicates)
+        """
+        pipeline = [
+            {"$sample": {"size": limit}},
+            {"$project": self._projection(card)}
+        ]
+        return await self._load(self.collection.aggregate(pipeline), card)
+
+    async def get_multi_by_view_count(
+        self,
+        limit: int = 10,
+        card: bool = False
+    ) -> Union[List[MovieInDB], List[MovieCard]]:
         """
         Get movies sorted by view count.
 
         Args:
             limit: Maximum number of movies to return
+            card: Load only the MovieCard fields
 
         Returns:
             List of movies ordered by view count (descending)
         """
-        cursor = self.collection.find().sort("view_count", -1).limit(limit)
-        movies = []
+        cursor = self.collection.find({}, self._projection(card)).sort("view_count", -1).limit(limit)
+        return await self._load(cursor, card)
 
-        async for movie in cursor:
-            movie["id"] = str(movie.pop("_id"))
-            movies.append(MovieInDB(**movie))
+    async def get_trending(
+        self,
+        limit: int = 10,
+        card: bool = False
+    ) -> Union[List[MovieInDB], List[MovieCard]]:
+        """
+        Get movies sorted by trending score (views weighted by recency).
 
-        return movies
+        trending_score is stored relative to a fixed epoch, so its order is the current
+        trending order and this is a single read of the trending_score index.
 
-    async def get_featured(self, limit: int = 10) -> List[MovieInDB]:
+        Args:
+            limit: Maximum number of movies to return
+            card: Load only the MovieCard fields
+
+        Returns:
+            List of movies ordered by trending score (descending)
+        """
+        cursor = self.collection.find(
+            {"trending_score": {"$exists": True}},
+            self._projection(card)
+        ).sort("trending_score", -1).limit(limit)
+        return await self._load(cursor, card)
+
+    async def get_top_by_period(
+        self,
+        period: str,
+        limit: int = 10,
+        card: bool = False
+    ) -> Union[List[MovieInDB], List[MovieCard]]:
+        """
+        Get the most viewed movies of a period from the materialized top list.
+
+        Args:
+            period: Period key of TOP_PERIODS (week, month, year)
+            limit: Maximum number of movies to return
+            card: Load only the MovieCard fields
+
+        Returns:
+            List of movies ordered by views in the period (descending)
+        """
+        stored = await self.db.movie_top_views.find_one({"_id": period}, {"movies": {"$slice": limit}})
+        if stored is None:
+            return []
+
+        movie_ids = [entry["movie_id"] for entry in stored.get("movies", [])]
+        return await self._get_many(movie_ids, card)
+
+    async def get_viewer_stats(self, movie_id: str, since: Optional[datetime] = None) -> Optional[Dict[str, int]]:
+        """
+        Get the views and approximate unique viewers of a movie.
+
+        Args:
+            movie_id: Movie ID
+            since: First UTC day to include, or None for the whole lifetime of the movie
+
+        Returns:
+            {"views": ..., "unique_viewers": ...}, or None if the movie does not exist
+        """
+        movie = await self.collection.find_one({"_id": ObjectId(movie_id)}, {"view_count": 1, "viewer_sketch": 1})
+        if not movie:
+            return None
+
+        if since is None:
+            return {
+                "views": movie.get("view_count", 0),
+                "unique_viewers": HyperLogLog.from_bytes(movie.get("viewer_sketch")).count()
+            }
+
+        # Gộp sketch theo ngày thành sketch của cả khoảng thời gian
+        views = 0
+        viewers = HyperLogLog()
+        async for bucket in self.db.movie_view_buckets.find(
+            {"movie_id": movie_id, "day": {"$gte": since}},
+            {"total": 1, "viewer_sketch": 1}
+        ):
+            views += bucket.get("total", 0)
+            viewers.merge(HyperLogLog.from_bytes(bucket.get("viewer_sketch")))
+        return {"views": views, "unique_viewers": viewers.count()}
+
+    async def get_featured(
+        self,
+        limit: int = 10,
+        genre: Optional[str] = None,
+        year: Optional[int] = None,
+        min_rating: Optional[int] = None,
+        card: bool = False
+    ) -> Union[List[MovieInDB], List[MovieCard]]:
         """
         Get featured movies.
 
         Args:
             limit: Maximum number of featured movies to return
+            genre: Optional genre filter
+            year: Optional release year filter
+            min_rating: Optional minimum vote_average
+            card: Load only the MovieCard fields
 
         Returns:
             List of featured movies
         """
-        cursor = self.collection.find({"is_featured": True}).limit(limit)
-        movies = []
-
-        async for movie in cursor:
-            movie["id"] = str(movie.pop("_id"))
-            movies.append(MovieInDB(**movie))
+        if movie_search_index.ready:
+            movie_ids = movie_search_index.filter(
+                genre=genre, year=year, is_featured=True, min_rating=min_rating, limit=limit
+            )
+            return await self._get_many(movie_ids, card=card)
 
-        return movies
+        featured_query = self._build_search_query(genre=genre, year=year, min_rating=min_rating)
+        featured_query["is_featured"] = True
+        cursor = self.collection.find(featured_query, self._projection(card)).limit(limit)
+        return await self._load(cursor, card)
 
-    async def search(
+    async def search_page(
         self,
         query: Optional[str] = None,
         genre: Optional[str] = None,
         year: Optional[int] = None,
         skip: int = 0,
-        limit: int = 20
-    ) -> List[MovieInDB]:
+        limit: int = 20,
+        fuzzy: bool = False,
+        min_rating: Optional[int] = None,
+        after: Optional[str] = None,
+        card: bool = False
+    ) -> Tuple[Union[List[MovieInDB], List[MovieCard]], Optional[str]]:
         """
-        Search for movies by query text and optional filters.
+        Search for movies and return a cursor for the next page.
+
+        Ranked (index) results are paged on (score, _id); the $regex fallback is paged on _id.
 
         Args:
             query: Search query for movie title or description
@@ -162,10 +329,58 @@ class MovieCRUD:
             year: Optional release year filter
             skip: Number of movies to skip
             limit: Maximum number of movies to return
+            fuzzy: Tolerate typos in title words (needs the in-memory index)
+            min_rating: Optional minimum vote_average
+            after: Cursor returned with the previous page
+            card: Load only the MovieCard fields
 
         Returns:
-            List of movies matching search criteria
+            Tuple of (movies, next cursor or None on the last page)
+
+        Raises:
+            InvalidCursorError: If after is not a valid cursor
+        """
+        if movie_search_index.ready:
+            last_key = decode_cursor(after, 2) if after else None
+            ranked = movie_search_index.search_scored(
+                query=query, genre=genre, year=year, skip=skip, limit=limit,
+                fuzzy=fuzzy, min_rating=min_rating, after=last_key
+            )
+            movies = await self._get_many([movie_id for _, movie_id in ranked], card=card)
+            next_cursor = encode_cursor(*ranked[-1]) if len(ranked) == limit else None
+            return movies, next_cursor
+
+        search_query = self._build_search_query(query=query, genre=genre, year=year, min_rating=min_rating)
+        if after:
+            search_query.update(keyset_query(None, None, decode_cursor(after, 1)[0], descending=False))
+        cursor = self.collection.find(search_query, self._projection(card)).sort("_id", 1).skip(skip).limit(limit)
+        movies = await self._load(cursor, card)
+        return movies, self.movie_cursor(movies, limit)
+
+    @staticmethod
+    def movie_cursor(movies: List[Any], limit: int) -> Optional[str]:
         """
+        Cursor for the page after a list of movies ordered by _id.
+
+        Args:
+            movies: Movies of the current page (anything with an id attribute)
+            limit: Page size that was requested
+
+        Returns:
+            Cursor token, or None when the page was not full
+        """
+        if not movies or len(movies) < limit:
+            return None
+        return encode_cursor(as_object_id(movies[-1].id))
+
+    @staticmethod
+    def _build_search_query(
+        query: Optional[str] = None,
+        genre: Optional[str] = None,
+        year: Optional[int] = None,
+        min_rating: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """Build the Mongo filter used when the in-memory index is not available"""
         search_query = {}
         # Build search query
         if query:
@@ -174,30 +389,288 @@ class MovieCRUD:
                 {"normalized_title": {"$regex": normalized, "$options": "i"}},
                 {"normalized_description": {"$regex": normalized, "$options": "i"}}
             ]
-            
-            # search_query["$or"] = [
-            #     {"title": {"$regex": query, "$options": "i"}},
-            #     {"description": {"$regex": query, "$options": "i"}}
-            # ]
 
         # Add filters if provided
         if genre:
             search_query["genres"] = {"$in": [genre]}
 
         if year:
-            search_query["$expr"] = {
-                "$eq": [
-                    {"$toInt": {"$substr": ["$release_date", 0, 4]}},
-                    year
+            search_query["release_year"] = year
+
+        if min_rating is not None:
+            search_query["vote_average"] = {"$gte": min_rating}
+
+        return search_query
+
+    async def facet_counts(
+        self,
+        query: Optional[str] = None,
+        genre: Optional[str] = None,
+        year: Optional[int] = None,
+        fuzzy: bool = False,
+        min_rating: Optional[int] = None
+    ) -> Dict[str, Dict[str, int]]:
+        """
+        Count search hits per genre, release year and rating band.
+
+        Args:
+            query: Search query for movie title or description
+            genre: Optional genre filter
+            year: Optional release year filter
+            fuzzy: Tolerate typos in title words (needs the in-memory index)
+            min_rating: Optional minimum vote_average
+
+        Returns:
+            Dictionary with "genres", "years" and "rating_bands" counts
+        """
+        if movie_search_index.ready:
+            return movie_search_index.facet_counts(
+                query=query, genre=genre, year=year, fuzzy=fuzzy, min_rating=min_rating
+            )
+
+        pipeline = [
+            {"$match": self._build_search_query(query=query, genre=genre, year=year, min_rating=min_rating)},
+            {"$facet": {
+                "genres": [
+                    {"$unwind": "$genres"},
+                    {"$group": {"_id": "$genres", "count": {"$sum": 1}}}
+                ],
+                "years": [
+                    {"$match": {"release_year": {"$ne": None}}},
+                    {"$group": {"_id": "$release_year", "count": {"$sum": 1}}}
+                ],
+                "rating_bands": [
+                    {"$bucket": {
+                        "groupBy": {"$ifNull": ["$vote_average", 0]},
+                        "boundaries": RATING_BAND_BOUNDARIES,
+                        "default": "other",
+                        "output": {"count": {"$sum": 1}}
+                    }}
                 ]
+            }}
+        ]
+        results = await self.collection.aggregate(pipeline).to_list(length=1)
+        facets = results[0] if results else {}
+
+        return {
+            "genres": {item["_id"]: item["count"] for item in facets.get("genres", [])},
+            "years": {str(item["_id"]): item["count"] for item in facets.get("years", [])},
+            "rating_bands": {
+                rating_band(item["_id"]): item["count"]
+                for item in facets.get("rating_bands", []) if item["_id"] != "other"
             }
+        }
+
+    async def suggest(self, prefix: str, limit: int = 10) -> List[MovieSuggestion]:
+        """
+        Suggest movie titles starting with the given prefix.
+
+        Args:
+            prefix: Text typed so far
+            limit: Maximum number of suggestions
+
+        Returns:
+            List of suggestions ordered by view count (descending)
+        """
+        if movie_search_index.ready:
+            return [MovieSuggestion(**suggestion) for suggestion in movie_search_index.suggest(prefix, limit)]
+
+        normalized = clean_query(prefix)
+        if not normalized:
+            return []
+
+        cursor = self.collection.find(
+            {"normalized_title": {"$regex": f"^{re.escape(normalized)}"}},
+            {"title": 1, "poster_path": 1}
+        ).sort("view_count", -1).limit(limit)
+        suggestions = []
+
+        async for movie in cursor:
+            movie["id"] = str(movie.pop("_id"))
+            suggestions.append(MovieSuggestion(**movie))
+
+        return suggestions
+
+    async def get_related(self, movie_id: str, limit: int = 6) -> Optional[List[MovieInDB]]:
+        """
+        Get the precomputed related movies of a movie.
+
+        Falls back to movies sharing a genre, best rated first, until the
+        related_movies job has processed this movie.
+
+        Args:
+            movie_id: Movie ID
+            limit: Maximum number of related movies to return
+
+        Returns:
+            List of related movies, or None if the movie does not exist
+        """
+        stored = await self.db.related_movies.find_one(
+            {"_id": ObjectId(movie_id)},
+            # Lấy dư vài phim phòng trường hợp phim hàng xóm đã bị xoá
+            {"related": {"$slice": limit * 2}}
+        )
+        if stored is not None:
+            related_ids = [entry["movie_id"] for entry in stored.get("related", [])]
+            return (await self._get_many(related_ids))[:limit]
+
+        movie = await self.collection.find_one({"_id": ObjectId(movie_id)}, {"genres": 1})
+        if not movie:
+            return None
+
+        cursor = self.collection.find(
+            {"_id": {"$ne": movie["_id"]}, "genres": {"$in": movie.get("genres") or []}},
+            MOVIE_PROJECTION
+        ).sort("vote_average", -1).limit(limit)
+        return await self._load(cursor, card=False)
+
+    async def get_similar(self, movie_id: str, limit: int = 10) -> Optional[List[MovieInDB]]:
+        """
+        Get the precomputed content-based (TF-IDF) neighbors of a movie.
+
+        Movies without a precomputed list (e.g. synced after the last build) are looked up in the
+        LSH index, and get_related() is the last fallback.
+
+        Args:
+            movie_id: Movie ID
+            limit: Maximum number of similar movies to return
+
+        Returns:
+            List of similar movies, or None if the movie does not exist
+        """
+        stored = await self.db.similar_movies.find_one(
+            {"_id": ObjectId(movie_id)},
+            # Lấy dư vài phim phòng trường hợp phim hàng xóm đã bị xoá
+            {"similar": {"$slice": limit * 2}}
+        )
+        if stored is not None:
+            similar_ids = [entry["movie_id"] for entry in stored.get("similar", [])]
+        else:
+            similar_ids = [neighbor_id for neighbor_id, _ in await lsh_neighbors(self.db, movie_id, limit) or []]
+        if not similar_ids:
+            return await self.get_related(movie_id, limit=limit)
+        return (await self._get_many(similar_ids))[:limit]
+
+    async def get_recommended(
+        self,
+        history_ids: List[str],
+        watched_ids: Set[str],
+        limit: int = 20,
+        recency_decay: float = 0.9,
+        card: bool = False
+    ) -> Union[List[MovieInDB], List[MovieCard]]:
+        """
+        Merge the precomputed collaborative-filtering neighbors of recently watched movies.
 
-        cursor = self.collection.find(search_query).skip(skip).limit(limit)
+        Args:
+            history_ids: Recently watched movie IDs, most recent first
+            watched_ids: Every movie the user has watched (never recommended)
+            limit: Maximum number of movies to return
+            recency_decay: Weight multiplier per step back in the history
+            card: Load only the MovieCard fields
+
+        Returns:
+            Recommended movies, best first (may be fewer than limit)
+        """
+        if not history_ids:
+            return []
+
+        weights = {}
+        for rank, movie_id in enumerate(history_ids):
+            weights.setdefault(movie_id, recency_decay ** rank)
+
+        scores: Dict[str, float] = defaultdict(float)
+        async for stored in self.db.movie_neighbors.find(
+            {"_id": {"$in": [as_object_id(movie_id) for movie_id in weights]}}
+        ):
+            weight = weights[str(stored["_id"])]
+            for neighbor in stored.get("neighbors", []):
+                if neighbor["movie_id"] not in watched_ids:
+                    scores[neighbor["movie_id"]] += weight * neighbor["score"]
+
+        best = heapq.nlargest(limit, scores, key=scores.__getitem__)
+        return await self._get_many(best, card)
+
+    async def get_for_you(
+        self,
+        genre_affinity: Dict[str, float],
+        favorite_genres: List[str],
+        watched_ids: Set[str],
+        limit: int = 20,
+        card: bool = False
+    ) -> Union[List[MovieInDB], List[MovieCard]]:
+        """
+        Get the movies that best match a user's genre affinity.
+
+        Every movie is scored in one dot product against the cached genre matrix,
+        so no watch history is aggregated per request.
+
+        Args:
+            genre_affinity: users.genre_affinity of the user
+            favorite_genres: Genres chosen in the user's preferences
+            watched_ids: Movie IDs the user has already watched
+            limit: Maximum number of movies to return
+            card: Load only the MovieCard fields
+
+        Returns:
+            List of movies, best match first; empty when the user has no genre signal yet
+        """
+        async def load():
+            return await load_genre_matrix(self.db)
+
+        matrix = await movie_cache.get_or_load(("genre_matrix",), RAIL_TTLS["genre_matrix"], load)
+        user_vector = matrix.user_vector(genre_affinity, favorite_genres)
+        return await self._get_many(matrix.top(user_vector, watched_ids, limit), card=card)
+
+    async def _get_many(
+        self,
+        movie_ids: List[str],
+        card: bool = False
+    ) -> Union[List[MovieInDB], List[MovieCard]]:
+        """
+        Get several movies by ID in a single query, keeping the given order.
+
+        Args:
+            movie_ids: Movie IDs in the desired output order
+            card: Load only the MovieCard fields
+
+        Returns:
+            List of movies that still exist
+        """
+        if not movie_ids:
+            return []
+
+        cursor = self.collection.find(
+            {"_id": {"$in": [ObjectId(movie_id) for movie_id in movie_ids]}},
+            self._projection(card)
+        )
+        found = {movie.id: movie for movie in await self._load(cursor, card)}
+
+        return [found[movie_id] for movie_id in movie_ids if movie_id in found]
+
+    @staticmethod
+    def _projection(card: bool) -> Dict[str, int]:
+        """Fields to load for full movies or for cards"""
+        return CARD_PROJECTION if card else MOVIE_PROJECTION
+
+    @staticmethod
+    async def _load(cursor, card: bool) -> Union[List[MovieInDB], List[MovieCard]]:
+        """
+        Convert the documents of a cursor to MovieInDB, or MovieCard when card is set.
+
+        Args:
+            cursor: Motor find or aggregate cursor
+            card: Whether the cursor was projected with CARD_PROJECTION
+
+        Returns:
+            List of movies
+        """
+        model = MovieCard if card else MovieInDB
         movies = []
 
         async for movie in cursor:
             movie["id"] = str(movie.pop("_id"))
-            movies.append(MovieInDB(**movie))
+            movies.append(model(**movie))
 
         return movies
 
@@ -219,39 +692,26 @@ class MovieCRUD:
         update_data = obj_in.model_dump(exclude_unset=True)
         if update_data:
             update_data["updated_at"] = datetime.utcnow()
+            if "title" in update_data:
+                update_data["normalized_title"] = clean_query(update_data["title"] or "")
+            if "overview" in update_data:
+                update_data["normalized_description"] = clean_query(update_data["overview"] or "")
+            if "release_date" in update_data:
+                update_data["release_year"] = parse_release_year(update_data["release_date"])
 
             await self.collection.update_one(
                 {"_id": ObjectId(movie_id)},
                 {"$set": update_data}
             )
 
-            return await self.get(movie_id)
+            updated_movie = await self.get(movie_id)
+            if updated_movie:
+                movie_search_index.add(updated_movie.model_dump())
+            movie_cache.invalidate()
+            return updated_movie
 
         return movie
 
-    async def increment_view_count(self, movie_id: str) -> Optional[MovieInDB]:
-        """
-        Increment the view count for a movie by ID.
-
-        Args:
-            movie_id: Movie ID
-
-        Returns:
-            Updated movie if found, None otherwise
-        """
-        result = await self.collection.update_one(
-            {"_id": ObjectId(movie_id)},
-            {
-                "$inc": {"view_count": 1},
-                "$set": {"updated_at": datetime.utcnow()}
-            }
-        )
-
-        if result.modified_count:
-            return await self.get(movie_id)
-
-        return None
-
     async def delete(self, movie_id: str) -> bool:
         """
         Delete a movie by ID.
@@ -263,16 +723,14 @@ class MovieCRUD:
             True if deleted, False otherwise
         """
         result = await self.collection.delete_one({"_id": ObjectId(movie_id)})
-        return result.deleted_count > 0
+        if result.deleted_count > 0:
+            movie_search_index.remove(movie_id)
+            movie_cache.invalidate()
+            return True
+        return False
 
 
 class get_movies():
     pass
 class get_movie_by_id():
     pass
-class get_top_movies_by_views():
-    pass
-class increment_movie_view_count():
-    pass
-class get_related_movies():
-    pass
\ No newline at end of file
@@ -8,9 +8,10 @@ from ..db.models.user import (
     WatchHistoryModel, 
     WatchLaterModel,
     USER_COLLECTION,
-    WATCH_HISTORY_COLLECTION,
     WATCH_LATER_COLLECTION
 )
+from .watch_history import WatchHistoryCRUD
+from ..services.genre_affinity import record_completion
 
 """
 User CRUD Operations
@@ -141,42 +142,17 @@ async def add_watch_history(
     Thêm một bản ghi vào lịch sử xem phim
     - Nếu chưa tồn tại: tạo mới
     - Nếu đã tồn tại: cập nhật thời lượng và trạng thái
+    - Một lệnh find_one_and_update(upsert) duy nhất, xem WatchHistoryCRUD.upsert
     """
-    # Kiểm tra xem đã có bản ghi lịch sử xem phim này chưa
-    existing = await db[WATCH_HISTORY_COLLECTION].find_one({
-        "user_id": user_id,
-        "movie_id": movie_id
-    })
-    
-    watch_date = datetime.now()
-    
-    if existing:
-        # Cập nhật bản ghi hiện có
-        result = await db[WATCH_HISTORY_COLLECTION].update_one(
-            {"_id": existing["_id"]},
-            {"$set": {
-                "watch_date": watch_date,
-                "watch_duration": watch_duration,
-                "completed": completed
-            }}
-        )
-        
-        # Lấy bản ghi đã cập nhật
-        return await db[WATCH_HISTORY_COLLECTION].find_one({"_id": existing["_id"]})
-    else:
-        # Tạo bản ghi mới
-        new_history = {
-            "user_id": user_id,
-            "movie_id": movie_id,
-            "watch_date": watch_date,
-            "watch_duration": watch_duration,
-            "completed": completed
-        }
-        
-        result = await db[WATCH_HISTORY_COLLECTION].insert_one(new_history)
-        
-        # Lấy bản ghi vừa tạo
-        return await db[WATCH_HISTORY_COLLECTION].find_one({"_id": result.inserted_id})
+    entry = await WatchHistoryCRUD(db).upsert(
+        str(user_id),
+        str(movie_id),
+        watch_duration=watch_duration,
+        completed=completed
+    )
+    if completed:
+        await record_completion(db, str(user_id), str(movie_id))
+    return entry.model_dump()
 
 async def get_user_watch_history(
     user_id: ObjectId, 
@@ -185,30 +161,15 @@ async def get_user_watch_history(
 ) -> Dict[str, Any]:
     """
     Lấy lịch sử xem phim của user
+    - Đọc qua WatchHistoryCRUD để cùng schema với add_watch_history (user_id dạng chuỗi, sắp xếp theo watched_at)
+    - Thông tin phim lấy từ movie_details đã lưu trong bản ghi, không truy vấn thêm từng phim
     """
-    skip = (page - 1) * limit
-    
-    # Lấy danh sách lịch sử xem
-    cursor = db[WATCH_HISTORY_COLLECTION].find(
-        {"user_id": user_id}
-    ).sort("watch_date", -1).skip(skip).limit(limit)
-    
-    items = await cursor.to_list(length=limit)
-    
-    # Đếm tổng số bản ghi
-    total = await db[WATCH_HISTORY_COLLECTION].count_documents({"user_id": user_id})
-    
-    # Map với thông tin phim
-    for item in items:
-        movie = await db["movies"].find_one(
-            {"_id": item["movie_id"]}, 
-            {"title": 1, "poster_url": 1}
-        )
-        if movie:
-            item["movie"] = movie
+    watch_history_crud = WatchHistoryCRUD(db)
+    entries = await watch_history_crud.get_user_history(str(user_id), skip=(page - 1) * limit, limit=limit)
+    total = await watch_history_crud.count_user_history(str(user_id))
     
     return {
-        "items": items,
+        "items": [entry.model_dump() for entry in entries],
         "total": total,
         "page": page,
         "limit": limit
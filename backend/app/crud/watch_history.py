@@ -7,12 +7,17 @@ Handles all database operations for user watch history including:
 """
 
 import logging
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Set
 from datetime import datetime, timedelta
 from bson import ObjectId
 from bson.errors import InvalidId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError, OperationFailure
 
+from ..utils.cursor import encode_cursor, decode_cursor, as_object_id, keyset_query
 from ..schemas.profile import WatchHistoryEntry
+from ..services.view_stats import bucket_day, TOP_PERIODS
+from ..services.watch_rollups import record_watch, get_daily_rollups, minutes_between, summarize, month_start
 
 logger = logging.getLogger(__name__)
 
@@ -29,6 +34,137 @@ class WatchHistoryCRUD:
         self.db = database
         self.collection = database.watch_history
     
+    async def ensure_indexes(self) -> None:
+        """
+        Create the index backing the per-user listing and its keyset pagination,
+        and the unique (user_id, movie_id) index used by upsert().
+        """
+        await self.collection.create_index([("user_id", 1), ("watched_at", -1), ("_id", -1)])
+        try:
+            await self.collection.create_index([("user_id", 1), ("movie_id", 1)], unique=True)
+        except OperationFailure as e:
+            if e.code != 11000:
+                raise
+            # Dữ liệu cũ có thể có nhiều bản ghi cho cùng một phim: giữ bản xem gần nhất
+            removed = await self._remove_duplicates()
+            logger.warning(f"Removed {removed} duplicate watch history entries")
+            await self.collection.create_index([("user_id", 1), ("movie_id", 1)], unique=True)
+    
+    async def _remove_duplicates(self) -> int:
+        """Delete all but the most recently watched entry of each (user_id, movie_id) pair"""
+        pipeline = [
+            {"$sort": {"watched_at": -1, "_id": -1}},
+            {"$group": {"_id": {"user_id": "$user_id", "movie_id": "$movie_id"}, "ids": {"$push": "$_id"}}},
+            {"$match": {"ids.1": {"$exists": True}}}
+        ]
+        duplicate_ids = []
+        async for group in self.collection.aggregate(pipeline, allowDiskUse=True):
+            duplicate_ids.extend(group["ids"][1:])
+        if not duplicate_ids:
+            return 0
+        result = await self.collection.delete_many({"_id": {"$in": duplicate_ids}})
+        return result.deleted_count
+    
+    @staticmethod
+    def _to_entry(entry: Dict[str, Any]) -> WatchHistoryEntry:
+        """Transform a database document to the WatchHistoryEntry schema"""
+        return WatchHistoryEntry(
+            id=str(entry["_id"]),
+            user_id=entry.get("user_id", ""),
+            movie_id=str(entry.get("movie_id", "")),
+            watched_at=entry.get("watched_at", datetime.utcnow()),
+            watch_duration=entry.get("duration_seconds", 0),
+            completed=entry.get("completed", False),
+            progress_percent=float(entry.get("watch_percent", 0.0)),
+            movie_details=entry.get("movie", {})
+        )
+    
+    async def upsert(
+        self,
+        user_id: str,
+        movie_id: str,
+        watched_at: Optional[datetime] = None,
+        watch_duration: Optional[int] = None,
+        progress_percent: Optional[float] = None,
+        completed: Optional[bool] = None,
+        movie_details: Optional[Dict[str, Any]] = None
+    ) -> WatchHistoryEntry:
+        """
+        Create or update the entry of a user for a movie in one round trip.
+        
+        Fields left as None keep their stored value (or their default on insert).
+        
+        Args:
+            user_id: User ID
+            movie_id: Movie ID
+            watched_at: Time of the view (defaults to now)
+            watch_duration: Duration watched in seconds
+            progress_percent: Percentage of the movie watched
+            completed: Whether the movie was completed
+            movie_details: Basic movie details (title, poster_path)
+            
+        Returns:
+            The entry after the update
+        """
+        now = datetime.utcnow()
+        changes = {
+            "duration_seconds": watch_duration,
+            "watch_percent": progress_percent,
+            "completed": completed,
+            "movie": movie_details
+        }
+        defaults = {"duration_seconds": 0, "watch_percent": 0.0, "completed": False, "movie": {}}
+        
+        update = {
+            "$set": {
+                "watched_at": watched_at or now,
+                "updated_at": now,
+                **{field: value for field, value in changes.items() if value is not None}
+            },
+            "$setOnInsert": {
+                "created_at": now,
+                **{field: value for field, value in defaults.items() if changes[field] is None}
+            }
+        }
+        query = {"user_id": str(user_id), "movie_id": as_object_id(str(movie_id))}
+        # _id tạo sẵn để dựng lại bản ghi sau khi chèn mà không phải đọc lại
+        update["$setOnInsert"]["_id"] = ObjectId()
+        
+        # Lấy bản ghi TRƯỚC khi cập nhật để biết thời lượng xem thêm cho bảng tổng hợp theo ngày
+        try:
+            previous = await self.collection.find_one_and_update(
+                query, update, upsert=True, return_document=ReturnDocument.BEFORE
+            )
+        except DuplicateKeyError:
+            # Hai request cùng chèn một cặp (user, phim): bản ghi đã tồn tại, chỉ cần cập nhật
+            previous = await self.collection.find_one_and_update(
+                query, update, return_document=ReturnDocument.BEFORE
+            )
+        
+        # Chỉ dùng $set / $setOnInsert nên bản ghi sau cập nhật dựng lại được chính xác
+        entry = {**(previous or {**query, **update["$setOnInsert"]}), **update["$set"]}
+        await self._record_rollup(previous, entry)
+        return self._to_entry(entry)
+    
+    async def _record_rollup(self, previous: Optional[Dict[str, Any]], entry: Dict[str, Any]) -> None:
+        """Add the watch time and, on the first event of the day, the movie to user_watch_daily"""
+        previous_seconds = (previous or {}).get("duration_seconds") or 0
+        previous_at = (previous or {}).get("watched_at")
+        new_movie = not isinstance(previous_at, datetime) or bucket_day(previous_at) != bucket_day(entry["watched_at"])
+        genres = (entry.get("movie") or {}).get("genres")
+        if new_movie and genres is None:
+            # Bản ghi tạo từ API lịch sử xem không lưu thể loại: đọc từ phim, chỉ một lần mỗi ngày
+            movie = await self.db.movies.find_one({"_id": entry["movie_id"]}, {"genres": 1})
+            genres = (movie or {}).get("genres")
+        await record_watch(
+            self.db,
+            entry["user_id"],
+            entry["watched_at"],
+            seconds=max(0, (entry.get("duration_seconds") or 0) - previous_seconds),
+            new_movie=new_movie,
+            genres=genres or []
+        )
+    
     async def create(self, obj_in: Dict[str, Any]) -> WatchHistoryEntry:
         """
         Create a new watch history entry.
@@ -98,22 +234,7 @@ class WatchHistoryCRUD:
         if not entry:
             return None
         
-        # Transform database format to schema format
-        entry_id = str(entry.pop("_id"))
-        movie_id = str(entry.get("movie_id", ""))
-        
-        transformed_entry = {
-            "id": entry_id,
-            "user_id": entry.get("user_id", ""),
-            "movie_id": movie_id,
-            "watched_at": entry.get("watched_at", datetime.utcnow()),
-            "watch_duration": entry.get("duration_seconds", 0),
-            "completed": entry.get("completed", False),
-            "progress_percent": float(entry.get("watch_percent", 0.0)),
-            "movie_details": entry.get("movie", {})
-        }
-        
-        return WatchHistoryEntry(**transformed_entry)
+        return self._to_entry(entry)
     
     async def get_by_user_and_movie(self, user_id: str, movie_id: str) -> Optional[WatchHistoryEntry]:
         """
@@ -140,28 +261,14 @@ class WatchHistoryCRUD:
         if not entry:
             return None
         
-        # Transform database format to schema format
-        entry_id = str(entry.pop("_id"))
-        movie_id = str(entry.get("movie_id", ""))
-        
-        transformed_entry = {
-            "id": entry_id,
-            "user_id": entry.get("user_id", ""),
-            "movie_id": movie_id,
-            "watched_at": entry.get("watched_at", datetime.utcnow()),
-            "watch_duration": entry.get("duration_seconds", 0),
-            "completed": entry.get("completed", False),
-            "progress_percent": float(entry.get("watch_percent", 0.0)),
-            "movie_details": entry.get("movie", {})
-        }
-        
-        return WatchHistoryEntry(**transformed_entry)
+        return self._to_entry(entry)
     
     async def get_user_history(
         self, 
         user_id: str, 
-        skip: int = 0, 
-        limit: int = 20
+        skip: int = 0,
+        limit: int = 20,
+        after: Optional[str] = None
     ) -> List[WatchHistoryEntry]:
         """
         Get a user's watch history with pagination.
@@ -170,38 +277,71 @@ class WatchHistoryCRUD:
             user_id: User ID
             skip: Number of entries to skip
             limit: Maximum number of entries to return
+            after: Cursor from entry_cursor() of the last entry of the previous page
             
         Returns:
             List of watch history entries for the user
+            
+        Raises:
+            InvalidCursorError: If after is not a valid cursor
         """
-        cursor = self.collection.find({"user_id": user_id})\
-            .sort("watched_at", -1)\
+        query = {"user_id": user_id}
+        if after:
+            # Keyset: seek theo (watched_at, _id) thay vì skip qua các trang trước
+            last_watched_at, last_id = decode_cursor(after, 2)
+            query.update(keyset_query("watched_at", last_watched_at, last_id))
+        
+        cursor = self.collection.find(query)\
+            .sort([("watched_at", -1), ("_id", -1)])\
             .skip(skip)\
             .limit(limit)
         
-        entries = []
-        async for entry in cursor:
-            # Transform database format to schema format
-            entry_id = str(entry.pop("_id"))
-            
-            # Convert movie_id from ObjectId to string
-            movie_id = str(entry.get("movie_id", ""))
+        return [self._to_entry(entry) async for entry in cursor]
+    
+    async def get_recent_movie_ids(self, user_id: str, limit: int = 20) -> List[str]:
+        """
+        Get the IDs of the movies a user watched most recently.
+        
+        Args:
+            user_id: User ID
+            limit: Maximum number of movie IDs to return
             
-            # Map database fields to schema fields
-            transformed_entry = {
-                "id": entry_id,
-                "user_id": entry.get("user_id", ""),
-                "movie_id": movie_id,
-                "watched_at": entry.get("watched_at", datetime.utcnow()),
-                "watch_duration": entry.get("duration_seconds", 0),
-                "completed": entry.get("completed", False),
-                "progress_percent": float(entry.get("watch_percent", 0.0)),
-                "movie_details": entry.get("movie", {})
-            }
+        Returns:
+            Movie IDs, most recent first
+        """
+        cursor = self.collection.find({"user_id": user_id}, {"_id": 0, "movie_id": 1})\
+            .sort("watched_at", -1)\
+            .limit(limit)
+        return [str(entry["movie_id"]) async for entry in cursor]
+    
+    async def get_watched_movie_ids(self, user_id: str) -> Set[str]:
+        """
+        Get the IDs of every movie a user has watched.
+        
+        Args:
+            user_id: User ID
             
-            entries.append(WatchHistoryEntry(**transformed_entry))
+        Returns:
+            Set of movie IDs
+        """
+        return {str(movie_id) for movie_id in await self.collection.distinct("movie_id", {"user_id": user_id})}
+    
+    @staticmethod
+    def entry_cursor(entries: List[WatchHistoryEntry], limit: int) -> Optional[str]:
+        """
+        Cursor for the page after a list of entries.
         
-        return entries
+        Args:
+            entries: Entries of the current page
+            limit: Page size that was requested
+            
+        Returns:
+            Cursor token, or None when the page was not full
+        """
+        if not entries or len(entries) < limit:
+            return None
+        last = entries[-1]
+        return encode_cursor(last.watched_at, as_object_id(last.id))
     
     async def count_user_history(self, user_id: str) -> int:
         """
@@ -267,80 +407,13 @@ class WatchHistoryCRUD:
         
         return result.deleted_count > 0
     
-    async def get_stats_by_timeframe(
-        self, 
-        user_id: str, 
-        start_date: datetime,
-        end_date: datetime
-    ) -> Dict[str, Any]:
-        """
-        Get watch statistics for a specific timeframe.
-        
-        Args:
-            user_id: User ID
-            start_date: Start date for the timeframe
-            end_date: End date for the timeframe
-            
-        Returns:
-            Dictionary with watch statistics
-        """
-        # Match entries for user_id within timeframe
-        pipeline = [
-            {
-                "$match": {
-                    "user_id": user_id,
-                    "watched_at": {
-                        "$gte": start_date,
-                        "$lte": end_date
-                    }
-                }
-            },
-            {
-                "$group": {
-                    "_id": None,
-                    "total_movies": {"$sum": 1},
-                    "total_duration": {"$sum": "$watch_duration"},
-                    "movies": {"$push": "$movie_id"},
-                    "genres": {"$push": "$movie_details.genres"}
-                }
-            }
-        ]
-        
-        results = await self.collection.aggregate(pipeline).to_list(length=1)
-        
-        if not results:
-            return {
-                "total_movies": 0,
-                "total_minutes": 0,
-                "favorite_genre": None
-            }
-        
-        stats = results[0]
-        
-        # Calculate favorite genre if available
-        favorite_genre = None
-        if "genres" in stats and stats["genres"]:
-            # Flatten the list of genre lists
-            all_genres = [g for sublist in stats["genres"] for g in sublist if sublist]
-            
-            # Count genre occurrences
-            genre_counts = {}
-            for genre in all_genres:
-                genre_counts[genre] = genre_counts.get(genre, 0) + 1
-            
-            # Find the most common genre
-            if genre_counts:
-                favorite_genre = max(genre_counts.items(), key=lambda x: x[1])[0]
-        
-        return {
-            "total_movies": stats.get("total_movies", 0),
-            "total_minutes": stats.get("total_duration", 0) // 60,  # Convert seconds to minutes
-            "favorite_genre": favorite_genre
-        }
-    
     async def get_user_stats(self, user_id: str) -> Dict[str, Any]:
         """
-        Get comprehensive watch statistics for a user.
+        Get comprehensive watch statistics for a user from the daily rollups.
+        
+        Reads at most one user_watch_daily document per day of the past year; the
+        totals, the 12 weekly and 12 calendar-month series and the favorite genres
+        are summed in memory.
         
         Args:
             user_id: User ID
@@ -349,54 +422,45 @@ class WatchHistoryCRUD:
             Dictionary with various watch statistics
         """
         now = datetime.utcnow()
+        today = bucket_day(now)
+        tomorrow = today + timedelta(days=1)
+        # Cùng quy ước với TOP_PERIODS: khoảng thời gian tính cả hôm nay
+        periods = {period: today - timedelta(days=days - 1) for period, days in TOP_PERIODS.items()}
+        months = [month_start(now, months_back) for months_back in range(12)]
         
-        # Define timeframes
-        week_start = now - timedelta(days=7)
-        month_start = now - timedelta(days=30)
-        year_start = now - timedelta(days=365)
+        rollups = await get_daily_rollups(self.db, user_id, min(periods["year"], months[-1]))
         
-        # Get stats for each timeframe
-        weekly_stats = await self.get_stats_by_timeframe(user_id, week_start, now)
-        monthly_stats = await self.get_stats_by_timeframe(user_id, month_start, now)
-        yearly_stats = await self.get_stats_by_timeframe(user_id, year_start, now)
+        period_stats = [{"period": period, **summarize(rollups, start)} for period, start in periods.items()]
         
-        # Get stats by week for the past 12 weeks
+        # Tuần / tháng gần nhất đứng đầu
         weekly_breakdown = []
-        for i in range(12):
-            week_end = now - timedelta(days=i*7)
+        for week in range(1, 13):
+            week_end = tomorrow - timedelta(days=7 * (week - 1))
             week_start = week_end - timedelta(days=7)
-            week_stats = await self.get_stats_by_timeframe(user_id, week_start, week_end)
             weekly_breakdown.append({
-                "week": (now - week_start).days // 7,
+                "week": week,
                 "start_date": week_start,
-                "end_date": week_end,
-                "minutes_watched": week_stats["total_minutes"]
+                "end_date": min(week_end, now),
+                "minutes_watched": minutes_between(rollups, week_start, week_end)
             })
         
-        # Get stats by month for the past 12 months
-        monthly_breakdown = []
-        for i in range(12):
-            month_end = now.replace(day=1) - timedelta(days=i*30)
-            month_start = (month_end - timedelta(days=30)).replace(day=1)
-            month_stats = await self.get_stats_by_timeframe(user_id, month_start, month_end)
-            monthly_breakdown.append({
-                "month": month_start.strftime("%B"),
-                "year": month_start.year,
-                "start_date": month_start,
-                "end_date": month_end,
-                "minutes_watched": month_stats["total_minutes"]
-            })
+        monthly_breakdown = [
+            {
+                "month": start.strftime("%B"),
+                "year": start.year,
+                "start_date": start,
+                "end_date": month_start(start, -1),
+                "minutes_watched": minutes_between(rollups, start, month_start(start, -1))
+            }
+            for start in months
+        ]
         
-        # Combine all stats
+        yearly = period_stats[-1]
         return {
-            "total_movies": yearly_stats["total_movies"],
-            "total_minutes": yearly_stats["total_minutes"],
-            "favorite_genre": yearly_stats["favorite_genre"],
+            "total_movies": yearly["total_movies"],
+            "total_minutes": yearly["total_minutes"],
+            "favorite_genre": yearly["favorite_genre"],
             "weekly_stats": weekly_breakdown,
             "monthly_stats": monthly_breakdown,
-            "yearly_stats": {
-                "weekly": weekly_stats,
-                "monthly": monthly_stats,
-                "yearly": yearly_stats
-            }
-        } 
\ No newline at end of file
+            "yearly_stats": period_stats
+        }
@@ -11,6 +11,7 @@ from datetime import datetime
 from bson import ObjectId
 from bson.errors import InvalidId
 
+from ..utils.cursor import encode_cursor, decode_cursor, as_object_id, keyset_query
 from ..schemas.profile import WatchLaterEntry
 
 logger = logging.getLogger(__name__)
@@ -28,6 +29,12 @@ class WatchLaterCRUD:
         self.db = database
         self.collection = database.watch_later
     
+    async def ensure_indexes(self) -> None:
+        """
+        Create the index backing the per-user listing and its keyset pagination.
+        """
+        await self.collection.create_index([("user_id", 1), ("added_date", -1), ("_id", -1)])
+    
     async def create(self, obj_in: Dict[str, Any]) -> WatchLaterEntry:
         """
         Add a movie to watch later list.
@@ -147,8 +154,9 @@ class WatchLaterCRUD:
     async def get_user_list(
         self, 
         user_id: str, 
-        skip: int = 0, 
-        limit: int = 20
+        skip: int = 0,
+        limit: int = 20,
+        after: Optional[str] = None
     ) -> List[WatchLaterEntry]:
         """
         Get a user's watch later list with pagination.
@@ -157,12 +165,22 @@ class WatchLaterCRUD:
             user_id: User ID
             skip: Number of entries to skip
             limit: Maximum number of entries to return
+            after: Cursor from entry_cursor() of the last entry of the previous page
             
         Returns:
             List of watch later entries for the user
+            
+        Raises:
+            InvalidCursorError: If after is not a valid cursor
         """
-        cursor = self.collection.find({"user_id": user_id})\
-            .sort("added_date", -1)\
+        query = {"user_id": user_id}
+        if after:
+            # Keyset: seek theo (added_date, _id) thay vì skip qua các trang trước
+            last_added_date, last_id = decode_cursor(after, 2)
+            query.update(keyset_query("added_date", last_added_date, last_id))
+        
+        cursor = self.collection.find(query)\
+            .sort([("added_date", -1), ("_id", -1)])\
             .skip(skip)\
             .limit(limit)
         
@@ -184,6 +202,23 @@ class WatchLaterCRUD:
         
         return entries
     
+    @staticmethod
+    def entry_cursor(entries: List[WatchLaterEntry], limit: int) -> Optional[str]:
+        """
+        Cursor for the page after a list of entries.
+        
+        Args:
+            entries: Entries of the current page
+            limit: Page size that was requested
+            
+        Returns:
+            Cursor token, or None when the page was not full
+        """
+        if not entries or len(entries) < limit:
+            return None
+        last = entries[-1]
+        return encode_cursor(last.added_at, as_object_id(last.id))
+    
     async def count_user_list(self, user_id: str) -> int:
         """
         Count the number of watch later entries for a user.
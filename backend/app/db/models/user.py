@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Optional, List
+from typing import Optional, List, Dict
 from pydantic import BaseModel, Field, EmailStr
 from bson import ObjectId
 
@@ -24,6 +24,7 @@ class UserPreferences(BaseModel):
     """User preferences embedded object"""
     language: str = Field(default="vi", description="Preferred language (vi/en)")
     notifications_enabled: bool = Field(default=True, description="Enable notifications")
+    favorite_genres: List[str] = Field(default_factory=list, description="Genres chosen by the user")
 
 """
 User Model
@@ -40,7 +41,8 @@ Các fields:
 - birth_date: Ngày sinh
 - gender: Giới tính
 - role: Vai trò người dùng (user, admin)
-- preferences: Cài đặt cá nhân (language, notifications_enabled)
+- preferences: Cài đặt cá nhân (language, notifications_enabled, favorite_genres)
+- genre_affinity: Trọng số thể loại học từ lượt xem / xem hết (forward decay), dùng cho rail "for you"
 - is_active: Trạng thái tài khoản
 - is_google_auth: Tài khoản đăng nhập bằng Google
 - created_at: Thời gian tạo tài khoản
@@ -60,6 +62,7 @@ class UserModel(BaseModel):
     gender: Optional[str] = None  # male, female, other
     role: str = Field(default="user")  # user, admin
     preferences: UserPreferences = Field(default_factory=UserPreferences)
+    genre_affinity: Dict[str, float] = Field(default_factory=dict)
     is_active: bool = Field(default=True)
     is_google_auth: bool = Field(default=False)
     created_at: datetime = Field(default_factory=datetime.now)
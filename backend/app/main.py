@@ -6,6 +6,7 @@ Initializes the FastAPI app, includes routers, and sets up middleware.
 from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+import asyncio
 import logging
 import os
 
@@ -13,6 +14,13 @@ from .core.config import settings
 from .api import movies, auth, profiles, watch_stats, sync_routes, admin
 from .db.database import connect_to_mongodb, close_mongodb_connection, initialize_crud_modules, test_connection
 from .middleware.admin_middleware import AdminLoggingMiddleware, SecurityMiddleware
+from .services.search_index import movie_search_index
+from .services.view_stats import view_counter, ensure_view_indexes, run_view_stats
+from .services.movie_lsh import ensure_lsh_indexes
+from .services.watch_rollups import ensure_rollup_indexes
+from .crud.movie import MovieCRUD
+from .crud.watch_history import WatchHistoryCRUD
+from .crud.watch_later import WatchLaterCRUD
 
 # Configure logging
 logging.basicConfig(
@@ -41,6 +49,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Add admin security and logging middleware
@@ -82,6 +91,24 @@ async def startup_db_client():
                 logging.info(" MongoDB connection successful, CRUD modules initialized")
             else:
                 logging.error(" CRUD modules not properly initialized - db is None!")
+
+            # Ensure indexes used by movie filters and cursor pagination
+            await MovieCRUD(connected_db).ensure_indexes()
+            await WatchHistoryCRUD(connected_db).ensure_indexes()
+            await WatchLaterCRUD(connected_db).ensure_indexes()
+            await ensure_view_indexes(connected_db)
+            await ensure_lsh_indexes(connected_db)
+            await ensure_rollup_indexes(connected_db)
+
+            # Ghi lượt xem theo lô và tính lại top phim theo tuần/tháng/năm ở background
+            view_counter.start(connected_db)
+            app.state.view_stats_stop = asyncio.Event()
+            app.state.view_stats_task = asyncio.create_task(
+                run_view_stats(view_counter, connected_db, app.state.view_stats_stop)
+            )
+
+            # Build in-memory search index (search falls back to $regex until ready)
+            await movie_search_index.build(connected_db.movies)
         else:
             logging.warning("⚠️ Application running without MongoDB connection! Using fallback/local data only.")
             
@@ -94,6 +121,16 @@ async def startup_db_client():
 # Đóng kết nối MongoDB khi shutdown
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    view_stats_task = getattr(app.state, "view_stats_task", None)
+    if view_stats_task is not None:
+        # Không cancel: lô lượt xem đang được ghi sẽ bị mất. Báo vòng lặp dừng, chờ lần flush
+        # đang chạy (kể cả flush do add() khởi động) rồi mới ghi nốt phần còn lại
+        app.state.view_stats_stop.set()
+        try:
+            await view_stats_task
+            await view_counter.close()
+        except Exception as e:
+            logging.error(f" Error flushing view counts on shutdown: {e}")
     await close_mongodb_connection()
 
 @app.get("/")
@@ -1,7 +1,7 @@
 """
 Movie schemas for the FastAPI app. Defines the data models for movie-related operations.
 """
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Union
 from pydantic import BaseModel, Field, HttpUrl
 from datetime import datetime
 
@@ -44,6 +44,7 @@ class MovieUpdate(BaseModel):
 class MovieInDB(MovieBase):
     """Schema representing a movie as stored in the database"""
     id: str = Field(..., description="MongoDB document ID")
+    release_year: Optional[int] = Field(None, description="Release year derived from release_date")
     view_count: int = Field(default=0, description="Number of times the movie has been viewed")
     created_at: datetime = Field(..., description="Timestamp when the movie was added")
     updated_at: datetime = Field(..., description="Timestamp when the movie was last updated")
@@ -83,6 +84,38 @@ class MovieList(BaseModel):
     results: List[MovieOut] = Field(..., description="List of movies")
 
 
+class MovieCard(BaseModel):
+    """Compact schema for poster rows and list pages"""
+    id: str = Field(..., description="Movie ID")
+    title: str = Field(..., description="Movie title")
+    poster_path: Optional[str] = Field(None, description="Path to movie poster image")
+    backdrop_path: Optional[str] = Field(None, description="Path to movie backdrop image")
+    genres: List[str] = Field(default=[], description="List of movie genres")
+    release_year: Optional[int] = Field(None, description="Release year")
+    runtime: Optional[int] = Field(None, description="Movie duration in minutes")
+    vote_average: float = Field(default=0.0, description="Movie rating (0-10)")
+    view_count: int = Field(default=0, description="Number of times the movie has been viewed")
+    is_featured: bool = Field(default=False, description="Whether the movie is featured")
+
+    class Config:
+        from_attributes = True
+
+
+class MovieSuggestion(BaseModel):
+    """Schema for a title autocomplete suggestion"""
+    id: str = Field(..., description="Movie ID")
+    title: str = Field(..., description="Movie title")
+    poster_path: Optional[str] = Field(None, description="Path to movie poster image")
+
+
+class MovieViewerStats(BaseModel):
+    """Schema for views and approximate unique viewers of a movie over a period"""
+    movie_id: str = Field(..., description="Movie ID")
+    period: str = Field(..., description="week, month, year or all")
+    views: int = Field(default=0, description="Number of plays, replays included")
+    unique_viewers: int = Field(default=0, description="Approximate number of distinct viewers (HyperLogLog)")
+
+
 class Genre(BaseModel):
     """Schema for movie genres"""
     id: int = Field(..., description="Genre ID")
@@ -92,6 +125,34 @@ class MovieResponse(MovieInDB):
     """Schema for movie responses with all fields"""
     pass
 
+
+class SearchFacets(BaseModel):
+    """Schema for facet counts over a search result set"""
+    genres: Dict[str, int] = Field(default={}, description="Number of hits per genre")
+    years: Dict[str, int] = Field(default={}, description="Number of hits per release year")
+    rating_bands: Dict[str, int] = Field(default={}, description="Number of hits per vote_average band")
+
+
+class MovieSearchResponse(BaseModel):
+    """Schema for search results returned together with facet counts"""
+    results: Union[List[MovieResponse], List[MovieCard]] = Field(..., description="Requested page of movies")
+    facets: SearchFacets = Field(..., description="Facet counts over all hits")
+    next_cursor: Optional[str] = Field(None, description="Cursor for the next page (pass as after=)")
+
+
+class HomeRail(BaseModel):
+    """Schema for one row of the home page"""
+    key: str = Field(..., description="Rail key (featured, most_viewed, random, genre:<name>)")
+    title: str = Field(..., description="Rail title to display")
+    movie_ids: List[str] = Field(default=[], description="Movie IDs in display order")
+
+
+class HomePageResponse(BaseModel):
+    """Schema for the aggregated home page; each movie is sent once even if it is in several rails"""
+    rails: List[HomeRail] = Field(..., description="Home page rails in display order")
+    movies: Dict[str, MovieCard] = Field(..., description="Movie cards by ID")
+
+
 # Schema cho việc chuyển đổi dữ liệu từ TMDB sang model của chúng ta
 class TMDBMovieAdapter(BaseModel):
     """Adapter for converting TMDB movie data to our schema"""
@@ -59,6 +59,7 @@ class WatchHistoryResponse(BaseModel):
     total: int = Field(..., description="Total number of entries")
     page: int = Field(..., description="Current page number")
     limit: int = Field(..., description="Number of items per page")
+    next_cursor: Optional[str] = Field(None, description="Cursor for the next page (pass as after=)")
 
 
 class WatchStatsResponse(BaseModel):
@@ -68,7 +69,9 @@ class WatchStatsResponse(BaseModel):
     favorite_genre: Optional[str] = Field(None, description="Most watched genre")
     weekly_stats: List[Dict[str, Any]] = Field(..., description="Watch statistics by week")
     monthly_stats: List[Dict[str, Any]] = Field(..., description="Watch statistics by month")
-    yearly_stats: List[Dict[str, Any]] = Field(..., description="Watch statistics by year")
+    yearly_stats: List[Dict[str, Any]] = Field(
+        ..., description="Totals and favorite genre over the past week, month and year"
+    )
 
 
 class WatchLaterEntry(BaseModel):
@@ -89,4 +92,5 @@ class WatchLaterResponse(BaseModel):
     items: List[WatchLaterEntry] = Field(..., description="List of watch later entries")
     total: int = Field(..., description="Total number of entries")
     page: int = Field(..., description="Current page number")
-    limit: int = Field(..., description="Number of items per page") 
\ No newline at end of file
+    limit: int = Field(..., description="Number of items per page")
+    next_cursor: Optional[str] = Field(None, description="Cursor for the next page (pass as after=)") 
\ No newline at end of file
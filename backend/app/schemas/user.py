@@ -1,4 +1,4 @@
-from typing import Optional, List
+from typing import Optional, List, Dict
 from datetime import datetime, date
 from pydantic import BaseModel, EmailStr, Field, validator
 from enum import Enum
@@ -34,6 +34,7 @@ class UserPreferences(BaseModel):
     """User preferences schema"""
     language: str = Field(default="vi", description="Preferred language (vi/en)")
     notifications_enabled: bool = Field(default=True, description="Enable notifications")
+    favorite_genres: List[str] = Field(default_factory=list, description="Genres chosen by the user")
 
 
 class Token(BaseModel):
@@ -127,6 +128,9 @@ class UserInDB(UserBase):
     role: Role = Field(default=Role.USER, description="User role")
     preferences: UserPreferences = Field(default_factory=UserPreferences, description="User preferences")
     settings: UserSettings = Field(default_factory=UserSettings)
+    genre_affinity: Dict[str, float] = Field(
+        default_factory=dict, description="Forward-decayed genre weights learned from views"
+    )
 
     class Config:
         from_attributes = True
@@ -0,0 +1,265 @@
+"""
+Content-based movie similarity from TF-IDF of the normalized title and description.
+Văn bản đã được clean_query chuẩn hoá (bỏ dấu, chữ thường) nên chỉ cần tách từ; ngoài từ đơn
+còn dùng cặp âm tiết liền nhau vì phần lớn từ tiếng Việt có hai âm tiết. Cosine top-k chỉ
+được tính trên các cặp ứng viên lấy từ index LSH (movie_lsh) thay vì mọi cặp phim, trong process
+pool để không chặn event loop; kết quả lưu trong collection similar_movies (_id = id phim).
+"""
+
+import asyncio
+import logging
+import math
+import os
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from pymongo import DeleteOne, ReplaceOne
+from scipy import sparse
+
+from ..utils.cursor import as_object_id
+from ..utils.text import clean_query
+
+logger = logging.getLogger(__name__)
+
+SIMILAR_TOP_K = 20
+# Số cặp ứng viên được nhân trong một lần để giới hạn bộ nhớ
+PAIR_BLOCK_SIZE = 65536
+# Bucket LSH quá lớn thường do cặp từ phổ biến, bỏ qua để số cặp không tăng theo bình phương
+MAX_BUCKET_SIZE = 500
+# Từ trong tiêu đề được tính nặng hơn từ trong mô tả
+TITLE_WEIGHT = 2
+# Bỏ các từ xuất hiện ở quá nhiều phim (gần như stopword)
+MAX_DOCUMENT_FREQUENCY = 0.5
+
+TEXT_PROJECTION = {"normalized_title": 1, "normalized_description": 1, "title": 1, "overview": 1}
+
+
+def document_text(doc: Dict[str, Any]) -> Tuple[str, str]:
+    """Normalized (title, description) of a movie document, normalizing on the fly if missing"""
+    return (
+        doc.get("normalized_title") or clean_query(doc.get("title") or ""),
+        doc.get("normalized_description") or clean_query(doc.get("overview") or ""),
+    )
+
+
+def document_terms(title: str, description: str) -> Counter:
+    """
+    Weighted term counts of a movie (unigrams and syllable bigrams).
+
+    Args:
+        title: Normalized title
+        description: Normalized description
+
+    Returns:
+        Term -> weighted count
+    """
+    terms: Counter = Counter()
+    for text, weight in ((title, TITLE_WEIGHT), (description, 1)):
+        tokens = text.split()
+        for term in tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]:
+            terms[term] += weight
+    return terms
+
+
+def document_frequencies(documents: List[Counter]) -> Dict[str, int]:
+    """
+    Document frequency of the terms kept for similarity.
+
+    Terms found in a single movie cannot make two movies similar and terms found in more than
+    MAX_DOCUMENT_FREQUENCY of the movies are near stopwords, so both are dropped.
+
+    Args:
+        documents: Output of document_terms() for each movie
+
+    Returns:
+        Term -> number of movies containing it, for the kept terms only
+    """
+    document_frequency: Counter = Counter()
+    for terms in documents:
+        document_frequency.update(terms.keys())
+
+    max_frequency = max(2, MAX_DOCUMENT_FREQUENCY * len(documents))
+    return {term: frequency for term, frequency in document_frequency.items() if 2 <= frequency <= max_frequency}
+
+
+def tfidf_matrix(texts: List[Tuple[str, str]]) -> sparse.csr_matrix:
+    """
+    L2-normalized TF-IDF matrix (sublinear TF, smoothed IDF).
+
+    Only the terms kept by document_frequencies() get a column.
+    Runs in a worker process.
+
+    Args:
+        texts: Normalized (title, description) of each movie
+
+    Returns:
+        Sparse matrix of shape (movies, terms)
+    """
+    documents = [document_terms(title, description) for title, description in texts]
+    document_frequency = document_frequencies(documents)
+    vocabulary = {term: column for column, term in enumerate(document_frequency)}
+    idf = {
+        term: math.log((1 + len(documents)) / (1 + document_frequency[term])) + 1
+        for term in vocabulary
+    }
+
+    rows, columns, values = [], [], []
+    for row, terms in enumerate(documents):
+        for term, count in terms.items():
+            column = vocabulary.get(term)
+            if column is not None:
+                rows.append(row)
+                columns.append(column)
+                values.append((1 + math.log(count)) * idf[term])
+
+    matrix = sparse.csr_matrix(
+        (np.asarray(values, dtype=np.float32), (rows, columns)),
+        shape=(len(documents), len(vocabulary))
+    )
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return sparse.csr_matrix(sparse.diags(1.0 / norms) @ matrix)
+
+
+def candidate_pairs(band_lists: List[List[str]]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Ordered pairs of movies sharing at least one LSH bucket.
+
+    Runs in a worker process.
+
+    Args:
+        band_lists: LSH band keys of each movie (row)
+
+    Returns:
+        (rows, candidate rows), sorted by row, without duplicates or self pairs
+    """
+    buckets: Dict[str, List[int]] = defaultdict(list)
+    for row, keys in enumerate(band_lists):
+        for key in keys:
+            buckets[key].append(row)
+
+    size = len(band_lists)
+    pairs = []
+    for members in buckets.values():
+        if 2 <= len(members) <= MAX_BUCKET_SIZE:
+            first, second = np.meshgrid(members, members, indexing="ij")
+            different = first != second
+            pairs.append(first[different].astype(np.int64) * size + second[different])
+    if not pairs:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+    encoded = np.unique(np.concatenate(pairs))
+    return encoded // size, encoded % size
+
+
+def rank_candidates(
+    matrix: sparse.csr_matrix,
+    rows: np.ndarray,
+    candidates: np.ndarray,
+    k: int
+) -> List[Tuple[int, List[Tuple[int, float]]]]:
+    """
+    Exact cosine of the candidate pairs and the top-k candidates of each row.
+
+    Runs in a worker process.
+
+    Args:
+        matrix: L2-normalized TF-IDF matrix
+        rows: Row of each pair
+        candidates: Candidate row of each pair
+        k: Number of neighbors to keep
+
+    Returns:
+        [(row, [(neighbor row, score)] best first)] for rows with at least one positive score
+    """
+    scores = np.concatenate([
+        np.asarray(
+            matrix[rows[start:start + PAIR_BLOCK_SIZE]]
+            .multiply(matrix[candidates[start:start + PAIR_BLOCK_SIZE]])
+            .sum(axis=1)
+        ).ravel()
+        for start in range(0, len(rows), PAIR_BLOCK_SIZE)
+    ] or [np.empty(0)])
+    positive = scores > 0
+    rows, candidates, scores = rows[positive], candidates[positive], scores[positive]
+    if not len(rows):
+        return []
+
+    order = np.lexsort((-scores, rows))
+    rows, candidates, scores = rows[order], candidates[order], scores[order]
+    boundaries = np.flatnonzero(np.diff(rows)) + 1
+    result = []
+    for start, end in zip(np.r_[0, boundaries], np.r_[boundaries, len(rows)]):
+        end = min(end, start + k)
+        result.append((
+            int(rows[start]),
+            [(int(candidates[i]), round(float(scores[i]), 6)) for i in range(start, end)]
+        ))
+    return result
+
+
+async def build_similar_movies(db, k: int = SIMILAR_TOP_K, workers: Optional[int] = None) -> int:
+    """
+    Recompute the content-based neighbors of every movie (offline job).
+
+    Candidates come from the movie_lsh index, so build_lsh_index() must have run first.
+    Movies without any candidate get no list and are served from the LSH index or the related movies.
+
+    Args:
+        db: Motor database
+        k: Number of neighbors per movie
+        workers: Worker processes (defaults to the CPU count)
+
+    Returns:
+        Number of movies written
+    """
+    docs = await db.movies.find({}, TEXT_PROJECTION).sort("_id", 1).to_list(length=None)
+    if not docs:
+        return 0
+    movie_ids = [str(doc["_id"]) for doc in docs]
+    texts = [document_text(doc) for doc in docs]
+    bands = {str(entry["_id"]): entry.get("bands", []) async for entry in db.movie_lsh.find({}, {"bands": 1})}
+
+    workers = workers or os.cpu_count() or 1
+    loop = asyncio.get_running_loop()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        matrix, (rows, candidates) = await asyncio.gather(
+            loop.run_in_executor(pool, tfidf_matrix, texts),
+            loop.run_in_executor(pool, candidate_pairs, [bands.get(movie_id, []) for movie_id in movie_ids])
+        )
+        # Các cặp đã sắp theo hàng, mỗi process nhận một đoạn hàng liên tiếp
+        chunk = math.ceil(len(movie_ids) / workers)
+        bounds = np.searchsorted(rows, np.arange(0, len(movie_ids) + chunk, chunk))
+        parts = await asyncio.gather(*(
+            loop.run_in_executor(pool, rank_candidates, matrix, rows[start:end], candidates[start:end], k)
+            for start, end in zip(bounds, bounds[1:]) if end > start
+        ))
+
+    neighbors = dict(item for part in parts for item in part)
+    now = datetime.utcnow()
+    operations: List[Any] = [
+        ReplaceOne(
+            {"_id": as_object_id(movie_ids[row])},
+            {
+                "similar": [{"movie_id": movie_ids[neighbor], "score": score} for neighbor, score in similar],
+                "updated_at": now
+            },
+            upsert=True
+        )
+        for row, similar in neighbors.items()
+    ]
+    stale = await db.similar_movies.distinct(
+        "_id", {"_id": {"$nin": [as_object_id(movie_ids[row]) for row in neighbors]}}
+    )
+    operations.extend(DeleteOne({"_id": movie_id}) for movie_id in stale)
+    if operations:
+        await db.similar_movies.bulk_write(operations, ordered=False)
+
+    logger.info(
+        f"Similar movies built for {len(neighbors)} of {len(movie_ids)} movies from {len(rows)} LSH candidate "
+        f"pairs over {matrix.shape[1]} terms with {workers} workers, removed {len(stale)} stale lists"
+    )
+    return len(neighbors)
@@ -0,0 +1,160 @@
+"""
+Per-user genre affinity for the "for you" rail.
+Mỗi lượt xem / xem hết cộng trọng số vào users.genre_affinity bằng một lệnh $inc (forward decay:
+trọng số nhân 2^(t / chu kỳ bán rã) nên sự kiện cũ tự nhỏ dần khi vector được chuẩn hoá, không cần
+job giảm dần). Lúc phục vụ, vector người dùng (gộp với thể loại yêu thích trong preferences) được
+nhân với ma trận thể loại của toàn bộ phim đã cache trong một phép NumPy.
+"""
+
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+import numpy as np
+
+from ..utils.cursor import as_object_id
+
+AFFINITY_HALF_LIFE_DAYS = 30
+AFFINITY_EPOCH = datetime(2025, 1, 1)
+
+VIEW_WEIGHT = 1.0
+# Xem hết phim là tín hiệu thích mạnh hơn một lượt bấm xem
+COMPLETION_WEIGHT = 2.0
+# Phần của vector dành cho thể loại người dùng tự chọn trong preferences
+PREFERENCE_WEIGHT = 0.3
+# Điểm đánh giá chỉ dùng để phân thứ tự giữa các phim cùng mức độ hợp thể loại
+RATING_WEIGHT = 0.05
+
+GENRE_PROJECTION = {"genres": 1, "vote_average": 1}
+
+
+def genre_key(genre: str) -> str:
+    """Field name of a genre inside users.genre_affinity (MongoDB field names cannot contain dots)"""
+    return genre.replace(".", "_").lstrip("$")
+
+
+def affinity_scale(now: Optional[datetime] = None) -> float:
+    """Forward-decay multiplier of an event happening at now"""
+    days = ((now or datetime.utcnow()) - AFFINITY_EPOCH).total_seconds() / 86400
+    return 2.0 ** (days / AFFINITY_HALF_LIFE_DAYS)
+
+
+async def record_genre_event(
+    db,
+    user_id: str,
+    genres: Iterable[str],
+    weight: float = VIEW_WEIGHT,
+    now: Optional[datetime] = None
+) -> None:
+    """
+    Add a view or completion of a movie to the user's genre affinity.
+
+    The weight is split across the movie's genres so that movies with many genres do not count more.
+
+    Args:
+        db: Motor database
+        user_id: User ID
+        genres: Genres of the watched movie
+        weight: VIEW_WEIGHT or COMPLETION_WEIGHT
+        now: Event time (defaults to the current time)
+    """
+    genres = {genre_key(genre) for genre in genres if genre}
+    if not genres:
+        return
+    increment = weight * affinity_scale(now) / len(genres)
+    await db.users.update_one(
+        {"_id": as_object_id(user_id)},
+        {"$inc": {f"genre_affinity.{genre}": increment for genre in genres}}
+    )
+
+
+async def record_completion(db, user_id: str, movie_id: str) -> None:
+    """
+    Add a completed movie to the user's genre affinity.
+
+    Args:
+        db: Motor database
+        user_id: User ID
+        movie_id: Movie ID
+    """
+    movie = await db.movies.find_one({"_id": as_object_id(movie_id)}, {"genres": 1})
+    if movie:
+        await record_genre_event(db, user_id, movie.get("genres") or [], COMPLETION_WEIGHT)
+
+
+class MovieGenreMatrix:
+    """L2-normalized genre vectors and ratings of every movie"""
+
+    def __init__(self, docs: List[Dict[str, Any]]):
+        self.ids: List[str] = [str(doc["_id"]) for doc in docs]
+        self.rows: Dict[str, int] = {movie_id: row for row, movie_id in enumerate(self.ids)}
+        genres = sorted({genre_key(genre) for doc in docs for genre in doc.get("genres") or []})
+        self.columns: Dict[str, int] = {genre: column for column, genre in enumerate(genres)}
+
+        self.vectors = np.zeros((len(docs), len(genres)), dtype=np.float32)
+        for row, doc in enumerate(docs):
+            for genre in doc.get("genres") or []:
+                self.vectors[row, self.columns[genre_key(genre)]] = 1.0
+        norms = np.linalg.norm(self.vectors, axis=1, keepdims=True)
+        self.vectors /= np.maximum(norms, 1.0)
+        self.ratings = np.array([float(doc.get("vote_average") or 0.0) / 10.0 for doc in docs], dtype=np.float32)
+
+    def user_vector(self, affinity: Dict[str, float], favorite_genres: Iterable[str]) -> np.ndarray:
+        """
+        Unit-length genre vector of a user.
+
+        Args:
+            affinity: users.genre_affinity (forward-decayed weights)
+            favorite_genres: Genres chosen in the user's preferences
+
+        Returns:
+            Vector over self.columns; all zeros when the user has no signal yet
+        """
+        # float64: trọng số forward decay tăng theo thời gian, vượt phạm vi float32 sau khoảng 10 năm
+        learned = np.zeros(len(self.columns), dtype=np.float64)
+        for genre, weight in (affinity or {}).items():
+            column = self.columns.get(genre)
+            if column is not None:
+                learned[column] = weight
+
+        preferred = np.zeros(len(self.columns), dtype=np.float32)
+        for genre in favorite_genres or []:
+            column = self.columns.get(genre_key(genre))
+            if column is not None:
+                preferred[column] = 1.0
+
+        vector = np.zeros(len(self.columns), dtype=np.float32)
+        for part, weight in ((learned, 1.0 - PREFERENCE_WEIGHT), (preferred, PREFERENCE_WEIGHT)):
+            if part.any():
+                vector += weight * part / np.linalg.norm(part)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def top(self, user_vector: np.ndarray, exclude: Set[str], limit: int) -> List[str]:
+        """
+        Movies with the best dot product against the user vector.
+
+        Args:
+            user_vector: Vector from user_vector()
+            exclude: Movie IDs to skip (already watched)
+            limit: Number of movies to return
+
+        Returns:
+            Movie IDs, best first; only movies sharing at least one genre with the user
+        """
+        if not self.ids or not user_vector.any():
+            return []
+        affinity = self.vectors @ user_vector
+        scores = np.where(affinity > 0, affinity + RATING_WEIGHT * self.ratings, -np.inf)
+        if exclude:
+            scores[[self.rows[movie_id] for movie_id in exclude if movie_id in self.rows]] = -np.inf
+
+        limit = min(limit, len(scores))
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [self.ids[row] for row in top if np.isfinite(scores[row])]
+
+
+async def load_genre_matrix(db) -> MovieGenreMatrix:
+    """Build the genre matrix of the whole catalogue"""
+    docs = await db.movies.find({}, GENRE_PROJECTION).to_list(length=None)
+    return MovieGenreMatrix(docs)
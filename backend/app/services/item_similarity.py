@@ -0,0 +1,140 @@
+"""
+Item-to-item collaborative filtering from watch_history.
+Job offline dựng ma trận thưa người dùng × phim (SciPy), tính cosine giữa các cột phim
+bằng một phép nhân ma trận thưa, rồi lưu top-k phim hàng xóm của mỗi phim vào movie_neighbors.
+API gợi ý chỉ đọc danh sách hàng xóm của các phim vừa xem và gộp trong bộ nhớ.
+"""
+
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+from pymongo import DeleteOne, ReplaceOne
+from scipy import sparse
+
+from ..utils.cursor import as_object_id
+
+logger = logging.getLogger(__name__)
+
+NEIGHBORS_TOP_K = 30
+# Hai phim phải có ít nhất MIN_CO_VIEWERS người xem chung mới được coi là hàng xóm
+MIN_CO_VIEWERS = 2
+# Cộng vào mẫu số để cặp phim ít người xem không có cosine cao bất thường
+SHRINKAGE = 5.0
+
+# Gợi ý dựa trên RECENT_HISTORY_SIZE phim xem gần nhất, phim xem càng lâu trọng số càng nhỏ
+RECENT_HISTORY_SIZE = 20
+RECENCY_DECAY = 0.9
+
+
+def build_interaction_matrix(entries: List[Dict[str, Any]]) -> Tuple[sparse.csr_matrix, List[str]]:
+    """
+    Binary user × movie matrix from watch history entries.
+
+    Args:
+        entries: Documents with user_id and movie_id
+
+    Returns:
+        (matrix, movie IDs of the columns)
+    """
+    users: Dict[str, int] = {}
+    movies: Dict[str, int] = {}
+    rows, columns = [], []
+    for entry in entries:
+        rows.append(users.setdefault(str(entry["user_id"]), len(users)))
+        columns.append(movies.setdefault(str(entry["movie_id"]), len(movies)))
+
+    matrix = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.float32), (rows, columns)),
+        shape=(len(users), len(movies))
+    )
+    # Một người xem lại nhiều lần vẫn chỉ tính là một tương tác
+    matrix.data[:] = 1.0
+    return matrix, list(movies)
+
+
+def item_neighbors(
+    matrix: sparse.csr_matrix,
+    movie_ids: List[str],
+    k: int = NEIGHBORS_TOP_K
+) -> Dict[str, List[Tuple[str, float]]]:
+    """
+    Top-k most similar movies of every movie by shrunk cosine over co-viewers.
+
+    Args:
+        matrix: Binary user × movie matrix
+        movie_ids: Movie ID of each column
+        k: Number of neighbors to keep
+
+    Returns:
+        Movie ID -> [(neighbor ID, score)], best first
+    """
+    columns = matrix.tocsc()
+    co_viewers = (columns.T @ columns).tocsr()
+    viewers = np.asarray(columns.sum(axis=0)).ravel()
+
+    result: Dict[str, List[Tuple[str, float]]] = {}
+    for row, movie_id in enumerate(movie_ids):
+        start, end = co_viewers.indptr[row], co_viewers.indptr[row + 1]
+        candidates = co_viewers.indices[start:end]
+        counts = co_viewers.data[start:end]
+
+        keep = (candidates != row) & (counts >= MIN_CO_VIEWERS)
+        candidates, counts = candidates[keep], counts[keep]
+        if not len(candidates):
+            continue
+
+        scores = counts / (np.sqrt(viewers[row] * viewers[candidates]) + SHRINKAGE)
+        if len(scores) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+            candidates, scores = candidates[top], scores[top]
+        order = np.argsort(-scores, kind="stable")
+        result[movie_id] = [
+            (movie_ids[candidates[i]], round(float(scores[i]), 6)) for i in order
+        ]
+    return result
+
+
+async def build_movie_neighbors(db, k: int = NEIGHBORS_TOP_K) -> int:
+    """
+    Recompute the collaborative-filtering neighbors of every movie (offline job).
+
+    Args:
+        db: Motor database
+        k: Number of neighbors per movie
+
+    Returns:
+        Number of movies with at least one neighbor
+    """
+    entries = await db.watch_history.find({}, {"_id": 0, "user_id": 1, "movie_id": 1}).to_list(length=None)
+    if not entries:
+        return 0
+
+    matrix, movie_ids = build_interaction_matrix(entries)
+    neighbors = item_neighbors(matrix, movie_ids, k)
+
+    now = datetime.utcnow()
+    operations: List[Any] = [
+        ReplaceOne(
+            {"_id": as_object_id(movie_id)},
+            {
+                "neighbors": [{"movie_id": neighbor_id, "score": score} for neighbor_id, score in related],
+                "updated_at": now
+            },
+            upsert=True
+        )
+        for movie_id, related in neighbors.items()
+    ]
+    stale = await db.movie_neighbors.distinct(
+        "_id", {"_id": {"$nin": [as_object_id(movie_id) for movie_id in neighbors]}}
+    )
+    operations.extend(DeleteOne({"_id": movie_id}) for movie_id in stale)
+    if operations:
+        await db.movie_neighbors.bulk_write(operations, ordered=False)
+
+    logger.info(
+        f"Movie neighbors built from {matrix.nnz} views by {matrix.shape[0]} users: "
+        f"{len(neighbors)} movies, removed {len(stale)} stale lists"
+    )
+    return len(neighbors)
@@ -0,0 +1,22 @@
+"""
+Shared response cache for the home-page movie rails.
+Cache được xoá khi MovieCRUD create/update/delete hoặc khi MovieSyncService upsert phim;
+lượt xem tăng dần chỉ được phản ánh khi TTL của rail hết hạn.
+"""
+
+from ..utils.cache import TTLCache
+
+# TTL (giây) cho từng rail
+RAIL_TTLS = {
+    "featured": 300,
+    "most_viewed": 60,
+    "movies": 120,
+    "top": 60,
+    "trending": 60,
+    "genre_matrix": 300,
+}
+
+MOVIE_CACHE_SIZE = 512
+
+# Cache dùng chung cho toàn bộ ứng dụng
+movie_cache = TTLCache(max_size=MOVIE_CACHE_SIZE)
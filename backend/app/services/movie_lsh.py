@@ -0,0 +1,200 @@
+"""
+MinHash LSH index over movie features (genres and title/description terms).
+Mỗi phim lưu một document trong movie_lsh (_id = id phim) gồm các khoá band và tập đặc trưng;
+index multikey trên bands cho phép tìm phim ứng viên bằng một truy vấn thay vì so với toàn bộ
+danh mục, sau đó xếp hạng lại ứng viên bằng Jaccard chính xác. Từ được lọc theo cùng tần suất
+tài liệu với TF-IDF (bộ từ lưu trong movie_lsh_terms) để các âm tiết phổ biến không kéo độ tương đồng
+nền lên. Index được cập nhật theo từng phim khi MovieSyncService thêm hoặc sửa phim.
+"""
+
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from pymongo import DeleteOne, ReplaceOne, UpdateOne
+
+from .content_similarity import TEXT_PROJECTION, document_frequencies, document_terms, document_text
+from ..utils.cursor import as_object_id
+from ..utils.minhash import MinHash
+
+logger = logging.getLogger(__name__)
+
+# 64 band x 3 hàng, ngưỡng ~(1/64)^(1/3) = 0.25: cặp phim có Jaccard 0.05 thành ứng viên với xác suất
+# ~0.8%, 0.1 ~6%, 0.2 ~40%, 0.3 ~82%. Với 2 hàng mỗi band, độ tương đồng nền (~0.05) đã cho ~15%
+# số cặp nên số ứng viên vẫn tăng theo bình phương số phim.
+LSH_BANDS = 64
+LSH_ROWS = 3
+# Chỉ xếp hạng lại các ứng viên chung nhiều band nhất
+LSH_MAX_CANDIDATES = 200
+
+LSH_PROJECTION = {**TEXT_PROJECTION, "genres": 1}
+
+TERM_BATCH_SIZE = 1000
+
+movie_minhash = MinHash(LSH_BANDS * LSH_ROWS)
+
+
+def movie_features(doc: Dict[str, Any], vocabulary: Optional[Set[str]] = None) -> Set[str]:
+    """
+    Feature set of a movie: its genres and the same terms as its TF-IDF row.
+
+    Args:
+        doc: Movie document
+        vocabulary: Terms kept by document_frequencies(); None keeps every term
+
+    Returns:
+        Set of features
+    """
+    terms = document_terms(*document_text(doc))
+    features = {f"genre:{genre}" for genre in doc.get("genres") or []}
+    features.update(terms if vocabulary is None else (term for term in terms if term in vocabulary))
+    return features
+
+
+def lsh_entry(doc: Dict[str, Any], vocabulary: Optional[Set[str]] = None) -> Dict[str, Any]:
+    """movie_lsh document of a movie (band keys and sorted features)"""
+    features = movie_features(doc, vocabulary)
+    return {
+        "bands": movie_minhash.band_keys(movie_minhash.signature(features), LSH_BANDS),
+        "features": sorted(features),
+        "updated_at": datetime.utcnow()
+    }
+
+
+def jaccard(first: Set[str], second: Set[str]) -> float:
+    """Exact Jaccard similarity of two feature sets"""
+    union = len(first | second)
+    return len(first & second) / union if union else 0.0
+
+
+async def ensure_lsh_indexes(db) -> None:
+    """Create the multikey index used for bucket lookups"""
+    await db.movie_lsh.create_index("bands")
+
+
+async def load_vocabulary(db, terms: Iterable[str]) -> Optional[Set[str]]:
+    """
+    Which of the given terms are in the vocabulary of the last build_lsh_index().
+
+    Args:
+        db: Motor database
+        terms: Candidate terms
+
+    Returns:
+        Kept terms, or None if the vocabulary has not been built yet
+    """
+    terms = list(set(terms))
+    kept = {
+        entry["_id"]
+        for start in range(0, len(terms), TERM_BATCH_SIZE)
+        for entry in await db.movie_lsh_terms.find(
+            {"_id": {"$in": terms[start:start + TERM_BATCH_SIZE]}}, {"_id": 1}
+        ).to_list(length=None)
+    }
+    if not kept and await db.movie_lsh_terms.find_one({}, {"_id": 1}) is None:
+        return None
+    return kept
+
+
+async def build_lsh_index(db) -> int:
+    """
+    Rebuild the term vocabulary and the LSH entries of every movie.
+
+    Args:
+        db: Motor database
+
+    Returns:
+        Number of movies indexed
+    """
+    docs = await db.movies.find({}, LSH_PROJECTION).to_list(length=None)
+    document_frequency = document_frequencies([document_terms(*document_text(doc)) for doc in docs])
+    vocabulary = set(document_frequency)
+
+    # Ghi đè bộ từ theo mốc built_at rồi xoá từ cũ, update_lsh_index không bao giờ thấy bộ từ rỗng
+    built_at = datetime.utcnow()
+    term_operations = [
+        UpdateOne(
+            {"_id": term},
+            {"$set": {"document_frequency": frequency, "built_at": built_at}},
+            upsert=True
+        )
+        for term, frequency in document_frequency.items()
+    ]
+    for start in range(0, len(term_operations), TERM_BATCH_SIZE):
+        await db.movie_lsh_terms.bulk_write(term_operations[start:start + TERM_BATCH_SIZE], ordered=False)
+    await db.movie_lsh_terms.delete_many({"built_at": {"$ne": built_at}})
+
+    movie_ids = [doc["_id"] for doc in docs]
+    operations: List[Any] = [ReplaceOne({"_id": doc["_id"]}, lsh_entry(doc, vocabulary), upsert=True) for doc in docs]
+
+    stale = await db.movie_lsh.distinct("_id", {"_id": {"$nin": movie_ids}})
+    operations.extend(DeleteOne({"_id": movie_id}) for movie_id in stale)
+    if operations:
+        await db.movie_lsh.bulk_write(operations, ordered=False)
+
+    logger.info(
+        f"LSH index built for {len(movie_ids)} movies over {len(vocabulary)} terms, "
+        f"removed {len(stale)} stale entries"
+    )
+    return len(movie_ids)
+
+
+async def update_lsh_index(db, movie_ids: Iterable[str]) -> int:
+    """
+    Re-index only the given movies after they were added, updated or deleted.
+
+    Terms are filtered with the vocabulary of the last full build; terms new to the
+    catalogue are only used once build_lsh_index() runs again.
+
+    Args:
+        db: Motor database
+        movie_ids: IDs of the touched movies
+
+    Returns:
+        Number of entries written
+    """
+    object_ids = [as_object_id(movie_id) for movie_id in {str(movie_id) for movie_id in movie_ids}]
+    if not object_ids:
+        return 0
+
+    docs = await db.movies.find({"_id": {"$in": object_ids}}, LSH_PROJECTION).to_list(length=None)
+    vocabulary = await load_vocabulary(db, (term for doc in docs for term in document_terms(*document_text(doc))))
+    operations: List[Any] = [ReplaceOne({"_id": doc["_id"]}, lsh_entry(doc, vocabulary), upsert=True) for doc in docs]
+    found = {doc["_id"] for doc in docs}
+    operations.extend(DeleteOne({"_id": movie_id}) for movie_id in object_ids if movie_id not in found)
+    await db.movie_lsh.bulk_write(operations, ordered=False)
+    return len(docs)
+
+
+async def lsh_neighbors(db, movie_id: str, limit: int = 10) -> Optional[List[Tuple[str, float]]]:
+    """
+    Most similar movies found through the LSH buckets, re-ranked by exact Jaccard similarity.
+
+    Args:
+        db: Motor database
+        movie_id: Movie ID
+        limit: Maximum number of neighbors
+
+    Returns:
+        [(neighbor ID, score)] best first, or None if the movie is not indexed
+    """
+    entry = await db.movie_lsh.find_one({"_id": as_object_id(movie_id)}, {"bands": 1, "features": 1})
+    if entry is None:
+        return None
+    if not entry.get("bands"):
+        return []
+
+    candidates = await db.movie_lsh.aggregate([
+        {"$match": {"bands": {"$in": entry["bands"]}, "_id": {"$ne": entry["_id"]}}},
+        {"$project": {"features": 1, "shared": {"$size": {"$setIntersection": ["$bands", entry["bands"]]}}}},
+        {"$sort": {"shared": -1, "_id": 1}},
+        {"$limit": LSH_MAX_CANDIDATES}
+    ]).to_list(length=None)
+
+    features = set(entry.get("features", []))
+    scored = [
+        (str(candidate["_id"]), round(jaccard(features, set(candidate.get("features", []))), 6))
+        for candidate in candidates
+    ]
+    scored.sort(key=lambda item: -item[1])
+    return [item for item in scored if item[1] > 0][:limit]
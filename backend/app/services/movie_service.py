@@ -15,14 +15,22 @@ Handles business logic for movie-related operations including:
 #
 # lấy phim theo id
 # tăng view count cho phim lưu lại lich sử xem của người dùng
+import asyncio
 import logging
-from typing import List, Optional
-import random
-from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple, Union
+from datetime import datetime, timedelta
 
 from ..crud.movie import MovieCRUD
 from ..crud.watch_history import WatchHistoryCRUD
-from ..schemas.movie import MovieInDB, MovieResponse
+from .movie_cache import movie_cache, RAIL_TTLS
+from .view_stats import view_counter, bucket_day, TOP_PERIODS
+from .item_similarity import RECENT_HISTORY_SIZE, RECENCY_DECAY
+from .genre_affinity import record_genre_event, VIEW_WEIGHT
+from .search_index import movie_search_index
+from ..schemas.movie import (
+    MovieInDB, MovieCard, MovieResponse, MovieSuggestion, MovieSearchResponse, SearchFacets,
+    HomeRail, HomePageResponse, MovieViewerStats
+)
 
 
 logger = logging.getLogger(__name__)
@@ -41,74 +49,284 @@ class MovieService:
         self.movie_crud = movie_crud
         self.watch_history_crud = watch_history_crud
 
-    async def get_movies(self, skip: int = 0, limit: int = 20) -> List[MovieResponse]:
+    @staticmethod
+    def _present(movies: List[Union[MovieInDB, MovieCard]], card: bool) -> Union[List[MovieResponse], List[MovieCard]]:
+        """Cards are already validated by the CRUD layer; full movies become MovieResponse"""
+        if card:
+            return movies
+        return [MovieResponse.model_validate(movie) for movie in movies]
+
+    async def get_movies(
+        self,
+        skip: int = 0,
+        limit: int = 20,
+        genre: Optional[str] = None,
+        year: Optional[int] = None,
+        min_rating: Optional[int] = None,
+        after: Optional[str] = None,
+        card: bool = False
+    ) -> Union[List[MovieResponse], List[MovieCard]]:
         """
         Get a paginated list of movies.
 
+        Results are cached in movie_cache for RAIL_TTLS["movies"] seconds.
+
         Args:
             skip: Number of movies to skip
             limit: Maximum number of movies to return
+            genre: Optional genre filter
+            year: Optional release year filter
+            min_rating: Optional minimum rating
+            after: Cursor of the previous page
+            card: Return compact MovieCard rows
 
         Returns:
             List of movies
         """
-        movies = await self.movie_crud.get_multi(skip=skip, limit=limit)
-        return [MovieResponse.model_validate(movie) for movie in movies]
+        async def load():
+            movies = await self.movie_crud.get_multi(
+                skip=skip, limit=limit, genre=genre, year=year, min_rating=min_rating, after=after, card=card
+            )
+            return self._present(movies, card)
+
+        key = ("movies", skip, limit, genre, year, min_rating, after, card)
+        return list(await movie_cache.get_or_load(key, RAIL_TTLS["movies"], load))
 
-    async def get_random_movies(self, limit: int = 10) -> List[MovieResponse]:
+    async def get_random_movies(
+        self,
+        limit: int = 10,
+        card: bool = False
+    ) -> Union[List[MovieResponse], List[MovieCard]]:
         """
         Get a list of random movies.
 
         Args:
             limit: Number of random movies to return
+            card: Return compact MovieCard rows
 
         Returns:
             List of random movies
         """
-        # Get a larger pool of movies and then randomly select from them
-        pool_size = min(limit * 3, 100)  # Get a reasonable pool size
-        all_movies = await self.movie_crud.get_multi(limit=pool_size)
+        movies = await self.movie_crud.get_random(limit=limit, card=card)
+        return self._present(movies, card)
 
-        # Randomly select 'limit' movies from the pool
-        selected_movies = random.sample(all_movies, min(limit, len(all_movies)))
-        return [MovieResponse.model_validate(movie) for movie in selected_movies]
-
-    async def get_most_viewed_movies(self, limit: int = 10) -> List[MovieResponse]:
+    async def get_most_viewed_movies(
+        self,
+        limit: int = 10,
+        card: bool = False
+    ) -> Union[List[MovieResponse], List[MovieCard]]:
         """
         Get a list of most viewed movies sorted by view count.
 
+        Results are cached in movie_cache for RAIL_TTLS["most_viewed"] seconds.
+
         Args:
             limit: Number of most viewed movies to return
+            card: Return compact MovieCard rows
 
         Returns:
             List of most viewed movies
         """
-        movies = await self.movie_crud.get_multi_by_view_count(limit=limit)
-        return [MovieResponse.model_validate(movie) for movie in movies]
+        async def load():
+            movies = await self.movie_crud.get_multi_by_view_count(limit=limit, card=card)
+            return self._present(movies, card)
+
+        key = ("most_viewed", limit, card)
+        return list(await movie_cache.get_or_load(key, RAIL_TTLS["most_viewed"], load))
+
+    async def get_trending_movies(
+        self,
+        limit: int = 10,
+        card: bool = False
+    ) -> Union[List[MovieResponse], List[MovieCard]]:
+        """
+        Get the trending movies (exponentially decayed view counts).
+
+        Args:
+            limit: Number of movies to return
+            card: Return compact MovieCard rows
+
+        Returns:
+            List of trending movies
+        """
+        async def load():
+            movies = await self.movie_crud.get_trending(limit=limit, card=card)
+            return self._present(movies, card)
+
+        key = ("trending", limit, card)
+        return list(await movie_cache.get_or_load(key, RAIL_TTLS["trending"], load))
+
+    async def get_recommended_movies(
+        self,
+        user_id: str,
+        limit: int = 20,
+        card: bool = False
+    ) -> Union[List[MovieResponse], List[MovieCard]]:
+        """
+        Get personalized recommendations from item-to-item collaborative filtering.
+
+        Neighbors of the user's recently watched movies are merged in memory; the
+        remaining slots are filled with trending movies the user has not watched.
+
+        Args:
+            user_id: User ID
+            limit: Number of movies to return
+            card: Return compact MovieCard rows
+
+        Returns:
+            List of recommended movies
+        """
+        history_ids, watched_ids = await asyncio.gather(
+            self.watch_history_crud.get_recent_movie_ids(user_id, RECENT_HISTORY_SIZE),
+            self.watch_history_crud.get_watched_movie_ids(user_id)
+        )
+        movies = await self.movie_crud.get_recommended(
+            history_ids, watched_ids, limit=limit, recency_decay=RECENCY_DECAY, card=card
+        )
+
+        movies = await self._fill_with_popular(movies, watched_ids, limit, card)
+        return self._present(movies, card)
 
-    async def get_featured_movies(self, limit: int = 10) -> List[MovieResponse]:
+    async def get_for_you_movies(
+        self,
+        user_id: str,
+        genre_affinity: Dict[str, float],
+        favorite_genres: List[str],
+        limit: int = 20,
+        card: bool = False
+    ) -> Union[List[MovieResponse], List[MovieCard]]:
+        """
+        Get the "for you" rail from the user's genre affinity and favorite genres.
+
+        Args:
+            user_id: User ID
+            genre_affinity: users.genre_affinity, already loaded with the current user
+            favorite_genres: Genres chosen in the user's preferences
+            limit: Number of movies to return
+            card: Return compact MovieCard rows
+
+        Returns:
+            List of movies the user has not watched, best match first
+        """
+        watched_ids = await self.watch_history_crud.get_watched_movie_ids(user_id)
+        movies = await self.movie_crud.get_for_you(
+            genre_affinity, favorite_genres, watched_ids, limit=limit, card=card
+        )
+        movies = await self._fill_with_popular(movies, watched_ids, limit, card)
+        return self._present(movies, card)
+
+    async def _fill_with_popular(
+        self,
+        movies: Union[List[MovieInDB], List[MovieCard]],
+        watched_ids: Set[str],
+        limit: int,
+        card: bool
+    ) -> Union[List[MovieInDB], List[MovieCard]]:
+        """Top up a personalized list with trending, then most viewed, movies the user has not watched"""
+        # Người dùng mới hoặc chưa đủ dữ liệu: bổ sung bằng phim trending, nếu vẫn thiếu
+        # (ít phim có điểm trending hoặc đã xem gần hết) thì thêm phim xem nhiều nhất
+        for source in (self.movie_crud.get_trending, self.movie_crud.get_multi_by_view_count):
+            if len(movies) >= limit:
+                break
+            seen = watched_ids | {movie.id for movie in movies}
+            fill_limit = min(limit + len(seen), limit * 3)
+            popular = await source(limit=fill_limit, card=card)
+            movies += [movie for movie in popular if movie.id not in seen][:limit - len(movies)]
+        return movies
+
+    async def get_top_movies(
+        self,
+        period: str = "week",
+        limit: int = 10,
+        card: bool = False
+    ) -> Union[List[MovieResponse], List[MovieCard]]:
+        """
+        Get the most viewed movies of a period.
+
+        Args:
+            period: week, month, year, or all for the lifetime view count
+            limit: Number of movies to return
+            card: Return compact MovieCard rows
+
+        Returns:
+            List of movies ordered by views in the period
+        """
+        if period == "all":
+            return await self.get_most_viewed_movies(limit=limit, card=card)
+
+        async def load():
+            movies = await self.movie_crud.get_top_by_period(period, limit=limit, card=card)
+            return self._present(movies, card)
+
+        key = ("top", period, limit, card)
+        return list(await movie_cache.get_or_load(key, RAIL_TTLS["top"], load))
+
+    async def get_viewer_stats(self, movie_id: str, period: str = "all") -> Optional[MovieViewerStats]:
+        """
+        Get the views and approximate unique viewers of a movie.
+
+        Args:
+            movie_id: Movie ID
+            period: week, month, year (rolling UTC days, today included) or all
+
+        Returns:
+            Viewer statistics, or None if the movie does not exist
+        """
+        since = None
+        if period != "all":
+            since = bucket_day(datetime.utcnow()) - timedelta(days=TOP_PERIODS[period] - 1)
+
+        stats = await self.movie_crud.get_viewer_stats(movie_id, since)
+        if stats is None:
+            return None
+        return MovieViewerStats(movie_id=movie_id, period=period, **stats)
+
+    async def get_featured_movies(
+        self,
+        limit: int = 10,
+        genre: Optional[str] = None,
+        year: Optional[int] = None,
+        min_rating: Optional[int] = None,
+        card: bool = False
+    ) -> Union[List[MovieResponse], List[MovieCard]]:
         """
         Get a list of featured movies.
 
+        Results are cached in movie_cache for RAIL_TTLS["featured"] seconds.
+
         Args:
             limit: Number of featured movies to return
+            genre: Optional genre filter
+            year: Optional release year filter
+            min_rating: Optional minimum rating
+            card: Return compact MovieCard rows
 
         Returns:
             List of featured movies
         """
-        movies = await self.movie_crud.get_featured(limit=limit)
-        return [MovieResponse.model_validate(movie) for movie in movies]
+        async def load():
+            movies = await self.movie_crud.get_featured(
+                limit=limit, genre=genre, year=year, min_rating=min_rating, card=card
+            )
+            return self._present(movies, card)
+
+        key = ("featured", limit, genre, year, min_rating, card)
+        return list(await movie_cache.get_or_load(key, RAIL_TTLS["featured"], load))
 
-    async def search_movies(
+    async def search_movies_page(
         self,
         query: str,
         genre: Optional[str] = None,
         year: Optional[int] = None,
         skip: int = 0,
-        limit: int = 20
-    ) -> List[MovieResponse]:
+        limit: int = 20,
+        fuzzy: bool = False,
+        min_rating: Optional[int] = None,
+        after: Optional[str] = None,
+        card: bool = False
+    ) -> Tuple[Union[List[MovieResponse], List[MovieCard]], Optional[str]]:
         """
-        Search for movies by title, description, or other criteria.
+        Search for movies and return a cursor for the next page.
 
         Args:
             query: Search query string
@@ -116,18 +334,138 @@ class MovieService:
             year: Optional release year filter
             skip: Number of movies to skip
             limit: Maximum number of movies to return
+            fuzzy: Whether to tolerate typos in title words
+            min_rating: Optional minimum rating
+            after: Cursor of the previous page
+            card: Return compact MovieCard rows
 
         Returns:
-            List of movies matching search criteria
+            Tuple of (movies, next cursor or None on the last page)
         """
-        movies = await self.movie_crud.search(
+        movies, next_cursor = await self.movie_crud.search_page(
             query=query,
             genre=genre,
             year=year,
             skip=skip,
-            limit=limit
+            limit=limit,
+            fuzzy=fuzzy,
+            min_rating=min_rating,
+            after=after,
+            card=card
         )
-        return [MovieResponse.model_validate(movie) for movie in movies]
+        return self._present(movies, card), next_cursor
+
+    async def search_movies_with_facets(
+        self,
+        query: str,
+        genre: Optional[str] = None,
+        year: Optional[int] = None,
+        skip: int = 0,
+        limit: int = 20,
+        fuzzy: bool = False,
+        min_rating: Optional[int] = None,
+        after: Optional[str] = None,
+        card: bool = False
+    ) -> MovieSearchResponse:
+        """
+        Search for movies and count all hits per genre, release year and rating band.
+
+        Args:
+            query: Search query string
+            genre: Optional genre filter
+            year: Optional release year filter
+            skip: Number of movies to skip
+            limit: Maximum number of movies to return
+            fuzzy: Whether to tolerate typos in title words
+            min_rating: Optional minimum rating
+            after: Cursor of the previous page
+            card: Return compact MovieCard rows
+
+        Returns:
+            Requested page of movies with facet counts
+        """
+        (results, next_cursor), facets = await asyncio.gather(
+            self.search_movies_page(
+                query=query, genre=genre, year=year, skip=skip, limit=limit,
+                fuzzy=fuzzy, min_rating=min_rating, after=after, card=card
+            ),
+            self.movie_crud.facet_counts(
+                query=query, genre=genre, year=year, fuzzy=fuzzy, min_rating=min_rating
+            )
+        )
+        return MovieSearchResponse(results=results, facets=SearchFacets(**facets), next_cursor=next_cursor)
+
+    async def get_top_genres(self, limit: int = 4) -> List[str]:
+        """
+        Get the genres with the most movies.
+
+        Args:
+            limit: Number of genres to return
+
+        Returns:
+            Genre names, largest first
+        """
+        async def load():
+            counts = (await self.movie_crud.facet_counts())["genres"]
+            return sorted(counts, key=lambda genre: (-counts[genre], genre))
+
+        genres = await movie_cache.get_or_load(("genres",), RAIL_TTLS["movies"], load)
+        return genres[:limit]
+
+    async def get_home_page(
+        self,
+        limit: int = 10,
+        genres: Optional[List[str]] = None,
+        genre_rails: int = 4
+    ) -> HomePageResponse:
+        """
+        Assemble every home page rail in one call.
+
+        Rails are loaded concurrently (cached rails come from movie_cache) and movies
+        that appear in several rails are sent only once.
+
+        Args:
+            limit: Number of movies per rail
+            genres: Genres to build rails for; defaults to the largest genres
+            genre_rails: Number of genre rails when genres is not given
+
+        Returns:
+            Rails with movie IDs plus a single ID -> MovieCard map
+        """
+        if not genres:
+            genres = await self.get_top_genres(limit=genre_rails)
+
+        rail_specs = [
+            ("featured", "Phim nổi bật", self.get_featured_movies(limit=limit, card=True)),
+            ("most_viewed", "Xem nhiều nhất", self.get_most_viewed_movies(limit=limit, card=True)),
+            ("random", "Có thể bạn sẽ thích", self.get_random_movies(limit=limit, card=True)),
+        ]
+        for genre in genres:
+            rail_specs.append((f"genre:{genre}", genre, self.get_movies(limit=limit, genre=genre, card=True)))
+
+        results = await asyncio.gather(*(loader for _, _, loader in rail_specs))
+
+        rails = []
+        movies = {}
+        for (key, title, _), cards in zip(rail_specs, results):
+            for card in cards:
+                movies.setdefault(card.id, card)
+            rails.append(HomeRail(key=key, title=title, movie_ids=[card.id for card in cards]))
+
+        return HomePageResponse(rails=rails, movies=movies)
+
+    async def suggest_movies(self, query: str, limit: int = 10) -> List[MovieSuggestion]:
+        """
+        Get title suggestions for a partially typed query.
+
+        Args:
+            query: Text typed so far
+            limit: Maximum number of suggestions
+
+        Returns:
+            List of suggestions, most viewed first
+        """
+        return await self.movie_crud.suggest(prefix=query, limit=limit)
 
     async def get_movie(self, movie_id: str) -> Optional[MovieResponse]:
         """
@@ -144,6 +482,50 @@ class MovieService:
             return None
         return MovieResponse.model_validate(movie)
 
+    async def get_related_movies(self, movie_id: str, limit: int = 6) -> Optional[List[MovieResponse]]:
+        """
+        Get movies related to a specific movie.
+
+        Args:
+            movie_id: Movie ID
+            limit: Maximum number of related movies to return
+
+        Returns:
+            List of related movies, or None if the movie does not exist
+        """
+        movies = await self.movie_crud.get_related(movie_id, limit=limit)
+        if movies is None:
+            return None
+        return [MovieResponse.model_validate(movie) for movie in movies]
+
+    async def get_similar_movies(self, movie_id: str, limit: int = 10) -> Optional[List[MovieResponse]]:
+        """
+        Get movies whose title and description are similar to a specific movie.
+
+        Args:
+            movie_id: Movie ID
+            limit: Maximum number of similar movies to return
+
+        Returns:
+            List of similar movies, or None if the movie does not exist
+        """
+        movies = await self.movie_crud.get_similar(movie_id, limit=limit)
+        if movies is None:
+            return None
+        return [MovieResponse.model_validate(movie) for movie in movies]
+
+    async def get_movie_version(self, movie_id: str) -> Optional[datetime]:
+        """
+        Get the last modification time of a movie without loading it.
+
+        Args:
+            movie_id: Movie ID
+
+        Returns:
+            updated_at, or None if the movie does not exist
+        """
+        return await self.movie_crud.get_updated_at(movie_id)
+
     async def increment_view_count(self, movie_id: str, user_id: str) -> Optional[MovieResponse]:
         """
         Increment the view count for a specific movie and record in user's watch history.
@@ -160,34 +542,22 @@ class MovieService:
         if not movie:
             return None
 
-        # Increment view count
-        updated_movie = await self.movie_crud.increment_view_count(movie_id)
-
-        # Record watch history (create or update)
-        now = datetime.utcnow()
-        watch_history_data = {
-            "user_id": user_id,
-            "movie_id": movie_id,
-            "watched_at": now,
-            "movie_details": {
-                "title": movie.title,
-                "poster_url": movie.poster_url,
-                "duration_minutes": movie.duration_minutes
-            }
-        }
-
-        # Try to find existing watch history for this movie
-        existing_entry = await self.watch_history_crud.get_by_user_and_movie(user_id, movie_id)
-
-        if existing_entry:
-            # Update existing entry
-            await self.watch_history_crud.update(
-                entry_id=existing_entry.id,
-                obj_in=watch_history_data
-            )
-        else:
-            # Create new entry
-            await self.watch_history_crud.create(obj_in=watch_history_data)
+        # Lượt xem được ghi theo lô ở background; trả về số lượt xem lạc quan
+        # (giá trị trong database cộng các lượt chưa flush)
+        updated_movie = movie.model_copy(
+            update={"view_count": movie.view_count + view_counter.add(movie_id, viewer_id=user_id)}
+        )
+        movie_search_index.update_view_count(movie_id, updated_movie.view_count)
+
+        # Record watch history (create or update in one round trip) and the user's genre affinity
+        await asyncio.gather(
+            self.watch_history_crud.upsert(
+                user_id,
+                movie_id,
+                movie_details={"title": movie.title, "poster_path": movie.poster_path, "genres": movie.genres}
+            ),
+            record_genre_event(self.movie_crud.db, user_id, movie.genres, VIEW_WEIGHT)
+        )
 
         return MovieResponse.model_validate(updated_movie)
 
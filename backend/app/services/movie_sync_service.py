@@ -10,7 +10,12 @@ from typing import List, Dict, Any, Optional
 from motor.motor_asyncio import AsyncIOMotorCollection
 
 from .tmdb_client import TMDBClient
+from .search_index import movie_search_index
+from .movie_cache import movie_cache
+from .related_movies import refresh_related_movies
+from .movie_lsh import update_lsh_index
 from ..schemas.movie import MovieCreate, MovieInDB
+from ..utils.text import clean_query, parse_release_year
 
 # Set up logger
 logger = logging.getLogger(__name__)
@@ -87,6 +92,9 @@ class MovieSyncService:
                 now = datetime.utcnow()
                 update_data = movie_data.dict(exclude_unset=True)
                 update_data["updated_at"] = now
+                update_data["normalized_title"] = clean_query(movie_data.title)
+                update_data["normalized_description"] = clean_query(movie_data.overview)
+                update_data["release_year"] = parse_release_year(movie_data.release_date)
 
                 result = await self.movie_collection.update_one(
                     {"tmdb_id": movie_data.tmdb_id},
@@ -95,6 +103,8 @@ class MovieSyncService:
 
                 if result.modified_count > 0:
                     logger.info(f"Updated movie: {movie_data.title} (TMDB ID: {movie_data.tmdb_id})")
+                    movie_search_index.add({**existing_movie, **update_data})
+                    movie_cache.invalidate()
 
                 return str(existing_movie["_id"])
             else:
@@ -102,6 +112,9 @@ class MovieSyncService:
                 now = datetime.utcnow()
                 movie_db = {
                     **movie_data.dict(),
+                    "normalized_title": clean_query(movie_data.title),
+                    "normalized_description": clean_query(movie_data.overview),
+                    "release_year": parse_release_year(movie_data.release_date),
                     "created_at": now,
                     "updated_at": now,
                     "view_count": 0
@@ -109,6 +122,8 @@ class MovieSyncService:
 
                 result = await self.movie_collection.insert_one(movie_db)
                 logger.info(f"Added new movie: {movie_data.title} (TMDB ID: {movie_data.tmdb_id})")
+                movie_search_index.add(movie_db)
+                movie_cache.invalidate()
 
                 return str(result.inserted_id)
 
@@ -117,6 +132,26 @@ class MovieSyncService:
             logger.error(f"Error processing movie {movie_id}: {str(e)}")
             return None
 
+    async def refresh_movie_neighbors(self, movie_ids: List[str]) -> None:
+        """
+        Recompute the related-movie lists and LSH index entries affected by the given synced movies.
+
+        Args:
+            movie_ids: MongoDB IDs of the movies that were just upserted
+        """
+        if not movie_ids:
+            return
+        db = self.movie_collection.database
+        # Không để lỗi tính phim liên quan làm hỏng kết quả đồng bộ
+        try:
+            await refresh_related_movies(db, movie_ids)
+        except Exception as e:
+            logger.error(f"Error refreshing related movies: {str(e)}")
+        try:
+            await update_lsh_index(db, movie_ids)
+        except Exception as e:
+            logger.error(f"Error updating LSH index: {str(e)}")
+
     async def sync_movie_by_id(self, tmdb_id: int) -> Optional[str]:
         """
         Sync a single movie by TMDB ID
@@ -171,6 +206,7 @@ class MovieSyncService:
             # Delay to avoid rate limiting
             await asyncio.sleep(self.delay)
 
+        await self.refresh_movie_neighbors(results["movie_ids"])
         return results
 
     async def _sync_movies_from_tmdb_response(self, tmdb_response: Dict[str, Any]) -> Dict[str, Any]:
@@ -211,6 +247,7 @@ class MovieSyncService:
             # Delay to avoid rate limiting
             await asyncio.sleep(self.delay)
 
+        await self.refresh_movie_neighbors(results["movie_ids"])
         return results
 
     async def sync_popular_movies(self, pages: int = 1) -> Dict[str, Any]:
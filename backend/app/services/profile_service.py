@@ -1,14 +1,16 @@
 from typing import Optional, Dict, Any, List, Union
 from datetime import datetime, timedelta, date
 import os
-import random
 from bson import ObjectId
 from fastapi import UploadFile
 import aiofiles
 import shutil
 
 from ..schemas.user import UserProfileUpdate
-from ..crud.user import update_user
+from ..crud.user import update_user, add_watch_history as upsert_watch_history
+from ..db.database import get_database
+from .view_stats import bucket_day
+from .watch_rollups import get_daily_rollups, minutes_between, month_start
 
 """
 Profile Service
@@ -20,6 +22,8 @@ Xử lý các chức năng liên quan đến profile người dùng:
 
 # Đường dẫn lưu file
 UPLOAD_DIR = "uploads/avatars"
+# Các khoảng thời gian hỗ trợ cho thống kê thời lượng xem
+WATCH_STATS_PERIODS = ("week", "month", "year")
 
 async def update_user_profile(
     user_id: Union[ObjectId, str],
@@ -67,35 +71,34 @@ async def upload_user_avatar(user_id: Union[ObjectId, str], avatar: UploadFile)
 async def get_user_watch_stats(user_id: Union[ObjectId, str], period: str = "week") -> Dict[str, Any]:
     """
     Tính toán thống kê thời lượng xem phim
-    Kết quả là fake data cho mục đích demo
+    - Đọc bảng tổng hợp theo ngày user_watch_daily (tối đa 366 document nhỏ)
+    - week: 7 ngày của tuần hiện tại (thứ Hai → Chủ nhật), month: 31 ngày của tháng hiện tại,
+      year: 12 tháng của năm hiện tại (theo giờ UTC)
+    - Khoảng thời gian khác báo lỗi ValueError thay vì trả về số liệu của năm
     """
-    # Trong thực tế, sẽ lấy dữ liệu từ watch_history collection
-    # và tính toán thống kê theo thời gian
+    if period not in WATCH_STATS_PERIODS:
+        raise ValueError(f"Unknown watch stats period: {period}")
     
-    # Fake data cho mục đích demo
-    stats = {
-        "total_minutes": 0
-    }
+    today = bucket_day(datetime.utcnow())
     
     if period == "week":
-        # 7 ngày trong tuần
-        daily_minutes = [random.randint(0, 240) for _ in range(7)]
-        stats["daily_minutes"] = daily_minutes
-        stats["total_minutes"] = sum(daily_minutes)
-    
+        start = today - timedelta(days=today.weekday())
+        slots = [(start + timedelta(days=i), start + timedelta(days=i + 1)) for i in range(7)]
+        key = "daily_minutes"
     elif period == "month":
-        # 31 ngày trong tháng
-        monthly_minutes = [random.randint(0, 240) for _ in range(31)]
-        stats["monthly_minutes"] = monthly_minutes
-        stats["total_minutes"] = sum(monthly_minutes)
-    
-    elif period == "year":
-        # 12 tháng trong năm
-        yearly_minutes = [random.randint(0, 5000) for _ in range(12)]
-        stats["yearly_minutes"] = yearly_minutes
-        stats["total_minutes"] = sum(yearly_minutes)
+        start = today.replace(day=1)
+        # Các ngày không có trong tháng (vd. 30/2) luôn bằng 0
+        end = month_start(start, -1)
+        slots = [(min(start + timedelta(days=i), end), min(start + timedelta(days=i + 1), end)) for i in range(31)]
+        key = "monthly_minutes"
+    else:
+        start = today.replace(month=1, day=1)
+        slots = [(start.replace(month=month), month_start(start.replace(month=month), -1)) for month in range(1, 13)]
+        key = "yearly_minutes"
     
-    return stats
+    rollups = await get_daily_rollups(get_database(), str(user_id), start)
+    minutes = [minutes_between(rollups, slot_start, slot_end) for slot_start, slot_end in slots]
+    return {key: minutes, "total_minutes": sum(minutes)}
 
 async def add_watch_history(
     user_id: Union[ObjectId, str],
@@ -105,9 +108,7 @@ async def add_watch_history(
 ) -> bool:
     """
     Thêm vào lịch sử xem phim
+    - Tạo mới hoặc cập nhật bản ghi (user, phim) trong một lần ghi
     """
-    # Trong thực tế, sẽ thêm bản ghi vào watch_history collection
-    # Đây là phương thức giả lập cho mục đích demo
-    
-    # Giả lập thành công
-    return True 
\ No newline at end of file
+    await upsert_watch_history(user_id, movie_id, watch_duration=duration, completed=completed)
+    return True
\ No newline at end of file
@@ -0,0 +1,255 @@
+"""
+Precomputed related-movie neighbor lists.
+Độ tương đồng giữa hai phim = Jaccard có trọng số trên thể loại (thể loại hiếm nặng hơn)
+cộng với độ gần về năm phát hành và điểm đánh giá. Ma trận thể loại được tính bằng NumPy
+theo từng block hàng, kết quả top-k lưu trong collection related_movies (_id = id phim),
+nên API chỉ cần một lần đọc theo _id.
+"""
+
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Set, Tuple
+
+import numpy as np
+from pymongo import DeleteOne, ReplaceOne
+
+from ..utils.cursor import as_object_id
+
+logger = logging.getLogger(__name__)
+
+RELATED_TOP_K = 20
+BLOCK_SIZE = 1024
+
+# Trọng số của từng thành phần trong điểm tương đồng
+GENRE_WEIGHT = 0.7
+YEAR_WEIGHT = 0.2
+RATING_WEIGHT = 0.1
+# Hai phim cách nhau YEAR_DECAY năm thì độ gần về năm còn 1/e
+YEAR_DECAY = 5.0
+
+FEATURE_PROJECTION = {"genres": 1, "release_year": 1, "vote_average": 1}
+
+
+class MovieFeatures:
+    """Genre incidence matrix and metadata vectors for every movie"""
+
+    def __init__(self, docs: List[Dict[str, Any]]):
+        self.ids: List[str] = [str(doc["_id"]) for doc in docs]
+        self.rows: Dict[str, int] = {movie_id: row for row, movie_id in enumerate(self.ids)}
+
+        genres = sorted({genre for doc in docs for genre in doc.get("genres") or []})
+        columns = {genre: column for column, genre in enumerate(genres)}
+
+        self.incidence = np.zeros((len(docs), len(genres)), dtype=np.float32)
+        for row, doc in enumerate(docs):
+            for genre in doc.get("genres") or []:
+                self.incidence[row, columns[genre]] = 1.0
+
+        # Thể loại càng ít phim thì trùng thể loại đó càng có ý nghĩa
+        document_frequency = self.incidence.sum(axis=0)
+        self.genre_weights = np.log1p(len(docs) / np.maximum(document_frequency, 1.0)).astype(np.float32)
+        self.weighted_sizes = self.incidence @ self.genre_weights
+
+        self.years = np.array(
+            [doc.get("release_year") if doc.get("release_year") is not None else np.nan for doc in docs],
+            dtype=np.float32
+        )
+        self.ratings = np.array([float(doc.get("vote_average") or 0.0) for doc in docs], dtype=np.float32)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def scores(self, rows: np.ndarray) -> np.ndarray:
+        """
+        Similarity of the given movies to every movie.
+
+        Args:
+            rows: Row indices of the source movies
+
+        Returns:
+            Matrix of shape (len(rows), len(self)); -inf where movies share no genre or are the same movie
+        """
+        intersection = (self.incidence[rows] * self.genre_weights) @ self.incidence.T
+        union = self.weighted_sizes[rows][:, None] + self.weighted_sizes[None, :] - intersection
+        with np.errstate(divide="ignore", invalid="ignore"):
+            jaccard = np.where(union > 0, intersection / union, 0.0)
+
+        year_gap = np.abs(self.years[rows][:, None] - self.years[None, :])
+        year_similarity = np.nan_to_num(np.exp(-year_gap / YEAR_DECAY), nan=0.0)
+        rating_similarity = 1.0 - np.abs(self.ratings[rows][:, None] - self.ratings[None, :]) / 10.0
+
+        scores = (
+            GENRE_WEIGHT * jaccard
+            + YEAR_WEIGHT * year_similarity
+            + RATING_WEIGHT * np.clip(rating_similarity, 0.0, 1.0)
+        )
+        scores[intersection <= 0] = -np.inf
+        scores[np.arange(len(rows)), rows] = -np.inf
+        return scores
+
+    def neighbors(self, rows: Iterable[int], k: int = RELATED_TOP_K) -> Dict[str, List[Tuple[str, float]]]:
+        """
+        Top-k most similar movies for each source movie, computed block by block.
+
+        Args:
+            rows: Row indices of the source movies
+            k: Number of neighbors to keep
+
+        Returns:
+            Movie ID -> [(neighbor ID, score)], best first
+        """
+        rows = np.fromiter(rows, dtype=np.int64)
+        result: Dict[str, List[Tuple[str, float]]] = {}
+        k = min(k, len(self) - 1)
+        if k <= 0:
+            return {self.ids[row]: [] for row in rows}
+
+        for start in range(0, len(rows), BLOCK_SIZE):
+            block = rows[start:start + BLOCK_SIZE]
+            scores = self.scores(block)
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            for position, (source, candidates) in enumerate(zip(block, top)):
+                row_scores = scores[position]
+                ordered = candidates[np.argsort(-row_scores[candidates], kind="stable")]
+                result[self.ids[source]] = [
+                    (self.ids[neighbor], round(float(row_scores[neighbor]), 6))
+                    for neighbor in ordered if np.isfinite(row_scores[neighbor])
+                ]
+        return result
+
+
+def related_operations(neighbors: Dict[str, List[Tuple[str, float]]]) -> List[ReplaceOne]:
+    """
+    Bulk-write operations storing neighbor lists in the related_movies collection.
+
+    Args:
+        neighbors: Movie ID -> [(neighbor ID, score)]
+
+    Returns:
+        List of ReplaceOne upserts keyed by movie _id
+    """
+    now = datetime.utcnow()
+    return [
+        ReplaceOne(
+            {"_id": as_object_id(movie_id)},
+            {
+                "related": [{"movie_id": neighbor_id, "score": score} for neighbor_id, score in related],
+                "updated_at": now
+            },
+            upsert=True
+        )
+        for movie_id, related in neighbors.items()
+    ]
+
+
+async def _load_features(db) -> MovieFeatures:
+    docs = await db.movies.find({}, FEATURE_PROJECTION).sort("_id", 1).to_list(length=None)
+    return MovieFeatures(docs)
+
+
+async def build_related_movies(db, k: int = RELATED_TOP_K) -> int:
+    """
+    Recompute the neighbor lists of every movie (offline job).
+
+    Args:
+        db: Motor database
+        k: Number of neighbors per movie
+
+    Returns:
+        Number of movies written
+    """
+    features = await _load_features(db)
+    neighbors = features.neighbors(range(len(features)), k)
+
+    operations: List[Any] = related_operations(neighbors)
+    stale = await db.related_movies.distinct("_id", {"_id": {"$nin": [as_object_id(i) for i in features.ids]}})
+    operations.extend(DeleteOne({"_id": movie_id}) for movie_id in stale)
+    if operations:
+        await db.related_movies.bulk_write(operations, ordered=False)
+
+    logger.info(f"Related movies built for {len(neighbors)} movies, removed {len(stale)} stale lists")
+    return len(neighbors)
+
+
+def refresh_neighbors(
+    docs: List[Dict[str, Any]],
+    touched: Set[str],
+    stored: List[Tuple[str, List[Dict[str, Any]]]],
+    k: int = RELATED_TOP_K
+) -> Dict[str, List[Tuple[str, float]]]:
+    """
+    Neighbor lists that can change after the touched movies were added, updated or deleted.
+
+    Runs in a worker thread: NumPy releases the GIL in the block products, so the event loop keeps serving.
+
+    Args:
+        docs: Movie documents with FEATURE_PROJECTION, sorted by _id
+        touched: IDs of the touched movies
+        stored: (movie ID, current related list) of every stored list
+        k: Number of neighbors per movie
+
+    Returns:
+        Movie ID -> [(neighbor ID, score)] for every list to rewrite
+    """
+    features = MovieFeatures(docs)
+    touched_rows = np.array([features.rows[movie_id] for movie_id in touched if movie_id in features.rows], dtype=np.int64)
+    touched_scores = features.scores(touched_rows) if len(touched_rows) else np.empty((0, len(features)))
+    best_touched = touched_scores.max(axis=0) if len(touched_rows) else np.full(len(features), -np.inf)
+
+    affected: Set[int] = set(touched_rows.tolist())
+    for movie_id, related in stored:
+        row = features.rows.get(movie_id)
+        if row is None or row in affected:
+            continue
+        if any(entry["movie_id"] in touched for entry in related):
+            affected.add(row)
+        elif np.isfinite(best_touched[row]) and (
+            len(related) < k or best_touched[row] > related[-1]["score"]
+        ):
+            affected.add(row)
+
+    return features.neighbors(sorted(affected), k)
+
+
+async def refresh_related_movies(db, movie_ids: Iterable[str], k: int = RELATED_TOP_K) -> int:
+    """
+    Recompute only the lists that can change after the given movies were added, updated or deleted.
+
+    Scores are symmetric, so the rows of the touched movies also give their score in every
+    other movie's list. Another movie's list is recomputed only if it already contains a
+    touched movie or if a touched movie now beats its current k-th neighbor.
+    Genre weights are recomputed from the current catalogue, so the lists left untouched keep
+    the slightly different weights of their last build until the next build_related_movies run.
+    Only the reads and writes run on the event loop, the scoring runs in refresh_neighbors().
+
+    Args:
+        db: Motor database
+        movie_ids: IDs of the movies touched by a sync or an admin edit
+        k: Number of neighbors per movie
+
+    Returns:
+        Number of lists rewritten
+    """
+    touched: Set[str] = {str(movie_id) for movie_id in movie_ids}
+    if not touched:
+        return 0
+
+    docs = await db.movies.find({}, FEATURE_PROJECTION).sort("_id", 1).to_list(length=None)
+    stored = [
+        (str(entry["_id"]), entry.get("related", []))
+        async for entry in db.related_movies.find({}, {"related": 1})
+    ]
+    neighbors = await asyncio.get_running_loop().run_in_executor(
+        None, refresh_neighbors, docs, touched, stored, k
+    )
+
+    operations: List[Any] = related_operations(neighbors)
+    existing = {str(doc["_id"]) for doc in docs}
+    removed = [movie_id for movie_id in touched if movie_id not in existing]
+    operations.extend(DeleteOne({"_id": as_object_id(movie_id)}) for movie_id in removed)
+    if operations:
+        await db.related_movies.bulk_write(operations, ordered=False)
+
+    logger.info(f"Related movies refreshed for {len(neighbors)} movies after {len(touched)} changes")
+    return len(neighbors)
@@ -0,0 +1,551 @@
+"""
+In-process search index for movies.
+Giữ một inverted index (token -> movie ids) trong bộ nhớ để phục vụ /movies/search
+thay vì quét toàn bộ collection bằng $regex:
+- Build một lần lúc startup từ collection movies
+- Cập nhật từng phim khi MovieCRUD create/update/delete hoặc khi đồng bộ TMDB
+- Bộ lọc genre/year/featured/rating dùng bitmap index trên ordinal của phim (AND/OR + popcount)
+- Xếp hạng kết quả bằng BM25 (title có trọng số cao hơn overview) kết hợp độ phổ biến
+- Chế độ fuzzy: sửa lỗi gõ trên các token của title bằng deletion dictionary (SymSpell)
+- Gợi ý (autocomplete) theo prefix của title bằng trie, mỗi node cache top-k theo view_count
+- Đếm facet (genre, năm, khoảng rating) trên tập kết quả trong một lần duyệt
+"""
+
+import bisect
+import heapq
+import logging
+import math
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from ..utils.bitmap import BitmapIndex, popcount
+from ..utils.fuzzy import DeletionDictionary
+from ..utils.text import clean_query, parse_release_year, tokenize
+from ..utils.trie import PrefixTrie
+
+logger = logging.getLogger(__name__)
+
+# Số token tối đa được mở rộng từ prefix của token cuối cùng trong query
+MAX_PREFIX_EXPANSIONS = 50
+
+# Tham số BM25
+BM25_K1 = 1.2
+BM25_B = 0.75
+TITLE_WEIGHT = 3.0
+OVERVIEW_WEIGHT = 1.0
+
+# Trọng số độ phổ biến khi trộn với điểm BM25
+VIEW_COUNT_WEIGHT = 0.1
+VOTE_AVERAGE_WEIGHT = 0.3
+
+# Khoảng cách chỉnh sửa tối đa cho fuzzy match theo độ dài token
+FUZZY_MAX_DISTANCE = 2
+FUZZY_MIN_LENGTH_DISTANCE_1 = 3
+FUZZY_MIN_LENGTH_DISTANCE_2 = 6
+# Hệ số giảm điểm cho mỗi lỗi chỉnh sửa
+FUZZY_DISTANCE_PENALTY = 0.5
+
+# Số gợi ý được cache sẵn trên mỗi node của trie
+SUGGEST_TOP_K = 10
+
+# Facet rating chia vote_average (0-10) thành các khoảng độ rộng 2
+RATING_BAND_SIZE = 2
+RATING_BAND_BOUNDARIES = [0, 2, 4, 6, 8, 10.01]
+
+
+def rating_band(vote_average: float) -> str:
+    """Label of the rating band containing vote_average, e.g. "6-8" """
+    lower = min(int(vote_average // RATING_BAND_SIZE) * RATING_BAND_SIZE, 10 - RATING_BAND_SIZE)
+    return f"{lower}-{lower + RATING_BAND_SIZE}"
+
+
+def _title_keys(title: str) -> List[str]:
+    """Normalized title and every suffix starting at a word boundary"""
+    words = clean_query(title or "").split()
+    return [" ".join(words[position:]) for position in range(len(words))]
+
+
+def _release_year(movie: Dict[str, Any]) -> Optional[int]:
+    if movie.get("release_year") is not None:
+        return movie["release_year"]
+    return parse_release_year(movie.get("release_date"))
+
+
+class MovieSearchIndex:
+    """Token-level inverted index over movie titles and overviews"""
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self) -> None:
+        """Drop every indexed movie"""
+        self.ready = False
+        self._postings: Dict[str, Set[str]] = defaultdict(set)
+        self._bitmaps = BitmapIndex()
+        self._docs: Dict[str, Dict[str, Any]] = {}
+        self._vocabulary: List[str] = []
+        self._title_doc_freq: Counter = Counter()
+        self._title_dictionary = DeletionDictionary(max_distance=FUZZY_MAX_DISTANCE)
+        self._title_trie = PrefixTrie(top_k=SUGGEST_TOP_K)
+        self._total_title_length = 0
+        self._total_overview_length = 0
+
+    def __contains__(self, movie_id: str) -> bool:
+        return str(movie_id) in self._docs
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    async def build(self, collection) -> None:
+        """
+        Build the index from the movies collection.
+
+        Args:
+            collection: Motor collection holding movie documents
+        """
+        self.clear()
+        projection = {
+            "title": 1, "overview": 1, "genres": 1, "release_date": 1, "release_year": 1,
+            "view_count": 1, "vote_average": 1, "poster_path": 1, "is_featured": 1
+        }
+        # Duyệt theo _id để thứ tự ordinal trùng với thứ tự phân trang theo _id trên Mongo
+        async for movie in collection.find({}, projection).sort("_id", 1):
+            self.add(movie)
+        self.ready = True
+        logger.info(f"Search index built with {len(self._docs)} movies and {len(self._vocabulary)} tokens")
+
+    def add(self, movie: Dict[str, Any]) -> None:
+        """
+        Add or replace a movie in the index.
+
+        Args:
+            movie: Movie document (with either "_id" or "id")
+        """
+        movie_id = str(movie.get("_id") or movie.get("id"))
+        if movie_id in self._docs:
+            self._remove_text(movie_id)
+
+        title_tf = Counter(tokenize(movie.get("title", "")))
+        overview_tf = Counter(tokenize(movie.get("overview", "")))
+        tokens = set(title_tf) | set(overview_tf)
+        genres = list(movie.get("genres") or [])
+        year = _release_year(movie)
+
+        for token in tokens:
+            if token not in self._postings:
+                bisect.insort(self._vocabulary, token)
+            self._postings[token].add(movie_id)
+        for token in title_tf:
+            if not self._title_doc_freq[token]:
+                self._title_dictionary.add(token)
+            self._title_doc_freq[token] += 1
+        vote_average = float(movie.get("vote_average") or 0.0)
+        is_featured = bool(movie.get("is_featured"))
+        self._bitmaps.add(movie_id, {
+            "genre": genres,
+            "year": [year] if year is not None else [],
+            "featured": [is_featured],
+            "rating": [min(int(vote_average), 10)],
+        })
+
+        title_length = sum(title_tf.values())
+        overview_length = sum(overview_tf.values())
+        self._total_title_length += title_length
+        self._total_overview_length += overview_length
+
+        view_count = int(movie.get("view_count") or 0)
+        self._title_trie.insert(movie_id, _title_keys(movie.get("title", "")), view_count)
+
+        self._docs[movie_id] = {
+            "title": movie.get("title", ""),
+            "poster_path": movie.get("poster_path"),
+            "tokens": tokens,
+            "title_tf": title_tf,
+            "overview_tf": overview_tf,
+            "title_length": title_length,
+            "overview_length": overview_length,
+            "genres": genres,
+            "year": year,
+            "view_count": view_count,
+            "vote_average": vote_average,
+            "is_featured": is_featured,
+        }
+
+    def remove(self, movie_id: str) -> None:
+        """
+        Remove a movie from the index.
+
+        Args:
+            movie_id: Movie ID
+        """
+        movie_id = str(movie_id)
+        if movie_id in self._docs:
+            self._remove_text(movie_id)
+            self._bitmaps.remove(movie_id)
+
+    def _remove_text(self, movie_id: str) -> None:
+        """Drop a movie's text postings, keeping its bitmap ordinal"""
+        doc = self._docs.pop(movie_id)
+
+        for token in doc["tokens"]:
+            postings = self._postings.get(token)
+            if postings is None:
+                continue
+            postings.discard(movie_id)
+            if not postings:
+                del self._postings[token]
+                position = bisect.bisect_left(self._vocabulary, token)
+                if position < len(self._vocabulary) and self._vocabulary[position] == token:
+                    self._vocabulary.pop(position)
+        for token in doc["title_tf"]:
+            self._title_doc_freq[token] -= 1
+            if not self._title_doc_freq[token]:
+                del self._title_doc_freq[token]
+                self._title_dictionary.remove(token)
+
+        self._title_trie.remove(movie_id)
+
+        self._total_title_length -= doc["title_length"]
+        self._total_overview_length -= doc["overview_length"]
+
+    def update_view_count(self, movie_id: str, view_count: int) -> None:
+        """
+        Refresh the popularity signal of an indexed movie.
+
+        Args:
+            movie_id: Movie ID
+            view_count: Current view count
+        """
+        doc = self._docs.get(str(movie_id))
+        if doc:
+            doc["view_count"] = view_count
+            self._title_trie.update_score(str(movie_id), view_count)
+
+    def _expand_prefix(self, prefix: str) -> List[str]:
+        """Every indexed token starting with prefix (bounded)"""
+        position = bisect.bisect_left(self._vocabulary, prefix)
+        expansions = []
+        for token in self._vocabulary[position:position + MAX_PREFIX_EXPANSIONS]:
+            if not token.startswith(prefix):
+                break
+            expansions.append(token)
+        return expansions
+
+    def _fuzzy_terms(self, token: str) -> List[Tuple[str, float]]:
+        """Title tokens within the allowed edit distance of token, weighted by distance"""
+        if len(token) >= FUZZY_MIN_LENGTH_DISTANCE_2:
+            max_distance = 2
+        elif len(token) >= FUZZY_MIN_LENGTH_DISTANCE_1:
+            max_distance = 1
+        else:
+            return []
+        return [
+            (word, FUZZY_DISTANCE_PENALTY ** distance)
+            for word, distance in self._title_dictionary.lookup(token, max_distance)
+        ]
+
+    def _filter_bits(
+        self,
+        genre: Optional[str] = None,
+        year: Optional[int] = None,
+        is_featured: Optional[bool] = None,
+        min_rating: Optional[int] = None
+    ) -> Optional[int]:
+        """
+        AND of the bitmaps for the given filters.
+
+        Returns:
+            Bitset of matching movies, or None when no filter is set
+        """
+        bits = None
+        if genre:
+            bits = self._bitmaps.bitmap("genre", genre)
+        if year:
+            year_bits = self._bitmaps.bitmap("year", year)
+            bits = year_bits if bits is None else bits & year_bits
+        if is_featured is not None:
+            featured_bits = self._bitmaps.bitmap("featured", is_featured)
+            bits = featured_bits if bits is None else bits & featured_bits
+        if min_rating is not None:
+            # OR các bucket rating >= min_rating
+            rating_bits = self._bitmaps.any_of("rating", range(max(int(min_rating), 0), 11))
+            bits = rating_bits if bits is None else bits & rating_bits
+        return bits
+
+    def _match(
+        self,
+        query: Optional[str],
+        genre: Optional[str],
+        year: Optional[int],
+        fuzzy: bool = False,
+        is_featured: Optional[bool] = None,
+        min_rating: Optional[int] = None
+    ) -> Tuple[Set[str], List[List[Tuple[str, float]]], Optional[int]]:
+        """
+        Intersect postings for the query tokens, then apply the bitmap filters.
+
+        Returns:
+            Tuple of (matching movie IDs, query term groups, filter bitset). Each group
+            holds the (index token, weight) pairs that can satisfy one query token.
+        """
+        candidate_sets: List[Set[str]] = []
+        term_groups: List[List[Tuple[str, float]]] = []
+
+        tokens = tokenize(query) if query else []
+        for position, token in enumerate(tokens):
+            if position == len(tokens) - 1:
+                group = {term: 1.0 for term in self._expand_prefix(token)}
+            else:
+                group = {token: 1.0} if token in self._postings else {}
+            if fuzzy:
+                for term, weight in self._fuzzy_terms(token):
+                    group.setdefault(term, weight)
+            term_groups.append(list(group.items()))
+
+            postings: Set[str] = set()
+            for term in group:
+                postings |= self._postings[term]
+            candidate_sets.append(postings)
+
+        filter_bits = self._filter_bits(genre, year, is_featured, min_rating)
+
+        if not candidate_sets:
+            if filter_bits is None:
+                return set(self._docs), term_groups, None
+            return set(self._bitmaps.ids(filter_bits)), term_groups, filter_bits
+
+        # Giao từ tập nhỏ nhất để giảm số phép so sánh
+        candidate_sets.sort(key=len)
+        hits = set(candidate_sets[0])
+        for postings in candidate_sets[1:]:
+            if not hits:
+                break
+            hits &= postings
+
+        if filter_bits is not None:
+            hits = {movie_id for movie_id in hits if self._bitmaps.contains(filter_bits, movie_id)}
+
+        return hits, term_groups, filter_bits
+
+    def _bm25(self, doc: Dict[str, Any], term_groups: List[List[Tuple[str, float]]]) -> float:
+        """BM25 over title (weighted) and overview for one document"""
+        total_docs = len(self._docs)
+        avg_title_length = self._total_title_length / total_docs or 1.0
+        avg_overview_length = self._total_overview_length / total_docs or 1.0
+
+        score = 0.0
+        for group in term_groups:
+            best = 0.0
+            for term, weight in group:
+                title_tf = doc["title_tf"].get(term, 0)
+                overview_tf = doc["overview_tf"].get(term, 0)
+                if not title_tf and not overview_tf:
+                    continue
+
+                doc_freq = len(self._postings[term])
+                idf = math.log(1 + (total_docs - doc_freq + 0.5) / (doc_freq + 0.5))
+
+                weighted_tf = 0.0
+                if title_tf:
+                    norm = 1 - BM25_B + BM25_B * doc["title_length"] / avg_title_length
+                    weighted_tf += TITLE_WEIGHT * title_tf / norm
+                if overview_tf:
+                    norm = 1 - BM25_B + BM25_B * doc["overview_length"] / avg_overview_length
+                    weighted_tf += OVERVIEW_WEIGHT * overview_tf / norm
+
+                term_score = weight * idf * weighted_tf * (BM25_K1 + 1) / (weighted_tf + BM25_K1)
+                best = max(best, term_score)
+            score += best
+        return score
+
+    @staticmethod
+    def _popularity(doc: Dict[str, Any]) -> float:
+        return 1 + VIEW_COUNT_WEIGHT * math.log1p(doc["view_count"]) + VOTE_AVERAGE_WEIGHT * doc["vote_average"] / 10
+
+    def search(
+        self,
+        query: Optional[str] = None,
+        genre: Optional[str] = None,
+        year: Optional[int] = None,
+        skip: int = 0,
+        limit: int = 20,
+        fuzzy: bool = False,
+        min_rating: Optional[int] = None
+    ) -> List[str]:
+        """
+        Find and rank the movies matching every query token and filter.
+
+        Args:
+            query: Search query for movie title or description
+            genre: Optional genre filter
+            year: Optional release year filter
+            skip: Number of ranked movies to skip
+            limit: Maximum number of movies to return
+            fuzzy: Whether to tolerate typos in title tokens
+            min_rating: Optional minimum vote_average (integer)
+
+        Returns:
+            Movie IDs of the requested page, best match first
+        """
+        ranked = self.search_scored(
+            query=query, genre=genre, year=year, skip=skip, limit=limit,
+            fuzzy=fuzzy, min_rating=min_rating
+        )
+        return [movie_id for _, movie_id in ranked]
+
+    def search_scored(
+        self,
+        query: Optional[str] = None,
+        genre: Optional[str] = None,
+        year: Optional[int] = None,
+        skip: int = 0,
+        limit: int = 20,
+        fuzzy: bool = False,
+        min_rating: Optional[int] = None,
+        after: Optional[Tuple[float, str]] = None
+    ) -> List[Tuple[float, str]]:
+        """
+        Find and rank the movies matching every query token and filter, keeping the scores.
+
+        The last query token is matched as a prefix so partially typed words still hit.
+        In fuzzy mode each token also matches title tokens within 1-2 edits.
+        Only the requested page is selected, with a heap bounded by skip + limit.
+        With after, only movies ranked below that (score, movie_id) key are considered,
+        so a cursor page does not grow with the number of pages already read.
+
+        Args:
+            query: Search query for movie title or description
+            genre: Optional genre filter
+            year: Optional release year filter
+            skip: Number of ranked movies to skip
+            limit: Maximum number of movies to return
+            fuzzy: Whether to tolerate typos in title tokens
+            min_rating: Optional minimum vote_average (integer)
+            after: (score, movie_id) of the last movie of the previous page
+
+        Returns:
+            (score, movie_id) pairs of the requested page, best match first
+        """
+        hits, term_groups, _ = self._match(query, genre, year, fuzzy=fuzzy, min_rating=min_rating)
+        if not hits or limit <= 0:
+            return []
+
+        def score(movie_id: str) -> Tuple[float, str]:
+            doc = self._docs[movie_id]
+            relevance = self._bm25(doc, term_groups) if term_groups else 1.0
+            return relevance * self._popularity(doc), movie_id
+
+        scored = (score(movie_id) for movie_id in hits)
+        if after is not None:
+            after = tuple(after)
+            scored = (key for key in scored if key < after)
+        top = heapq.nlargest(skip + limit, scored)
+        return top[skip:]
+
+    def facet_counts(
+        self,
+        query: Optional[str] = None,
+        genre: Optional[str] = None,
+        year: Optional[int] = None,
+        fuzzy: bool = False,
+        min_rating: Optional[int] = None
+    ) -> Dict[str, Dict[str, int]]:
+        """
+        Count the matching movies per genre, release year and rating band.
+
+        Without a text query the counts are popcounts of the filter bitmaps.
+
+        Args:
+            query: Search query for movie title or description
+            genre: Optional genre filter
+            year: Optional release year filter
+            fuzzy: Whether to tolerate typos in title tokens
+            min_rating: Optional minimum vote_average (integer)
+
+        Returns:
+            Dictionary with "genres", "years" and "rating_bands" counts
+        """
+        hits, term_groups, filter_bits = self._match(query, genre, year, fuzzy=fuzzy, min_rating=min_rating)
+        if term_groups or filter_bits is None:
+            mask = self._bitmaps.mask_of(hits)
+        else:
+            mask = filter_bits & self._bitmaps.live
+
+        rating_bands: Counter = Counter()
+        for bucket, count in self._bitmaps.counts("rating", mask).items():
+            rating_bands[rating_band(bucket)] += count
+
+        return {
+            "genres": self._bitmaps.counts("genre", mask),
+            "years": {str(year): count for year, count in self._bitmaps.counts("year", mask).items()},
+            "rating_bands": dict(rating_bands),
+        }
+
+    def filter(
+        self,
+        genre: Optional[str] = None,
+        year: Optional[int] = None,
+        is_featured: Optional[bool] = None,
+        min_rating: Optional[int] = None,
+        skip: int = 0,
+        limit: int = 20,
+        after: Optional[str] = None
+    ) -> List[str]:
+        """
+        Browse movies by filters only, in catalog (_id) order.
+
+        Args:
+            genre: Optional genre filter
+            year: Optional release year filter
+            is_featured: Optional featured flag filter
+            min_rating: Optional minimum vote_average (integer)
+            skip: Number of movies to skip
+            limit: Maximum number of movies to return
+            after: Only return movies indexed after this movie ID
+
+        Returns:
+            Movie IDs of the requested page
+
+        Raises:
+            KeyError: If after is not an indexed movie
+        """
+        bits = self._filter_bits(genre, year, is_featured, min_rating)
+        if bits is None:
+            bits = self._bitmaps.live
+        return self._bitmaps.ids(bits, skip=skip, limit=limit, after=after)
+
+    def count(
+        self,
+        genre: Optional[str] = None,
+        year: Optional[int] = None,
+        is_featured: Optional[bool] = None,
+        min_rating: Optional[int] = None
+    ) -> int:
+        """Number of movies matching the filters (popcount)"""
+        bits = self._filter_bits(genre, year, is_featured, min_rating)
+        return popcount((self._bitmaps.live if bits is None else bits) & self._bitmaps.live)
+
+    def suggest(self, prefix: str, limit: int = SUGGEST_TOP_K) -> List[Dict[str, Any]]:
+        """
+        Most viewed movies whose title (or a word suffix of it) starts with prefix.
+
+        Args:
+            prefix: Raw text typed by the user
+            limit: Maximum number of suggestions (at most SUGGEST_TOP_K)
+
+        Returns:
+            List of {"id", "title", "poster_path"} dicts, most viewed first
+        """
+        normalized = clean_query(prefix or "")
+        if not normalized:
+            return []
+
+        suggestions = []
+        for movie_id in self._title_trie.top(normalized, limit):
+            doc = self._docs[movie_id]
+            suggestions.append({"id": movie_id, "title": doc["title"], "poster_path": doc["poster_path"]})
+        return suggestions
+
+
+# Index dùng chung cho toàn bộ ứng dụng, được build trong startup event
+movie_search_index = MovieSearchIndex()
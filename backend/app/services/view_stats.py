@@ -0,0 +1,421 @@
+"""
+Write-behind movie view counters, trending scores, time-bucketed views and materialized top lists.
+Lượt xem được gom trong bộ nhớ rồi ghi định kỳ: một bulk_write cập nhật view_count và
+trending_score trong movies, một bulk_write vào movie_view_buckets (mỗi document là lượt xem của một phim trong một ngày UTC,
+kèm số lượt theo từng giờ và sketch HyperLogLog người xem). Top phim theo tuần/tháng/năm được tính định kỳ vào movie_top_views
+để API chỉ đọc một document.
+"""
+
+import asyncio
+import logging
+import math
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from ..utils.hyperloglog import HyperLogLog
+
+logger = logging.getLogger(__name__)
+
+# Số ngày của từng khoảng thời gian (tính cả hôm nay)
+TOP_PERIODS = {
+    "week": 7,
+    "month": 30,
+    "year": 365,
+}
+# Số phim lưu sẵn cho mỗi khoảng thời gian
+TOP_VIEWS_SIZE = 100
+
+# Ghi lượt xem xuống database sau VIEW_FLUSH_INTERVAL giây hoặc khi có VIEW_FLUSH_EVENTS lượt xem đang chờ
+VIEW_FLUSH_INTERVAL = 1.0
+VIEW_FLUSH_EVENTS = 500
+TOP_REFRESH_INTERVAL = 300.0
+# Điểm trending giảm một nửa sau mỗi TRENDING_HALF_LIFE_HOURS giờ không có lượt xem
+TRENDING_HALF_LIFE_HOURS = 48
+# Mốc thời gian cố định của forward decay: mỗi lượt xem lúc t đóng góp 2^((t - mốc) / chu kỳ bán rã).
+# Mọi phim cùng chia cho 2^((now - mốc) / chu kỳ bán rã) nên thứ tự theo giá trị lưu không đổi
+# và index trên trending_score cho ra bảng xếp hạng hiện tại mà không cần tính lại định kỳ.
+# Giá trị được lưu dưới dạng log2 để không bao giờ tràn số.
+TRENDING_EPOCH = datetime(2025, 1, 1)
+
+# Số lần thử lại khi sketch trong database bị process khác ghi đè giữa lúc đọc và ghi
+SKETCH_MERGE_RETRIES = 3
+# Bucket cũ hơn khoảng dài nhất vài tuần thì MongoDB tự xoá
+BUCKET_RETENTION_DAYS = TOP_PERIODS["year"] + 35
+
+
+def bucket_day(at: datetime) -> datetime:
+    """Start of the UTC day containing at"""
+    return datetime(at.year, at.month, at.day)
+
+
+def trending_exponent(at: datetime) -> float:
+    """log2 of the forward-decay weight of a view at the given time"""
+    return (at - TRENDING_EPOCH).total_seconds() / (TRENDING_HALF_LIFE_HOURS * 3600)
+
+
+def log2_add(a: float, b: float) -> float:
+    """log2(2^a + 2^b) without overflow"""
+    high, low = max(a, b), min(a, b)
+    return high + math.log2(1 + 2 ** (low - high))
+
+
+def trending_score(stored: float, now: Optional[datetime] = None) -> float:
+    """
+    Current decayed trending score from the stored log2 value.
+
+    Args:
+        stored: trending_score field of a movie
+        now: Reference time (defaults to now, UTC)
+
+    Returns:
+        Sum over views of 2^(-age / half-life), i.e. views weighted by recency
+    """
+    return 2 ** (stored - trending_exponent(now or datetime.utcnow()))
+
+
+def failed_indexes(exc: BulkWriteError) -> List[int]:
+    """Positions of the operations an unordered bulk_write could not apply"""
+    return sorted({error["index"] for error in exc.details.get("writeErrors", [])})
+
+
+def _log2_add_expression(field: str, value: float) -> Dict[str, Any]:
+    """Aggregation expression for log2_add(field, value), treating a missing field as no views"""
+    return {"$cond": [
+        {"$eq": [{"$ifNull": [field, None]}, None]},
+        value,
+        {"$add": [
+            {"$max": [field, value]},
+            {"$log": [{"$add": [1, {"$pow": [2, {"$subtract": [{"$min": [field, value]}, {"$max": [field, value]}]}]}]}, 2]}
+        ]}
+    ]}
+
+
+async def ensure_view_indexes(db) -> None:
+    """
+    Create the indexes of the view bucket collection.
+
+    Args:
+        db: Motor database
+    """
+    await db.movie_view_buckets.create_index([("movie_id", 1), ("day", 1)], unique=True)
+    await db.movie_view_buckets.create_index(
+        [("day", 1)], expireAfterSeconds=BUCKET_RETENTION_DAYS * 24 * 3600
+    )
+
+
+class ViewCounter:
+    """Pending view increments, per movie and per (movie, day, hour), until the next flush"""
+
+    def __init__(self, flush_events: int = VIEW_FLUSH_EVENTS):
+        self.flush_events = flush_events
+        self.db = None
+        self._view_counts: Dict[str, int] = defaultdict(int)
+        # log2 tổng trọng số trending của các lượt xem đang chờ, theo phim
+        self._trending: Dict[str, float] = {}
+        self._buckets: Dict[Tuple[str, datetime, int], int] = defaultdict(int)
+        # Sketch người xem theo (phim, ngày) và theo phim (toàn thời gian)
+        self._day_viewers: Dict[Tuple[str, datetime], HyperLogLog] = defaultdict(HyperLogLog)
+        self._movie_viewers: Dict[str, HyperLogLog] = defaultdict(HyperLogLog)
+        self._events = 0
+        self._flushing: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return self._events
+
+    def pending(self, movie_id: str) -> int:
+        """Views of a movie counted but not yet written to the movies collection"""
+        return self._view_counts.get(movie_id, 0)
+
+    def start(self, db) -> None:
+        """Attach the database that flushes write to"""
+        self.db = db
+
+    def add(self, movie_id: str, viewer_id: Optional[str] = None, at: Optional[datetime] = None) -> int:
+        """
+        Count one view of a movie.
+
+        Args:
+            movie_id: Movie ID
+            viewer_id: User ID, counted in the unique-viewer sketches
+            at: Time of the view (defaults to now, UTC)
+
+        Returns:
+            Views of this movie waiting to be flushed, including this one
+        """
+        at = at or datetime.utcnow()
+        self._view_counts[movie_id] += 1
+        weight = trending_exponent(at)
+        self._trending[movie_id] = log2_add(self._trending[movie_id], weight) if movie_id in self._trending else weight
+        self._buckets[(movie_id, bucket_day(at), at.hour)] += 1
+        if viewer_id is not None:
+            self._day_viewers[(movie_id, bucket_day(at))].add(viewer_id)
+            self._movie_viewers[movie_id].add(viewer_id)
+        self._events += 1
+        if self._events >= self.flush_events and self.db is not None and self._flushing is None:
+            self._flushing = asyncio.ensure_future(self.flush())
+            self._flushing.add_done_callback(self._flush_done)
+        return self._view_counts[movie_id]
+
+    async def close(self) -> int:
+        """
+        Write every pending view before the database connection is closed.
+
+        Waits for a flush started by add() first: its batch is already out of the
+        pending dicts, so closing the connection under it would lose those views.
+
+        Returns:
+            Number of views written by the final flush
+        """
+        if self._flushing is not None:
+            try:
+                await self._flushing
+            except Exception:
+                # Đã được log trong _flush_done và lô đã được trả lại, flush bên dưới ghi lại
+                pass
+        return await self.flush()
+
+    def _flush_done(self, task: asyncio.Task) -> None:
+        self._flushing = None
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Error flushing view counts: {task.exception()}")
+
+    async def flush(self) -> int:
+        """
+        Write the pending increments: one bulk_write to movies, one to movie_view_buckets,
+        then merge the viewer sketches into both.
+
+        Returns:
+            Number of views written
+        """
+        if self.db is None or not self._events:
+            return 0
+
+        # Đổi sang dict mới trước khi await để lượt xem đến trong lúc ghi không bị mất
+        view_counts, self._view_counts = self._view_counts, defaultdict(int)
+        trending, self._trending = self._trending, {}
+        buckets, self._buckets = self._buckets, defaultdict(int)
+        day_viewers, self._day_viewers = self._day_viewers, defaultdict(HyperLogLog)
+        movie_viewers, self._movie_viewers = self._movie_viewers, defaultdict(HyperLogLog)
+        events, self._events = self._events, 0
+
+        now = datetime.utcnow()
+        movie_ids = list(view_counts)
+        # Update dạng pipeline để cộng trending_score trong miền log2 ngay trên server, O(1) mỗi phim
+        movie_operations = [
+            UpdateOne(
+                {"_id": ObjectId(movie_id)},
+                [{"$set": {
+                    "view_count": {"$add": [{"$ifNull": ["$view_count", 0]}, view_counts[movie_id]]},
+                    "trending_score": _log2_add_expression("$trending_score", trending[movie_id]),
+                    "trending_updated_at": now,
+                    "updated_at": now
+                }}]
+            )
+            for movie_id in movie_ids
+        ]
+        try:
+            await self.db.movies.bulk_write(movie_operations, ordered=False)
+        except BulkWriteError as exc:
+            # bulk_write không theo thứ tự: các update khác đã được ghi, chỉ trả lại phim bị lỗi
+            # (trả lại cả lô sẽ cộng hai lần lượt xem đã ghi ở lần flush sau)
+            failed = [movie_ids[index] for index in failed_indexes(exc)]
+            failed_views = sum(view_counts[movie_id] for movie_id in failed)
+            self._restore(
+                {movie_id: view_counts[movie_id] for movie_id in failed}, {}, failed_views, {}, {},
+                {movie_id: trending[movie_id] for movie_id in failed}
+            )
+            events -= failed_views
+            logger.error(f"Error writing view counts of {len(failed)} movies: {exc}")
+        except Exception:
+            # Không biết update nào đã được ghi: trả lại tất cả để lần flush sau thử lại
+            self._restore(view_counts, buckets, events, day_viewers, movie_viewers, trending)
+            raise
+
+        totals: Dict[Tuple[str, datetime], Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        for (movie_id, day, hour), count in buckets.items():
+            increments = totals[(movie_id, day)]
+            increments["total"] += count
+            increments[f"hours.{hour}"] += count
+
+        bucket_keys = list(totals)
+        bucket_operations = [
+            UpdateOne({"movie_id": movie_id, "day": day}, {"$inc": dict(totals[(movie_id, day)])}, upsert=True)
+            for movie_id, day in bucket_keys
+        ]
+        try:
+            await self.db.movie_view_buckets.bulk_write(bucket_operations, ordered=False)
+        except BulkWriteError as exc:
+            # view_count đã được ghi, chỉ thử lại các bucket lỗi cùng sketch của chúng
+            failed = {bucket_keys[index] for index in failed_indexes(exc)}
+            self._restore(
+                {},
+                {key: count for key, count in buckets.items() if key[:2] in failed},
+                0,
+                {key: day_viewers.pop(key) for key in failed if key in day_viewers},
+                {}
+            )
+            logger.error(f"Error writing {len(failed)} view buckets: {exc}")
+        except Exception:
+            # view_count đã được ghi, chỉ thử lại phần bucket và sketch
+            self._restore({}, buckets, 0, day_viewers, movie_viewers)
+            raise
+
+        # Bucket và phim đều đã tồn tại ở đây nên chỉ cần gộp sketch vào document có sẵn
+        try:
+            await merge_sketches(self.db.movie_view_buckets, [
+                ({"movie_id": movie_id, "day": day}, sketch)
+                for (movie_id, day), sketch in day_viewers.items()
+            ])
+            await merge_sketches(self.db.movies, [
+                ({"_id": ObjectId(movie_id)}, sketch) for movie_id, sketch in movie_viewers.items()
+            ])
+        except Exception:
+            # Gộp lại nhiều lần vẫn đúng (max từng thanh ghi) nên có thể thử lại cả hai
+            self._restore({}, {}, 0, day_viewers, movie_viewers)
+            raise
+
+        logger.debug(f"Flushed {events} views of {len(movie_operations)} movies")
+        return events
+
+    def _restore(
+        self,
+        view_counts: Dict[str, int],
+        buckets: Dict[Tuple[str, datetime, int], int],
+        events: int,
+        day_viewers: Dict[Tuple[str, datetime], HyperLogLog],
+        movie_viewers: Dict[str, HyperLogLog],
+        trending: Optional[Dict[str, float]] = None
+    ) -> None:
+        for movie_id, count in view_counts.items():
+            self._view_counts[movie_id] += count
+        for movie_id, weight in (trending or {}).items():
+            current = self._trending.get(movie_id)
+            self._trending[movie_id] = weight if current is None else log2_add(current, weight)
+        for key, count in buckets.items():
+            self._buckets[key] += count
+        for key, sketch in day_viewers.items():
+            self._day_viewers[key].merge(sketch)
+        for movie_id, sketch in movie_viewers.items():
+            self._movie_viewers[movie_id].merge(sketch)
+        self._events += events
+
+
+async def merge_sketches(collection, sketches: List[Tuple[Dict[str, Any], HyperLogLog]]) -> None:
+    """
+    Merge in-memory sketches into the viewer_sketch field of existing documents.
+
+    Each write is a compare-and-set on the sketch that was read, so two processes
+    flushing the same document cannot overwrite each other's registers.
+
+    Args:
+        collection: Motor collection holding the documents
+        sketches: (filter matching one document, sketch to merge)
+    """
+    remaining = sketches
+    for _ in range(SKETCH_MERGE_RETRIES):
+        if not remaining:
+            return
+
+        fields = list(remaining[0][0])
+        stored = {
+            tuple(doc[field] for field in fields): doc.get("viewer_sketch")
+            async for doc in collection.find(
+                {"$or": [query for query, _ in remaining]},
+                {"viewer_sketch": 1, **{field: 1 for field in fields}}
+            )
+        }
+
+        operations = []
+        pending = []
+        for query, sketch in remaining:
+            key = tuple(query[field] for field in fields)
+            if key not in stored:
+                # Phim đã bị xoá
+                continue
+            current = stored[key]
+            merged = HyperLogLog.from_bytes(current).merge(sketch).to_bytes()
+            if merged == current:
+                continue
+            operations.append(UpdateOne({**query, "viewer_sketch": current}, {"$set": {"viewer_sketch": merged}}))
+            pending.append((query, sketch))
+
+        if not operations:
+            return
+        result = await collection.bulk_write(operations, ordered=False)
+        if result.matched_count == len(operations):
+            return
+        # Một số document vừa bị process khác cập nhật: đọc lại và gộp lại những cái đó
+        remaining = pending
+
+    logger.warning(f"Viewer sketches still contended after {SKETCH_MERGE_RETRIES} attempts")
+
+
+async def refresh_top_movies(db, now: Optional[datetime] = None) -> None:
+    """
+    Recompute the top movies of every period from the view buckets.
+
+    Args:
+        db: Motor database
+        now: Reference time (defaults to now, UTC)
+    """
+    now = now or datetime.utcnow()
+    today = bucket_day(now)
+
+    for period, days in TOP_PERIODS.items():
+        pipeline = [
+            {"$match": {"day": {"$gte": today - timedelta(days=days - 1)}}},
+            {"$group": {"_id": "$movie_id", "views": {"$sum": "$total"}}},
+            {"$sort": {"views": -1, "_id": 1}},
+            {"$limit": TOP_VIEWS_SIZE},
+        ]
+        top = await db.movie_view_buckets.aggregate(pipeline).to_list(length=TOP_VIEWS_SIZE)
+        await db.movie_top_views.replace_one(
+            {"_id": period},
+            {
+                "movies": [{"movie_id": entry["_id"], "views": entry["views"]} for entry in top],
+                "updated_at": now
+            },
+            upsert=True
+        )
+
+    logger.info(f"Top movies refreshed for periods {', '.join(TOP_PERIODS)}")
+
+
+async def run_view_stats(counter: "ViewCounter", db, stop: Optional[asyncio.Event] = None) -> None:
+    """
+    Background loop flushing view counts and refreshing the top lists.
+
+    The loop is stopped through the stop event rather than cancelled, so that a
+    flush in progress always finishes (or restores its batch) before it returns.
+
+    Args:
+        counter: View counter to flush
+        db: Motor database
+        stop: Event ending the loop after the current iteration
+    """
+    stop = stop or asyncio.Event()
+    loop = asyncio.get_running_loop()
+    next_refresh = loop.time()
+    while not stop.is_set():
+        try:
+            await counter.flush()
+            if loop.time() >= next_refresh:
+                await refresh_top_movies(db)
+                next_refresh = loop.time() + TOP_REFRESH_INTERVAL
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error updating view stats: {str(e)}")
+        try:
+            await asyncio.wait_for(stop.wait(), VIEW_FLUSH_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+
+
+# Bộ đếm dùng chung cho toàn bộ ứng dụng
+view_counter = ViewCounter()
@@ -0,0 +1,170 @@
+"""
+Per-user daily watch rollups.
+Mỗi document trong user_watch_daily là thời lượng xem, số phim đã xem và số phim theo thể loại
+của một người dùng trong một ngày UTC, được cộng dồn bằng $inc mỗi khi lịch sử xem được ghi.
+Thống kê tuần/tháng/năm chỉ đọc tối đa 366 document nhỏ thay vì quét watch_history.
+"""
+
+import logging
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Any, Dict, Iterable, Tuple
+
+from pymongo import ReplaceOne
+
+from .genre_affinity import genre_key
+from .view_stats import bucket_day, BUCKET_RETENTION_DAYS
+from ..utils.cursor import as_object_id
+
+logger = logging.getLogger(__name__)
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+async def ensure_rollup_indexes(db) -> None:
+    """
+    Create the indexes of the rollup collection.
+
+    Args:
+        db: Motor database
+    """
+    await db.user_watch_daily.create_index([("user_id", 1), ("day", 1)], unique=True)
+    await db.user_watch_daily.create_index(
+        [("day", 1)], expireAfterSeconds=BUCKET_RETENTION_DAYS * 24 * 3600
+    )
+
+
+async def record_watch(
+    db,
+    user_id: str,
+    at: datetime,
+    seconds: int = 0,
+    new_movie: bool = False,
+    genres: Iterable[str] = ()
+) -> None:
+    """
+    Add a watch event to the user's rollup of that day.
+
+    Args:
+        db: Motor database
+        user_id: User ID
+        at: Time of the event
+        seconds: Watch time added by this event
+        new_movie: True for the first event of this movie on that day
+        genres: Genres of the movie, counted only for a new movie
+    """
+    increments: Dict[str, int] = {}
+    if seconds > 0:
+        increments["seconds"] = seconds
+    if new_movie:
+        increments["count"] = 1
+        for genre in {genre_key(genre) for genre in genres if genre}:
+            increments[f"genres.{genre}"] = 1
+    if not increments:
+        return
+
+    await db.user_watch_daily.update_one(
+        {"user_id": str(user_id), "day": bucket_day(at)},
+        {"$inc": increments},
+        upsert=True
+    )
+
+
+async def get_daily_rollups(db, user_id: str, since: datetime) -> Dict[datetime, Dict[str, Any]]:
+    """
+    Load the rollups of a user from a given day.
+
+    Args:
+        db: Motor database
+        user_id: User ID
+        since: First day to load
+
+    Returns:
+        Day -> rollup document
+    """
+    cursor = db.user_watch_daily.find(
+        {"user_id": str(user_id), "day": {"$gte": bucket_day(since)}},
+        {"_id": 0, "day": 1, "seconds": 1, "count": 1, "genres": 1}
+    )
+    return {rollup["day"]: rollup async for rollup in cursor}
+
+
+def minutes_between(rollups: Dict[datetime, Dict[str, Any]], start: datetime, end: datetime) -> int:
+    """Minutes watched on the days in [start, end)"""
+    return sum(rollup.get("seconds", 0) for day, rollup in rollups.items() if start <= day < end) // 60
+
+
+def summarize(rollups: Dict[datetime, Dict[str, Any]], start: datetime) -> Dict[str, Any]:
+    """
+    Totals and favorite genre from a given day onwards.
+
+    Args:
+        rollups: Output of get_daily_rollups()
+        start: First day of the period
+
+    Returns:
+        Dictionary with total_movies, total_minutes and favorite_genre
+    """
+    selected = [rollup for day, rollup in rollups.items() if day >= start]
+    genres: Counter = Counter()
+    for rollup in selected:
+        genres.update(rollup.get("genres") or {})
+    favorite = min(genres.items(), key=lambda item: (-item[1], item[0]))[0] if genres else None
+    return {
+        "total_movies": sum(rollup.get("count", 0) for rollup in selected),
+        "total_minutes": sum(rollup.get("seconds", 0) for rollup in selected) // 60,
+        "favorite_genre": favorite
+    }
+
+
+def month_start(at: datetime, months_back: int = 0) -> datetime:
+    """First day of the month months_back months before the month of at"""
+    index = at.year * 12 + at.month - 1 - months_back
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+async def backfill_watch_rollups(db) -> int:
+    """
+    Rebuild every rollup from the existing watch_history (offline job).
+
+    Each entry counts as one movie on the day of its watched_at with its whole duration,
+    since older entries do not keep their individual events. Rollups are replaced, so the
+    job should run before new events start being recorded.
+
+    Args:
+        db: Motor database
+
+    Returns:
+        Number of rollup documents written
+    """
+    movie_genres = {
+        movie["_id"]: movie.get("genres") or []
+        async for movie in db.movies.find({}, {"genres": 1})
+    }
+
+    rollups: Dict[Tuple[str, datetime], Dict[str, Any]] = defaultdict(
+        lambda: {"seconds": 0, "count": 0, "genres": Counter()}
+    )
+    projection = {"_id": 0, "user_id": 1, "movie_id": 1, "watched_at": 1, "duration_seconds": 1}
+    async for entry in db.watch_history.find({}, projection):
+        if not isinstance(entry.get("watched_at"), datetime):
+            continue
+        rollup = rollups[(str(entry["user_id"]), bucket_day(entry["watched_at"]))]
+        rollup["seconds"] += entry.get("duration_seconds") or 0
+        rollup["count"] += 1
+        rollup["genres"].update({genre_key(genre) for genre in movie_genres.get(as_object_id(entry.get("movie_id")), [])})
+
+    operations = [
+        ReplaceOne(
+            {"user_id": user_id, "day": day},
+            {"user_id": user_id, "day": day, "seconds": rollup["seconds"], "count": rollup["count"],
+             "genres": dict(rollup["genres"])},
+            upsert=True
+        )
+        for (user_id, day), rollup in rollups.items()
+    ]
+    for start in range(0, len(operations), BACKFILL_BATCH_SIZE):
+        await db.user_watch_daily.bulk_write(operations[start:start + BACKFILL_BATCH_SIZE], ordered=False)
+
+    logger.info(f"Watch rollups backfilled: {len(operations)} user-days")
+    return len(operations)
@@ -0,0 +1,179 @@
+"""
+Compact bitmap index keyed by dense item ordinals.
+Mỗi giá trị của một trường (genre, năm, ...) được lưu thành một bitset (Python int),
+bit thứ i tương ứng với item có ordinal i. Bộ lọc kết hợp là các phép AND/OR trên bitset
+và số lượng được đếm bằng popcount.
+"""
+
+from collections import defaultdict
+from typing import Any, Dict, Hashable, Iterable, Iterator, List, Optional
+
+if hasattr(int, "bit_count"):
+    popcount = int.bit_count
+else:  # Python < 3.10
+    def popcount(bits: int) -> int:
+        return bin(bits).count("1")
+
+
+def iter_ordinals(bits: int) -> Iterator[int]:
+    """Yield the positions of the set bits, lowest first"""
+    while bits:
+        lowest = bits & -bits
+        yield lowest.bit_length() - 1
+        bits ^= lowest
+
+
+class BitmapIndex:
+    """Per-field, per-value bitsets over items identified by string IDs"""
+
+    def __init__(self):
+        self._ordinals: Dict[str, int] = {}
+        self._ids: List[Optional[str]] = []
+        self._values: Dict[str, Dict[str, List[Hashable]]] = {}
+        self._bitmaps: Dict[str, Dict[Hashable, int]] = defaultdict(lambda: defaultdict(int))
+        self._live = 0
+
+    def __len__(self) -> int:
+        return len(self._ordinals)
+
+    @property
+    def live(self) -> int:
+        """Bitset of every indexed item"""
+        return self._live
+
+    def ordinal(self, item_id: str) -> Optional[int]:
+        return self._ordinals.get(item_id)
+
+    def add(self, item_id: str, values: Dict[str, Iterable[Hashable]]) -> None:
+        """
+        Index an item, replacing its previous field values.
+
+        New items get the next ordinal, so ordinal order follows insertion order.
+
+        Args:
+            item_id: Item identifier
+            values: Field name -> values the item has for that field
+        """
+        if item_id in self._ordinals:
+            ordinal = self._ordinals[item_id]
+            self._clear_values(item_id, ordinal)
+        else:
+            ordinal = len(self._ids)
+            self._ordinals[item_id] = ordinal
+            self._ids.append(item_id)
+
+        bit = 1 << ordinal
+        stored = {}
+        for field, field_values in values.items():
+            field_values = list(dict.fromkeys(field_values))
+            for value in field_values:
+                self._bitmaps[field][value] |= bit
+            stored[field] = field_values
+        self._values[item_id] = stored
+        self._live |= bit
+
+    def remove(self, item_id: str) -> None:
+        """
+        Remove an item. Its ordinal is not reused until the index is rebuilt.
+
+        Args:
+            item_id: Item identifier
+        """
+        ordinal = self._ordinals.pop(item_id, None)
+        if ordinal is None:
+            return
+        self._clear_values(item_id, ordinal)
+        self._values.pop(item_id, None)
+        self._ids[ordinal] = None
+        self._live &= ~(1 << ordinal)
+
+    def _clear_values(self, item_id: str, ordinal: int) -> None:
+        mask = ~(1 << ordinal)
+        for field, field_values in self._values.get(item_id, {}).items():
+            bitmaps = self._bitmaps[field]
+            for value in field_values:
+                bitmaps[value] &= mask
+                if not bitmaps[value]:
+                    del bitmaps[value]
+
+    def bitmap(self, field: str, value: Hashable) -> int:
+        """Bitset of the items having value for field"""
+        return self._bitmaps.get(field, {}).get(value, 0)
+
+    def any_of(self, field: str, values: Iterable[Hashable]) -> int:
+        """Bitset of the items having at least one of the values for field (OR)"""
+        bits = 0
+        for value in values:
+            bits |= self.bitmap(field, value)
+        return bits
+
+    def values(self, field: str) -> List[Hashable]:
+        """Every value currently present for field"""
+        return list(self._bitmaps.get(field, {}))
+
+    def mask_of(self, item_ids: Iterable[str]) -> int:
+        """Bitset of the given items"""
+        bits = 0
+        for item_id in item_ids:
+            ordinal = self._ordinals.get(item_id)
+            if ordinal is not None:
+                bits |= 1 << ordinal
+        return bits
+
+    def contains(self, bits: int, item_id: str) -> bool:
+        """Whether item_id is set in bits"""
+        ordinal = self._ordinals.get(item_id)
+        return ordinal is not None and (bits >> ordinal) & 1 == 1
+
+    def ids(
+        self,
+        bits: int,
+        skip: int = 0,
+        limit: Optional[int] = None,
+        after: Optional[str] = None
+    ) -> List[str]:
+        """
+        Item IDs for the set bits, in ordinal order.
+
+        Args:
+            bits: Bitset of items
+            skip: Number of items to skip
+            limit: Maximum number of items to return
+            after: Only return items whose ordinal is greater than this item's
+
+        Returns:
+            List of item IDs
+        """
+        bits &= self._live
+        if after is not None:
+            ordinal = self._ordinals.get(after)
+            if ordinal is None:
+                raise KeyError(after)
+            bits = (bits >> (ordinal + 1)) << (ordinal + 1)
+
+        result = []
+        for position, ordinal in enumerate(iter_ordinals(bits)):
+            if position < skip:
+                continue
+            if limit is not None and len(result) >= limit:
+                break
+            result.append(self._ids[ordinal])
+        return result
+
+    def counts(self, field: str, bits: int) -> Dict[Any, int]:
+        """
+        Number of items of bits having each value of field (popcount per value).
+
+        Args:
+            field: Field name
+            bits: Bitset restricting the counted items
+
+        Returns:
+            Value -> count, zero counts omitted
+        """
+        counts = {}
+        for value, bitmap in self._bitmaps.get(field, {}).items():
+            count = popcount(bitmap & bits)
+            if count:
+                counts[value] = count
+        return counts
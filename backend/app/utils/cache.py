@@ -0,0 +1,109 @@
+"""
+In-process TTL cache with LRU eviction and single-flight loading.
+Mỗi key chỉ có tối đa một lần load đang chạy: các request đến cùng lúc khi key hết hạn
+sẽ chờ chung kết quả của lần load đó thay vì cùng truy vấn database.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """Bounded key -> value cache whose entries expire after a per-call TTL"""
+
+    def __init__(self, max_size: int = 256):
+        self.max_size = max_size
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._pending: Dict[Hashable, asyncio.Task] = {}
+        # Tăng mỗi lần invalidate để kết quả của lần load cũ không được ghi vào cache
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Any:
+        """
+        Return the cached value for key, or None if missing or expired.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            Cached value or None
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: float) -> None:
+        """
+        Store a value, evicting the least recently used entries past max_size.
+
+        Args:
+            key: Cache key
+            value: Value to store
+            ttl: Time to live in seconds
+        """
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    async def get_or_load(self, key: Hashable, ttl: float, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Return the cached value for key, loading it at most once concurrently.
+
+        The load runs in its own task, so a cancelled caller does not cancel it
+        for the other callers waiting on the same key.
+
+        Args:
+            key: Cache key
+            ttl: Time to live in seconds for a freshly loaded value
+            loader: Coroutine function computing the value
+
+        Returns:
+            Cached or freshly loaded value
+        """
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        task = self._pending.get(key)
+        if task is None:
+            task = asyncio.ensure_future(loader())
+            self._pending[key] = task
+            generation = self._generation
+
+            def _store(done: asyncio.Task) -> None:
+                if self._pending.get(key) is done:
+                    del self._pending[key]
+                if done.cancelled() or done.exception() is not None:
+                    return
+                if generation == self._generation:
+                    self.set(key, done.result(), ttl)
+
+            task.add_done_callback(_store)
+
+        return await asyncio.shield(task)
+
+    def invalidate(self) -> None:
+        """Drop every entry and detach loads that started before this call"""
+        self._generation += 1
+        self._entries.clear()
+        self._pending.clear()
+        logger.debug("Cache invalidated")
@@ -0,0 +1,95 @@
+"""
+Opaque cursor tokens for keyset pagination.
+Cursor chứa giá trị sort key và _id của phần tử cuối trang trước, nên trang tiếp theo
+chỉ cần một lần seek trên index thay vì skip qua toàn bộ các trang trước.
+"""
+
+import base64
+import binascii
+from typing import Any, Dict, List, Optional
+
+from bson import json_util
+from bson.errors import InvalidId
+from bson.objectid import ObjectId
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a client sends a cursor token that was not produced by encode_cursor"""
+
+
+def encode_cursor(*values: Any) -> str:
+    """
+    Pack sort key values into an opaque URL-safe token.
+
+    Args:
+        values: Sort key values of the last item, ending with its _id
+
+    Returns:
+        Cursor token
+    """
+    payload = json_util.dumps(list(values)).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str, size: int) -> List[Any]:
+    """
+    Unpack a token produced by encode_cursor.
+
+    Args:
+        token: Cursor token sent back by the client
+        size: Number of values the cursor must hold
+
+    Returns:
+        List of sort key values
+
+    Raises:
+        InvalidCursorError: If the token is malformed
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json_util.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (binascii.Error, UnicodeError, ValueError, TypeError) as e:
+        raise InvalidCursorError(f"Invalid cursor: {token}") from e
+
+    if not isinstance(values, list) or len(values) != size:
+        raise InvalidCursorError(f"Invalid cursor: {token}")
+    return values
+
+
+def as_object_id(value: Any) -> Any:
+    """Convert a 24-char hex string to ObjectId, leaving other IDs (UUIDs) untouched"""
+    if isinstance(value, str):
+        try:
+            return ObjectId(value)
+        except InvalidId:
+            return value
+    return value
+
+
+def keyset_query(
+    field: Optional[str],
+    value: Any,
+    last_id: Any,
+    descending: bool = True
+) -> Dict[str, Any]:
+    """
+    Mongo filter selecting the items after (field, _id) in a sort on (field, _id).
+
+    Args:
+        field: Sort field, or None when sorting on _id only
+        value: Sort field value of the last item
+        last_id: _id of the last item
+        descending: Whether the sort is descending
+
+    Returns:
+        Filter to combine with the page query
+    """
+    op = "$lt" if descending else "$gt"
+    if field is None:
+        return {"_id": {op: last_id}}
+    return {
+        "$or": [
+            {field: {op: value}},
+            {field: value, "_id": {op: last_id}}
+        ]
+    }
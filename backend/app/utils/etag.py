@@ -0,0 +1,133 @@
+"""
+Helpers for conditional GET requests (ETag / If-None-Match, Last-Modified / If-Modified-Since).
+ETag được tạo từ updated_at khi có, nếu không thì từ hash nội dung JSON của response.
+"""
+
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Dict, Optional
+
+from fastapi import Request, Response
+from pydantic_core import to_json
+
+# Client luôn phải hỏi lại server, nhưng được phép dùng bản cache khi nhận 304
+CACHE_CONTROL = "no-cache"
+
+
+def make_etag(*parts: Any) -> str:
+    """
+    Build a strong ETag from version parts (IDs, updated_at, ...).
+
+    Args:
+        parts: Values identifying the representation version
+
+    Returns:
+        Quoted ETag value
+    """
+    digest = hashlib.sha1("|".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+    return f'"{digest}"'
+
+
+def content_etag(body: bytes) -> str:
+    """Strong ETag from the response body bytes"""
+    return f'"{hashlib.sha1(body).hexdigest()}"'
+
+
+def is_conditional(request: Request) -> bool:
+    """Whether the request carries If-None-Match or If-Modified-Since"""
+    return "if-none-match" in request.headers or "if-modified-since" in request.headers
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """
+    Whether the request's If-None-Match header matches etag (weak comparison, as in RFC 9110).
+
+    Args:
+        request: Incoming request
+        etag: Current ETag of the resource
+
+    Returns:
+        True if the client already has this version
+    """
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def not_modified_since(request: Request, last_modified: Optional[datetime]) -> bool:
+    """
+    Whether If-Modified-Since is at or after last_modified (only used without If-None-Match).
+
+    Args:
+        request: Incoming request
+        last_modified: Last modification time of the resource (naive values are UTC)
+
+    Returns:
+        True if the client's copy is still current
+    """
+    header = request.headers.get("if-modified-since")
+    if not header or last_modified is None or "if-none-match" in request.headers:
+        return False
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    if last_modified.tzinfo is None:
+        last_modified = last_modified.replace(tzinfo=timezone.utc)
+    # HTTP date chỉ chính xác tới giây
+    return last_modified.replace(microsecond=0) <= since
+
+
+def validator_headers(etag: str, last_modified: Optional[datetime] = None) -> Dict[str, str]:
+    """
+    Headers advertising the current validators of a resource.
+
+    Args:
+        etag: Current ETag
+        last_modified: Optional last modification time (naive values are UTC)
+
+    Returns:
+        Header name -> value
+    """
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if last_modified is not None:
+        if last_modified.tzinfo is None:
+            last_modified = last_modified.replace(tzinfo=timezone.utc)
+        headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+    return headers
+
+
+def not_modified(headers: Dict[str, str]) -> Response:
+    """304 response carrying the validators"""
+    return Response(status_code=304, headers=headers)
+
+
+def conditional_json(request: Request, payload: Any, headers: Optional[Dict[str, str]] = None) -> Response:
+    """
+    Serialize payload once, tag it with a content ETag and answer 304 if the client has it.
+
+    Args:
+        request: Incoming request
+        payload: Pydantic models, lists or dicts to send as JSON
+        headers: Extra headers to send with both 200 and 304 responses
+
+    Returns:
+        JSON response, or 304 Not Modified
+    """
+    body = to_json(payload)
+    response_headers = {**(headers or {}), **validator_headers(content_etag(body))}
+    if etag_matches(request, response_headers["ETag"]):
+        return not_modified(response_headers)
+    return Response(content=body, media_type="application/json", headers=response_headers)
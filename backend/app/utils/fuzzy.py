@@ -0,0 +1,114 @@
+"""
+SymSpell-style deletion dictionary for typo-tolerant token lookup.
+Mỗi từ được lưu kèm các biến thể đã xoá tối đa N ký tự (trên prefix cố định),
+nên thời gian tra cứu chỉ phụ thuộc độ dài từ, không phụ thuộc kích thước catalog.
+"""
+
+from collections import defaultdict
+from typing import Dict, List, Set, Tuple
+
+# Chỉ sinh biến thể trên PREFIX_LENGTH ký tự đầu để chặn số lượng deletes
+PREFIX_LENGTH = 7
+
+
+def _deletes(word: str, max_distance: int) -> Set[str]:
+    """All strings obtained by deleting up to max_distance characters from the word prefix"""
+    word = word[:PREFIX_LENGTH]
+    results = {word}
+    frontier = {word}
+    for _ in range(max_distance):
+        next_frontier = set()
+        for variant in frontier:
+            for position in range(len(variant)):
+                next_frontier.add(variant[:position] + variant[position + 1:])
+        results |= next_frontier
+        frontier = next_frontier
+    return results
+
+
+def edit_distance(source: str, target: str, max_distance: int) -> int:
+    """
+    Optimal string alignment distance (Levenshtein with adjacent transpositions).
+
+    Args:
+        source: First string
+        target: Second string
+        max_distance: Cut-off; any larger distance is reported as max_distance + 1
+
+    Returns:
+        Edit distance, capped at max_distance + 1
+    """
+    if abs(len(source) - len(target)) > max_distance:
+        return max_distance + 1
+
+    previous_previous: List[int] = []
+    previous = list(range(len(target) + 1))
+    for i in range(1, len(source) + 1):
+        current = [i] + [0] * len(target)
+        for j in range(1, len(target) + 1):
+            cost = 0 if source[i - 1] == target[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (i > 1 and j > 1 and source[i - 1] == target[j - 2]
+                    and source[i - 2] == target[j - 1]):
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous_previous, previous = previous, current
+    return min(previous[-1], max_distance + 1)
+
+
+class DeletionDictionary:
+    """Dictionary of words answering "which words are within N edits of this term" """
+
+    def __init__(self, max_distance: int = 2):
+        self.max_distance = max_distance
+        self._deletes: Dict[str, Set[str]] = defaultdict(set)
+        self._words: Set[str] = set()
+
+    def __contains__(self, word: str) -> bool:
+        return word in self._words
+
+    def add(self, word: str) -> None:
+        """Add a word to the dictionary"""
+        if word in self._words:
+            return
+        self._words.add(word)
+        for variant in _deletes(word, self.max_distance):
+            self._deletes[variant].add(word)
+
+    def remove(self, word: str) -> None:
+        """Remove a word from the dictionary"""
+        if word not in self._words:
+            return
+        self._words.discard(word)
+        for variant in _deletes(word, self.max_distance):
+            words = self._deletes.get(variant)
+            if words is None:
+                continue
+            words.discard(word)
+            if not words:
+                del self._deletes[variant]
+
+    def lookup(self, term: str, max_distance: int) -> List[Tuple[str, int]]:
+        """
+        Find dictionary words within max_distance edits of term.
+
+        Args:
+            term: Normalized query token
+            max_distance: Maximum edit distance (capped at the dictionary's max_distance)
+
+        Returns:
+            List of (word, distance), closest first
+        """
+        max_distance = min(max_distance, self.max_distance)
+        candidates: Set[str] = set()
+        for variant in _deletes(term, max_distance):
+            candidates |= self._deletes.get(variant, set())
+
+        matches = []
+        for word in candidates:
+            distance = edit_distance(term, word, max_distance)
+            if distance <= max_distance:
+                matches.append((word, distance))
+        matches.sort(key=lambda match: (match[1], match[0]))
+        return matches
@@ -0,0 +1,75 @@
+"""
+MinHash signatures and LSH band keys for approximate Jaccard similarity.
+Mỗi phần tử được băm một lần thành 32 bit rồi qua num_perm hàm băm (a*x + b) mod p;
+hai tập có xác suất trùng một giá trị nhỏ nhất đúng bằng Jaccard của chúng, nên chia chữ ký
+thành các band và so khớp band là đủ để tìm ứng viên mà không phải so từng cặp.
+"""
+
+import hashlib
+from typing import Iterable, List
+
+import numpy as np
+
+DEFAULT_NUM_PERM = 128
+# Số nguyên tố Mersenne 2^61 - 1, a*x với a, x < 2^32 không tràn uint64
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = np.uint64((1 << 32) - 1)
+
+
+def hash_feature(value: str) -> int:
+    """32-bit hash of a feature"""
+    return int.from_bytes(hashlib.blake2b(str(value).encode("utf-8"), digest_size=4).digest(), "big")
+
+
+class MinHash:
+    """Fixed family of hash permutations shared by every signature"""
+
+    def __init__(self, num_perm: int = DEFAULT_NUM_PERM, seed: int = 1):
+        if num_perm < 1:
+            raise ValueError("num_perm must be positive")
+        self.num_perm = num_perm
+        # Cùng seed thì cùng họ hàm băm, chữ ký lưu trong DB vẫn so sánh được sau khi khởi động lại
+        generator = np.random.RandomState(seed)
+        self.a = generator.randint(1, 1 << 32, size=num_perm, dtype=np.uint64)
+        self.b = generator.randint(0, 1 << 32, size=num_perm, dtype=np.uint64)
+
+    def signature(self, features: Iterable[str]) -> np.ndarray:
+        """
+        MinHash signature of a feature set.
+
+        Args:
+            features: Set elements (e.g. genres and text terms)
+
+        Returns:
+            Array of num_perm uint64 values; an empty set gives all MAX_HASH
+        """
+        hashes = np.fromiter((hash_feature(feature) for feature in set(features)), dtype=np.uint64)
+        if not len(hashes):
+            return np.full(self.num_perm, MAX_HASH, dtype=np.uint64)
+        permuted = (np.outer(hashes, self.a) + self.b) % MERSENNE_PRIME & MAX_HASH
+        return permuted.min(axis=0)
+
+    def band_keys(self, signature: np.ndarray, bands: int) -> List[str]:
+        """
+        LSH bucket keys of a signature, one per band.
+
+        Two sets with Jaccard similarity s share at least one key with probability
+        1 - (1 - s^r)^bands, where r = num_perm / bands.
+
+        Args:
+            signature: Signature from signature()
+            bands: Number of bands (must divide num_perm)
+
+        Returns:
+            Keys prefixed with the band index so that equal rows of different bands do not collide
+        """
+        if self.num_perm % bands:
+            raise ValueError("bands must divide num_perm")
+        rows = self.num_perm // bands
+        if (signature == MAX_HASH).all():
+            return []
+        return [
+            f"{band}:{hashlib.blake2b(signature[band * rows:(band + 1) * rows].tobytes(), digest_size=8).hexdigest()}"
+            for band in range(bands)
+        ]
+
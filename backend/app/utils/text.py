@@ -0,0 +1,54 @@
+"""
+Text normalization helpers shared by the movie CRUD layer and the search index.
+Chuẩn hoá chuỗi tiếng Việt (bỏ dấu, bỏ ký tự đặc biệt) để so khớp không dấu.
+"""
+
+import re
+import unicodedata
+from typing import Any, List, Optional
+
+
+def remove_vietnamese_tones(text: str) -> str:
+    text = unicodedata.normalize('NFD', text)
+    text = re.sub(r'[\u0300-\u036f]', '', text)
+    text = re.sub(r'đ', 'd', text)
+    text = re.sub(r'Đ', 'D', text)
+    return text
+
+
+def clean_query(query: str) -> str:
+    query = remove_vietnamese_tones(query.lower())
+    query = re.sub(r'[^\w\s]', '', query)           # Remove special characters
+    query = re.sub(r'\s+', ' ', query).strip()      # Remove extra whitespace
+    return query
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Normalize text with clean_query and split it into tokens.
+
+    Args:
+        text: Raw text (title, overview or search query)
+
+    Returns:
+        List of normalized tokens
+    """
+    if not text:
+        return []
+    return clean_query(text).split()
+
+
+def parse_release_year(release_date: Any) -> Optional[int]:
+    """
+    Extract the year from a release date string (YYYY-MM-DD).
+
+    Args:
+        release_date: Release date as stored on the movie
+
+    Returns:
+        Year as int, or None if the date is missing or malformed
+    """
+    try:
+        return int(str(release_date or "")[:4])
+    except ValueError:
+        return None
@@ -0,0 +1,136 @@
+"""
+Prefix trie with a cached top-k list on every node.
+Dùng cho autocomplete: mỗi node giữ sẵn k phần tử có điểm cao nhất trong subtree,
+nên truy vấn prefix chỉ cần đi xuống theo độ dài prefix rồi đọc danh sách có sẵn.
+"""
+
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+
+class _TrieNode:
+    __slots__ = ("children", "terminals", "top")
+
+    def __init__(self):
+        self.children: Dict[str, "_TrieNode"] = {}
+        self.terminals: Set[str] = set()
+        self.top: List[Tuple[float, str]] = []
+
+
+class PrefixTrie:
+    """Character trie mapping string keys to scored item IDs"""
+
+    def __init__(self, top_k: int = 10):
+        self.top_k = top_k
+        self._root = _TrieNode()
+        self._scores: Dict[str, float] = {}
+        self._keys: Dict[str, List[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+    def _offer(self, node: _TrieNode, score: float, item_id: str) -> None:
+        """Insert (score, item_id) into a node's cached top-k if it qualifies"""
+        if any(cached_id == item_id for _, cached_id in node.top):
+            return
+        if len(node.top) >= self.top_k and (score, item_id) <= node.top[-1]:
+            return
+        node.top.append((score, item_id))
+        node.top.sort(reverse=True)
+        del node.top[self.top_k:]
+
+    def _recompute(self, node: _TrieNode) -> None:
+        """Rebuild a node's top-k from its children's caches and its own terminals"""
+        candidates = {item_id: self._scores[item_id] for item_id in node.terminals}
+        for child in node.children.values():
+            for score, item_id in child.top:
+                candidates[item_id] = score
+        node.top = sorted(((score, item_id) for item_id, score in candidates.items()), reverse=True)[:self.top_k]
+
+    def insert(self, item_id: str, keys: Iterable[str], score: float) -> None:
+        """
+        Index an item under several keys (replacing any previous entry).
+
+        Args:
+            item_id: Item identifier
+            keys: Strings the item should be reachable from by prefix
+            score: Ranking score, higher first
+        """
+        if item_id in self._scores:
+            self.remove(item_id)
+
+        keys = [key for key in dict.fromkeys(keys) if key]
+        self._scores[item_id] = score
+        self._keys[item_id] = keys
+
+        for key in keys:
+            node = self._root
+            self._offer(node, score, item_id)
+            for char in key:
+                node = node.children.setdefault(char, _TrieNode())
+                self._offer(node, score, item_id)
+            node.terminals.add(item_id)
+
+    def remove(self, item_id: str) -> None:
+        """
+        Remove an item from every key it was indexed under.
+
+        Args:
+            item_id: Item identifier
+        """
+        keys = self._keys.pop(item_id, None)
+        if keys is None:
+            return
+
+        paths = []
+        for key in keys:
+            path = [self._root]
+            for char in key:
+                child = path[-1].children.get(char)
+                if child is None:
+                    break
+                path.append(child)
+            else:
+                path[-1].terminals.discard(item_id)
+            paths.append((key, path))
+
+        del self._scores[item_id]
+
+        # Cập nhật từ dưới lên để node cha dùng top-k đã sửa của node con
+        for key, path in paths:
+            for depth in range(len(path) - 1, -1, -1):
+                node = path[depth]
+                if depth > 0 and not node.children and not node.terminals:
+                    path[depth - 1].children.pop(key[depth - 1], None)
+                    continue
+                if any(cached_id == item_id for _, cached_id in node.top):
+                    self._recompute(node)
+
+    def update_score(self, item_id: str, score: float) -> None:
+        """
+        Change an item's score, keeping its keys.
+
+        Args:
+            item_id: Item identifier
+            score: New ranking score
+        """
+        keys = self._keys.get(item_id)
+        if keys is not None and self._scores.get(item_id) != score:
+            self.insert(item_id, keys, score)
+
+    def top(self, prefix: str, limit: Optional[int] = None) -> List[str]:
+        """
+        Best-scored items having a key that starts with prefix.
+
+        Args:
+            prefix: Key prefix
+            limit: Maximum number of items (at most top_k)
+
+        Returns:
+            Item IDs, highest score first
+        """
+        node = self._root
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return []
+        return [item_id for _, item_id in node.top[:limit or self.top_k]]
@@ -0,0 +1,29 @@
+# backend/scripts/backfill_release_year.py
+
+from pymongo import MongoClient
+
+# === Kết nối MongoDB ===
+client = MongoClient("mongodb://localhost:27017")  # Đổi nếu bạn dùng Docker hay URI khác
+db = client["movigo"]  # Tên DB của bạn
+collection = db["movies"]
+
+# === Tính release_year từ release_date ngay trên server (một lệnh update_many) ===
+result = collection.update_many(
+    {"release_year": {"$exists": False}},
+    [{"$set": {
+        "release_year": {
+            "$convert": {
+                "input": {"$substrBytes": [{"$ifNull": ["$release_date", ""]}, 0, 4]},
+                "to": "int",
+                "onError": None,
+                "onNull": None
+            }
+        }
+    }}]
+)
+
+# === Index phục vụ lọc theo thể loại + năm ===
+collection.create_index([("genres", 1), ("release_year", 1)])
+collection.create_index([("release_year", 1)])
+
+print(f"✅ Đã cập nhật release_year cho {result.modified_count} phim.")
@@ -0,0 +1,20 @@
+# backend/scripts/backfill_watch_rollups.py
+
+import asyncio
+import os
+import sys
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.watch_rollups import backfill_watch_rollups  # noqa: E402
+
+# === Kết nối MongoDB ===
+client = AsyncIOMotorClient("mongodb://localhost:27017")  # Đổi nếu bạn dùng Docker hay URI khác
+db = client["movigo"]  # Tên DB của bạn
+
+# === Dựng lại bảng tổng hợp user_watch_daily từ watch_history (chạy một lần trước khi deploy) ===
+count = asyncio.run(backfill_watch_rollups(db))
+
+print(f"✅ Đã tổng hợp {count} ngày xem của người dùng.")
@@ -0,0 +1,20 @@
+# backend/scripts/build_movie_neighbors.py
+
+import asyncio
+import os
+import sys
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.item_similarity import build_movie_neighbors  # noqa: E402
+
+# === Kết nối MongoDB ===
+client = AsyncIOMotorClient("mongodb://localhost:27017")  # Đổi nếu bạn dùng Docker hay URI khác
+db = client["movigo"]  # Tên DB của bạn
+
+# === Tính lại phim hàng xóm cho gợi ý cá nhân (lọc cộng tác item-item từ watch_history) ===
+count = asyncio.run(build_movie_neighbors(db))
+
+print(f"✅ Đã tính phim hàng xóm cho {count} phim.")
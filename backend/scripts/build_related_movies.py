@@ -0,0 +1,20 @@
+# backend/scripts/build_related_movies.py
+
+import asyncio
+import os
+import sys
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.related_movies import build_related_movies  # noqa: E402
+
+# === Kết nối MongoDB ===
+client = AsyncIOMotorClient("mongodb://localhost:27017")  # Đổi nếu bạn dùng Docker hay URI khác
+db = client["movigo"]  # Tên DB của bạn
+
+# === Tính lại toàn bộ danh sách phim liên quan (top-k hàng xóm cho mỗi phim) ===
+count = asyncio.run(build_related_movies(db))
+
+print(f"✅ Đã tính phim liên quan cho {count} phim.")
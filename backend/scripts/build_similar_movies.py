@@ -0,0 +1,27 @@
+# backend/scripts/build_similar_movies.py
+
+import asyncio
+import os
+import sys
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.content_similarity import build_similar_movies  # noqa: E402
+from app.services.movie_lsh import build_lsh_index  # noqa: E402
+
+# Bắt buộc khi dùng process pool: process con không được chạy lại phần dưới
+if __name__ == "__main__":
+    # === Kết nối MongoDB ===
+    client = AsyncIOMotorClient("mongodb://localhost:27017")  # Đổi nếu bạn dùng Docker hay URI khác
+    db = client["movigo"]  # Tên DB của bạn
+
+    # === Dựng lại index LSH rồi tính phim tương tự trên các cặp ứng viên (TF-IDF tiêu đề + mô tả) ===
+    async def main():
+        await build_lsh_index(db)
+        return await build_similar_movies(db)
+
+    count = asyncio.run(main())
+
+    print(f"✅ Đã tính phim tương tự cho {count} phim.")
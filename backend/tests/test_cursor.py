@@ -0,0 +1,46 @@
+"""
+Tests for keyset pagination cursors.
+Chạy từ thư mục backend: python -m pytest tests
+"""
+
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+
+from app.utils.cursor import InvalidCursorError, as_object_id, decode_cursor, encode_cursor, keyset_query
+
+
+def test_cursor_round_trips_bson_values():
+    last_id = ObjectId()
+    watched_at = datetime(2026, 3, 1, 12, 30, 15, 123000)
+
+    token = encode_cursor(watched_at, last_id)
+
+    assert "=" not in token
+    assert decode_cursor(token, 2) == [watched_at, last_id]
+    assert decode_cursor(encode_cursor(0.5, "uuid-1"), 2) == [0.5, "uuid-1"]
+
+
+@pytest.mark.parametrize("token", ["not-a-cursor", "", "!!!", encode_cursor(1)])
+def test_decode_rejects_malformed_or_wrong_size_tokens(token):
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(token, 2)
+
+
+def test_as_object_id_leaves_other_ids_untouched():
+    object_id = ObjectId()
+    assert as_object_id(str(object_id)) == object_id
+    assert as_object_id("f47ac10b-58cc-4372-a567-0e02b2c3d479") == "f47ac10b-58cc-4372-a567-0e02b2c3d479"
+    assert as_object_id(object_id) is object_id
+
+
+def test_keyset_query_seeks_after_the_last_item():
+    last_id = ObjectId()
+    assert keyset_query(None, None, last_id, descending=False) == {"_id": {"$gt": last_id}}
+    assert keyset_query("watched_at", 5, last_id) == {
+        "$or": [
+            {"watched_at": {"$lt": 5}},
+            {"watched_at": 5, "_id": {"$lt": last_id}}
+        ]
+    }
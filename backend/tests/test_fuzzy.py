@@ -0,0 +1,47 @@
+"""
+Tests for the SymSpell-style deletion dictionary.
+Chạy từ thư mục backend: python -m pytest tests
+"""
+
+from app.utils.fuzzy import DeletionDictionary, edit_distance
+
+
+def test_edit_distance_counts_transpositions_and_caps():
+    assert edit_distance("phim", "phim", 2) == 0
+    assert edit_distance("phim", "pihm", 2) == 1
+    assert edit_distance("phim", "phi", 2) == 1
+    assert edit_distance("phim", "xyzw", 2) == 3
+
+
+def test_lookup_finds_words_within_distance_closest_first():
+    dictionary = DeletionDictionary(max_distance=2)
+    for word in ("avatar", "avengers", "alien", "aladdin"):
+        dictionary.add(word)
+
+    assert dictionary.lookup("avatar", 2) == [("avatar", 0)]
+    assert dictionary.lookup("avtar", 2) == [("avatar", 1)]
+    assert dictionary.lookup("avengrs", 1) == [("avengers", 1)]
+    assert dictionary.lookup("alein", 2) == [("alien", 1)]
+    assert dictionary.lookup("zzzzzz", 2) == []
+
+
+def test_lookup_distance_is_capped_by_the_dictionary():
+    dictionary = DeletionDictionary(max_distance=1)
+    dictionary.add("matrix")
+
+    assert dictionary.lookup("mtrx", 2) == []
+    assert dictionary.lookup("matrx", 2) == [("matrix", 1)]
+
+
+def test_remove_drops_word_but_keeps_shared_deletes():
+    dictionary = DeletionDictionary(max_distance=1)
+    dictionary.add("cat")
+    dictionary.add("car")
+
+    dictionary.remove("cat")
+
+    assert "cat" not in dictionary
+    # "ca" là biến thể xoá chung của cả hai từ
+    assert dictionary.lookup("ca", 1) == [("car", 1)]
+    dictionary.remove("cat")
+    assert dictionary.lookup("car", 1) == [("car", 0)]
@@ -0,0 +1,57 @@
+"""
+Tests for the HyperLogLog unique-viewer sketch.
+Chạy từ thư mục backend: python -m pytest tests
+"""
+
+import pytest
+
+from app.utils.hyperloglog import DEFAULT_PRECISION, HyperLogLog
+
+# Sai số chuẩn 1.04 / sqrt(2^precision); chấp nhận 3 lần sai số chuẩn
+TOLERANCE = 3 * 1.04 / (1 << DEFAULT_PRECISION) ** 0.5
+
+
+@pytest.mark.parametrize("cardinality", [10, 1000, 20000, 100000])
+def test_count_is_within_error_bound(cardinality):
+    sketch = HyperLogLog()
+    for value in range(cardinality):
+        sketch.add(f"user-{value}")
+
+    assert abs(sketch.count() - cardinality) <= max(1, TOLERANCE * cardinality)
+
+
+def test_duplicates_do_not_change_the_sketch():
+    sketch = HyperLogLog()
+    for value in range(500):
+        sketch.add(f"user-{value}")
+    before = sketch.to_bytes()
+
+    changed = [sketch.add(f"user-{value}") for value in range(500)]
+
+    assert not any(changed)
+    assert sketch.to_bytes() == before
+
+
+def test_merge_equals_sketch_of_the_union():
+    first, second, together = HyperLogLog(), HyperLogLog(), HyperLogLog()
+    for value in range(3000):
+        (first if value % 2 else second).add(f"user-{value}")
+        together.add(f"user-{value}")
+    # Phần giao được đếm một lần
+    for value in range(1000):
+        second.add(f"user-{value}")
+
+    assert HyperLogLog.union([first, second]) == together
+    assert first.merge(second) == together
+
+
+def test_serialization_round_trip_and_validation():
+    sketch = HyperLogLog()
+    sketch.add("user-1")
+
+    assert HyperLogLog.from_bytes(sketch.to_bytes()) == sketch
+    assert HyperLogLog.from_bytes(None).count() == 0
+    with pytest.raises(ValueError):
+        HyperLogLog(registers=b"\x00" * 10)
+    with pytest.raises(ValueError):
+        HyperLogLog(precision=12).merge(HyperLogLog())
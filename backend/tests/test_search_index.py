@@ -0,0 +1,108 @@
+"""
+Regression tests for removing movies from the bitmap and search indexes.
+Chạy từ thư mục backend: python -m pytest tests
+"""
+
+from app.services.search_index import MovieSearchIndex
+from app.utils.bitmap import BitmapIndex
+
+
+def _movie(movie_id, title, genres, year, vote_average=7.0):
+    return {
+        "_id": movie_id,
+        "title": title,
+        "overview": f"{title} overview",
+        "genres": genres,
+        "release_year": year,
+        "vote_average": vote_average,
+    }
+
+
+def test_bitmap_remove_clears_item():
+    index = BitmapIndex()
+    index.add("a", {"genre": ["Action", "Drama"]})
+    index.add("b", {"genre": ["Drama"]})
+
+    index.remove("a")
+
+    assert len(index) == 1
+    assert index.ids(index.live) == ["b"]
+    assert index.ids(index.bitmap("genre", "Drama")) == ["b"]
+    assert "Action" not in index.values("genre")
+    assert index.counts("genre", index.live) == {"Drama": 1}
+
+    # Xoá lần hai không làm gì
+    index.remove("a")
+    assert index.ids(index.live) == ["b"]
+
+
+def test_search_index_remove_drops_movie_from_filters_and_facets():
+    index = MovieSearchIndex()
+    index.add(_movie("m1", "Heat", ["Action", "Crime"], 1995))
+    index.add(_movie("m2", "Casino", ["Crime"], 1995))
+
+    index.remove("m1")
+
+    assert "m1" not in index
+    assert index.filter() == ["m2"]
+    assert index.filter(genre="Action") == []
+    assert index.count(genre="Crime") == 1
+    assert index.search_scored("heat") == []
+    facets = index.facet_counts()
+    assert facets["genres"] == {"Crime": 1}
+    assert facets["years"] == {"1995": 1}
+
+    index.remove("m1")
+    assert index.filter() == ["m2"]
+
+
+def test_bitmap_combines_fields_with_and_or():
+    index = BitmapIndex()
+    index.add("a", {"genre": ["Action"], "year": [2020]})
+    index.add("b", {"genre": ["Action", "Drama"], "year": [2021]})
+    index.add("c", {"genre": ["Drama"], "year": [2020]})
+    index.add("d", {"genre": ["Comedy"], "year": [2020]})
+
+    action_2020 = index.bitmap("genre", "Action") & index.bitmap("year", 2020)
+    assert index.ids(action_2020) == ["a"]
+    assert index.ids(index.any_of("genre", ["Drama", "Comedy"])) == ["b", "c", "d"]
+    assert index.counts("genre", index.bitmap("year", 2020)) == {"Action": 1, "Drama": 1, "Comedy": 1}
+    assert index.ids(index.bitmap("genre", "Horror")) == []
+
+
+def test_bitmap_ids_page_by_skip_limit_and_after():
+    index = BitmapIndex()
+    for item_id in "abcdef":
+        index.add(item_id, {"genre": ["Drama"]})
+
+    bits = index.bitmap("genre", "Drama")
+    assert index.ids(bits, skip=1, limit=2) == ["b", "c"]
+    assert index.ids(bits, after="c", limit=2) == ["d", "e"]
+    assert index.contains(bits, "f")
+    assert index.mask_of(["a", "missing"]) == 1
+
+
+def test_bitmap_add_replaces_previous_values():
+    index = BitmapIndex()
+    index.add("a", {"genre": ["Action"]})
+    index.add("a", {"genre": ["Drama"]})
+
+    assert index.ids(index.bitmap("genre", "Action")) == []
+    assert index.ids(index.bitmap("genre", "Drama")) == ["a"]
+    assert index.values("genre") == ["Drama"]
+
+
+def test_search_index_filter_combinations():
+    index = MovieSearchIndex()
+    index.add({**_movie("m1", "Heat", ["Action", "Crime"], 1995, 8.3), "is_featured": True})
+    index.add(_movie("m2", "Casino", ["Crime"], 1995, 8.2))
+    index.add(_movie("m3", "Up", ["Animation"], 2009, 8.3))
+    index.add(_movie("m4", "Cats", ["Musical"], 2019, 2.8))
+
+    assert index.filter(genre="Crime", year=1995) == ["m1", "m2"]
+    assert index.filter(genre="Crime", is_featured=True) == ["m1"]
+    assert index.filter(min_rating=8) == ["m1", "m2", "m3"]
+    assert index.filter(year=1995, min_rating=8, limit=1) == ["m1"]
+    assert index.count(genre="Crime", min_rating=9) == 0
+    assert index.count() == 4
+    assert index.facet_counts(year=1995)["genres"] == {"Action": 1, "Crime": 2}
@@ -0,0 +1,56 @@
+"""
+Tests for the autocomplete prefix trie and its cached top-k lists.
+Chạy từ thư mục backend: python -m pytest tests
+"""
+
+from app.utils.trie import PrefixTrie
+
+
+def test_top_is_ordered_by_score_and_limited_to_k():
+    trie = PrefixTrie(top_k=3)
+    for item_id, score in (("a", 5), ("b", 9), ("c", 1), ("d", 7)):
+        trie.insert(item_id, [f"ma{item_id}"], score)
+
+    assert trie.top("ma") == ["b", "d", "a"]
+    assert trie.top("ma", limit=2) == ["b", "d"]
+    assert trie.top("mac") == ["c"]
+    assert trie.top("x") == []
+
+
+def test_remove_refills_top_k_from_the_subtree():
+    trie = PrefixTrie(top_k=2)
+    for item_id, score in (("a", 5), ("b", 9), ("c", 1), ("d", 7)):
+        trie.insert(item_id, [f"ma{item_id}"], score)
+
+    trie.remove("b")
+
+    # "a" chưa nằm trong top-k của node "ma" trước khi xoá, phải được lấy lại từ node con
+    assert trie.top("ma") == ["d", "a"]
+    assert trie.top("mab") == []
+    assert len(trie) == 3
+
+    trie.remove("b")
+    assert len(trie) == 3
+
+
+def test_item_under_several_keys_is_listed_once():
+    trie = PrefixTrie(top_k=5)
+    trie.insert("m1", ["nha ba nu", "ba nu", "nu"], 3)
+    trie.insert("m2", ["ba ba"], 1)
+
+    assert trie.top("ba") == ["m1", "m2"]
+    assert trie.top("n") == ["m1"]
+
+    trie.remove("m1")
+    assert trie.top("ba") == ["m2"]
+    assert trie.top("n") == []
+
+
+def test_update_score_reorders_items():
+    trie = PrefixTrie(top_k=2)
+    trie.insert("a", ["key"], 1)
+    trie.insert("b", ["key"], 2)
+
+    trie.update_score("a", 3)
+
+    assert trie.top("k") == ["a", "b"]
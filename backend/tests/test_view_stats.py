@@ -0,0 +1,105 @@
+"""
+Tests for the write-behind view counter shutdown path.
+Chạy từ thư mục backend: python -m pytest tests
+"""
+
+import asyncio
+
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+
+from app.services.view_stats import ViewCounter, run_view_stats
+
+
+class FakeCollection:
+    """Collection without documents; bulk_write only records the operations"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.operations = []
+
+    async def bulk_write(self, operations, ordered=True):
+        await asyncio.sleep(self.delay)
+        self.operations.extend(operations)
+
+    def find(self, *args, **kwargs):
+        return self
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        raise StopAsyncIteration
+
+
+class FailingCollection(FakeCollection):
+    """Unordered bulk_write that fails the first operation and applies the others"""
+
+    async def bulk_write(self, operations, ordered=True):
+        self.operations.extend(operations[1:])
+        raise BulkWriteError({
+            "writeErrors": [{"index": 0, "code": 11000, "errmsg": "duplicate key"}],
+            "writeConcernErrors": [], "nInserted": 0, "nUpserted": 0, "nMatched": len(operations) - 1,
+            "nModified": len(operations) - 1, "nRemoved": 0, "upserted": []
+        })
+
+
+class Database:
+    def __init__(self):
+        # Ghi vào movies chậm để shutdown xảy ra giữa lúc flush
+        self.movies = FakeCollection(delay=0.05)
+        self.movie_view_buckets = FakeCollection()
+
+
+async def _shutdown_during_flush():
+    db = Database()
+    counter = ViewCounter(flush_events=10)
+    counter.start(db)
+    stop = asyncio.Event()
+    task = asyncio.create_task(run_view_stats(counter, db, stop))
+    movie_id = str(ObjectId())
+
+    # Lượt thứ 10 khởi động flush nền; 5 lượt sau đến khi flush đang ghi
+    for _ in range(10):
+        counter.add(movie_id)
+    await asyncio.sleep(0.01)
+    for _ in range(5):
+        counter.add(movie_id)
+
+    # Giống shutdown_db_client trong main.py
+    stop.set()
+    await task
+    await counter.close()
+
+    written = sum(operation._doc["$inc"]["total"] for operation in db.movie_view_buckets.operations)
+    return written, len(counter)
+
+
+def test_close_keeps_views_of_in_flight_flush():
+    written, pending = asyncio.run(_shutdown_during_flush())
+    assert written == 15
+    assert pending == 0
+
+
+async def _flush_with_partial_failure():
+    db = Database()
+    db.movies = FailingCollection()
+    counter = ViewCounter()
+    counter.start(db)
+    failed, written = str(ObjectId()), str(ObjectId())
+    for _ in range(3):
+        counter.add(failed)
+    for _ in range(2):
+        counter.add(written)
+
+    flushed = await counter.flush()
+    return flushed, counter.pending(failed), counter.pending(written), len(counter)
+
+
+def test_flush_restores_only_failed_operations():
+    flushed, failed_pending, written_pending, pending = asyncio.run(_flush_with_partial_failure())
+    # Lượt xem của phim đã ghi không được trả lại, tránh cộng hai lần ở lần flush sau
+    assert flushed == 2
+    assert failed_pending == 3
+    assert written_pending == 0
+    assert pending == 3